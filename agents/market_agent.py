@@ -2,7 +2,6 @@
 
 # 외부 API(Marketaux) → LLM(GPT-4) → 알림(Gmail) 으로 이어지는 자동화 파이프라인
 import os
-import requests
 import datetime
 from dotenv import load_dotenv
 
@@ -10,6 +9,7 @@ from langchain_openai import ChatOpenAI
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
+from tools import http_client
 from tools.gmail_tool import gmail_authenticate, send_email
 
 from langchain_core.tools import tool 
@@ -39,7 +39,7 @@ def get_marketaux_news(api_key: str) -> str:
         "filter_entities": True
     }
     try:
-        response = requests.get(url, params=params)
+        response = http_client.get(url, params=params)
         response.raise_for_status()
         news_data = response.json().get("data", [])
 
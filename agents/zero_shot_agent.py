@@ -14,7 +14,7 @@ from agents.market_agent import generate_market_briefing
 
 from tools.stock_price_tool import get_stock_price
 from tools.advice_tool import get_stock_advice
-from tools.compare_tool import compare_two_stocks
+from tools.compare_tool import compare_stocks
 from tools.term_explain_tool import get_term_explain_tool
 from tools.portfolio_tool import buy_stock, sell_stock
 from tools.asset_summary_tool import get_portfolio_summary
@@ -48,8 +48,8 @@ tools = [
     ),
     Tool(
         name="CompareStock",
-        func=lambda symbols: compare_two_stocks(symbols.split(", ")),
-        description="두 종목을 비교합니다. 사용자의 질문에서 2개의 종목 티커 또는 종목명을 추출하여 쉼표로 구분된 문자열(예: 'TSLA, AAPL')로 전달하세요. 'TSLA와 AAPL 비교해줘'와 같은 질문에 사용하세요.",
+        func=lambda symbols: compare_stocks(symbols.split(",")),
+        description="2개 이상의 종목을 비교합니다. 사용자의 질문에서 종목 티커 또는 종목명을 모두 추출하여 쉼표로 구분된 문자열(예: 'TSLA, AAPL, 삼성전자')로 전달하세요. 'TSLA와 AAPL 비교해줘'와 같은 질문에 사용하세요.",
         return_direct=True,
     ),
     get_term_explain_tool(),
@@ -9,12 +9,16 @@ import uuid
 import json
 from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
 from langchain_openai import ChatOpenAI
-import requests
+import httpx
 import os
 import threading
 
 from graph.builder import graph
 from agents.market_agent import generate_market_briefing, send_market_briefing_email
+from tools import http_client
+from tools.asset_summary_tool import STREAM_KEY
+from tools.term_explain_tool import warm_term_service_in_background
+from tools.stock_price_tool import warm_price_cache
 
 # --- CSS 파일 직접 읽어오기 ---
 try:
@@ -29,9 +33,21 @@ def parse_tool_call(tool_calls):
     if not tool_calls:
         return ""
     call = tool_calls[0]
+    if call['name'] == "place_orders":
+        return _format_order_legs(call['args'].get('legs') or [])
     return f"**도구:** `{call['name']}`\n**파라미터:** `{json.dumps(call['args'], ensure_ascii=False)}`"
 
-def synthesize_final_question(original_question: str, modification_request: str) -> str:
+def _format_order_legs(legs) -> str:
+    """일괄 주문은 한 번의 승인 화면에 주문 목록 전체를 보여줍니다."""
+    lines = [f"**도구:** `place_orders` (일괄 주문 {len(legs)}건)"]
+    for i, leg in enumerate(legs, 1):
+        side = "매수" if leg.get('side') == "buy" else "매도"
+        price = leg.get('price')
+        price_str = f" @ {price:,}" if price is not None else " @ 현재가"
+        lines.append(f"{i}. {side} `{leg.get('symbol')}` {leg.get('quantity')}주{price_str}")
+    return "\n".join(lines)
+
+async def synthesize_final_question(original_question: str, modification_request: str) -> str:
     """LLM을 이용해 원래 질문과 수정 요청을 바탕으로 최종 질문을 생성합니다."""
     try:
         llm = ChatOpenAI(model=os.getenv("TOOL_LLM_MODEL", "gpt-4o-mini"), temperature=0)
@@ -44,7 +60,7 @@ def synthesize_final_question(original_question: str, modification_request: str)
         {modification_request}
         # 최종 질문:
         """
-        response = llm.invoke(prompt.strip())
+        response = await llm.ainvoke(prompt.strip())
         return response.content.strip()
     except Exception as e:
         print(f"❌ 질문 재구성 실패: {e}")
@@ -53,14 +69,14 @@ def synthesize_final_question(original_question: str, modification_request: str)
 # --- Notion 기록 함수 ---
 MCP_SERVER_URL = os.getenv("MCP_SERVER_URL", "http://127.0.0.1:8000")
 
-def record_chat_to_notion(user_input: str, ai_response: str):
+async def record_chat_to_notion(user_input: str, ai_response: str):
     try:
         url = f"{MCP_SERVER_URL}/record_chat"
         payload = {"user_question": user_input, "ai_response": ai_response}
-        response = requests.post(url, json=payload, timeout=30)
+        response = await http_client.apost(url, json=payload, timeout=30)
         response.raise_for_status()
         print("✅ 대화 내용이 Notion에 성공적으로 기록되었습니다.")
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"❌ Notion 기록 실패: {e}")
 
 # --- 이메일 발송 함수 (백그라운드 실행용) ---
@@ -121,7 +137,7 @@ with gr.Blocks(theme=gr.themes.Base(), css=custom_css) as demo:
                     reject_input = gr.Textbox(show_label=False, placeholder="새로운 질문 입력...")
                     reject_btn = gr.Button("❌ 새 질문 입력")
 
-    def handle_user_message(user_message, history, tid):
+    async def handle_user_message(user_message, history, tid):
         if not user_message.strip():
             return history, tid, "", {}, gr.update(visible=False), gr.update(value="", interactive=True), user_message
             
@@ -134,7 +150,7 @@ with gr.Blocks(theme=gr.themes.Base(), css=custom_css) as demo:
         input_message = HumanMessage(content=user_message)
         
         last_event = None
-        for event in graph.stream({"messages": [input_message]}, config=config, stream_mode="values"):
+        async for event in graph.astream({"messages": [input_message]}, config=config, stream_mode="values"):
             last_event = event
 
         messages = last_event.get('messages', [])
@@ -146,7 +162,7 @@ with gr.Blocks(theme=gr.themes.Base(), css=custom_css) as demo:
 
         if not hasattr(last_ai_message, 'tool_calls') or not last_ai_message.tool_calls:
             history.append({"role": "assistant", "content": last_ai_message.content})
-            record_chat_to_notion(user_message, last_ai_message.content)
+            await record_chat_to_notion(user_message, last_ai_message.content)
             return history, tid, "", {}, gr.update(visible=False), gr.update(value="", interactive=True), user_message
 
         tool_calls = last_ai_message.tool_calls
@@ -156,7 +172,7 @@ with gr.Blocks(theme=gr.themes.Base(), css=custom_css) as demo:
             tool_calls, gr.update(visible=True), gr.update(value="", interactive=False), user_message
         )
 
-    def handle_hil_decision(decision, new_input, history, tid, original_tool_calls, current_question):
+    async def handle_hil_decision(decision, new_input, history, tid, original_tool_calls, current_question):
         config = {"configurable": {"thread_id": tid}}
         
         question_to_log = current_question
@@ -172,33 +188,40 @@ with gr.Blocks(theme=gr.themes.Base(), css=custom_css) as demo:
                 tool_call_id=tool_call_id
             )
             stream_input = {"messages": [feedback_tool_message, HumanMessage(content=new_input)]}
-            question_to_log = synthesize_final_question(current_question, new_input)
+            question_to_log = await synthesize_final_question(current_question, new_input)
         else: # approve
             stream_input = None
         
         # ⭐️ 핵심 수정 2: AI의 답변을 위한 빈 공간(placeholder)을 추가합니다.
         history.append({"role": "assistant", "content": "요청 처리 중..."})
-        
+        yield history, tid, gr.update(), gr.update(), gr.update(visible=False), gr.update(interactive=False), question_to_log
+
+        # values: 최종 상태, custom: 도구가 get_stream_writer로 보내는 중간 결과 (예: 포트폴리오 표가 한 행씩)
         last_event = None
-        for event in graph.stream(stream_input, config=config, stream_mode="values"):
-            last_event = event
+        async for mode, chunk in graph.astream(stream_input, config=config, stream_mode=["values", "custom"]):
+            if mode == "values":
+                last_event = chunk
+            elif isinstance(chunk, dict) and STREAM_KEY in chunk:
+                history[-1] = {"role": "assistant", "content": chunk[STREAM_KEY]}
+                yield history, tid, gr.update(), gr.update(), gr.update(visible=False), gr.update(interactive=False), question_to_log
 
-        messages = last_event.get('messages', [])
+        messages = (last_event or {}).get('messages', [])
         if not messages:
             history[-1] = {"role": "assistant", "content": "오류: AI 응답 처리 불가"}
-            return history, tid, "", {}, gr.update(visible=False), gr.update(interactive=True), question_to_log
+            yield history, tid, "", {}, gr.update(visible=False), gr.update(interactive=True), question_to_log
+            return
 
         last_ai_message = messages[-1]
         
         if not hasattr(last_ai_message, 'tool_calls') or not last_ai_message.tool_calls:
             final_answer = last_ai_message.content
             history[-1] = {"role": "assistant", "content": final_answer}
-            record_chat_to_notion(question_to_log, final_answer)
-            return history, tid, "", {}, gr.update(visible=False), gr.update(interactive=True), question_to_log
+            yield history, tid, "", {}, gr.update(visible=False), gr.update(interactive=True), question_to_log
+            await record_chat_to_notion(question_to_log, final_answer)
         else:
             tool_calls = last_ai_message.tool_calls
             history[-1] = {"role": "assistant", "content": "계획을 수정하여 다시 제안합니다..."}
-            return (
+            yield (
                 history, tid, parse_tool_call(tool_calls),
                 tool_calls, gr.update(visible=True), gr.update(interactive=False), question_to_log
             )
@@ -231,4 +254,10 @@ if __name__ == "__main__":
     email_thread.daemon = True
     email_thread.start()
 
+    # 재시작 직후 업스트림 폭주를 막기 위해 디스크의 최근 시세로 캐시 예열
+    warm_price_cache()
+
+    # 용어 설명 RAG(벡터스토어/LLM/BM25)를 첫 질문 전에 미리 열어둠
+    warm_term_service_in_background()
+
     demo.launch()
\ No newline at end of file
@@ -5,16 +5,18 @@ from langgraph.graph import StateGraph, END
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.prebuilt import ToolNode
 from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.runnables import RunnableLambda
 
 from graph.state import AgentState
 from config import OPENAI_API_KEY, MAIN_LLM_MODEL
 
 # Tool들을 모두 import 합니다.
 from tools.asset_summary_tool import get_portfolio_summary
-from tools.compare_tool import compare_two_stocks
+from tools.compare_tool import compare_stocks
 from tools.stock_price_tool import get_stock_price
 from tools.advice_tool import get_stock_advice
-from tools.portfolio_tool import buy_stock, sell_stock
+from tools.portfolio_tool import buy_stock, sell_stock, place_orders
+from tools.ledger_tool import get_trade_ledger
 from tools.term_explain_tool import get_term_explain_tool
 from agents.market_agent import generate_market_briefing
 
@@ -22,11 +24,13 @@ from agents.market_agent import generate_market_briefing
 # 1. 사용할 Tool들을 리스트로 묶습니다.
 tools = [
     get_portfolio_summary,
-    compare_two_stocks,
+    compare_stocks,
     get_stock_price,
     get_stock_advice,
     buy_stock,
     sell_stock,
+    place_orders,
+    get_trade_ledger,
     get_term_explain_tool(),
     generate_market_briefing,
 ]
@@ -38,10 +42,7 @@ llm_with_tools = llm.bind_tools(tools)
 
 
 # 3. 그래프의 노드(Node)와 엣지(Edge) 함수를 정의합니다.
-def agent_node(state: AgentState):
-    # 1. AI가 답변을 생성합니다.
-    response = llm_with_tools.invoke(state["messages"])
-
+def _finalize_response(state: AgentState, response):
     # 2. AI가 Tool을 사용하지 않고 직접 답변했는지 확인합니다.
     if not hasattr(response, 'tool_calls') or not response.tool_calls:
         
@@ -53,6 +54,16 @@ def agent_node(state: AgentState):
 
     return {"messages": [response]}
 
+def agent_node(state: AgentState):
+    # 1. AI가 답변을 생성합니다.
+    response = llm_with_tools.invoke(state["messages"])
+    return _finalize_response(state, response)
+
+async def aagent_node(state: AgentState):
+    # 비동기 실행(ainvoke/astream) 시에는 이벤트 루프에서 LLM을 기다립니다.
+    response = await llm_with_tools.ainvoke(state["messages"])
+    return _finalize_response(state, response)
+
 # 4. '경로 안내원' 함수 로직을 명확하고 올바르게 수정합니다.
 def should_continue(state: AgentState):
     """마지막 메시지를 보고 다음 경로를 결정합니다."""
@@ -69,7 +80,8 @@ def should_continue(state: AgentState):
 # 5. 그래프를 조립하고 컴파일합니다.
 graph_builder = StateGraph(AgentState)
 
-graph_builder.add_node("agent", agent_node)
+# 동기/비동기 구현을 함께 등록 → graph.stream은 동기, graph.astream은 코루틴 Tool(ainvoke)을 사용
+graph_builder.add_node("agent", RunnableLambda(agent_node, afunc=aagent_node))
 graph_builder.add_node("tools", ToolNode(tools))
 
 graph_builder.set_entry_point("agent")
@@ -6,6 +6,8 @@ from dotenv import load_dotenv
 
 from agents.market_agent import generate_market_briefing, send_market_briefing_email
 from agents.zero_shot_agent import run_agent
+from tools import http_client
+from tools.stock_price_tool import warm_price_cache
 
 load_dotenv()
 # MCP 서버 주소를 환경 변수에서 가져옴
@@ -26,7 +28,7 @@ def record_chat_to_notion(user_input: str, ai_response: str):
             "ai_response": ai_response
         }
         # MCP 서버에 POST 요청을 보냄
-        response = requests.post(url, json=payload, timeout=15)
+        response = http_client.post(url, json=payload, timeout=15)
         response.raise_for_status()  # HTTP 오류 발생 시 예외 발생
         print("✅ 대화 내용이 Notion에 성공적으로 기록되었습니다.")
     except requests.exceptions.RequestException as e:
@@ -51,4 +53,6 @@ def start_user_prompt_loop():
         record_chat_to_notion(user_input, response)
 
 if __name__ == "__main__":
+    # 재시작 직후 업스트림 폭주를 막기 위해 디스크의 최근 시세로 캐시 예열
+    warm_price_cache()
     start_user_prompt_loop()
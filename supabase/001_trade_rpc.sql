@@ -0,0 +1,74 @@
+-- FINAL_PROJECT/supabase/001_trade_rpc.sql
+--
+-- 매수/매도를 서버에서 한 번에 처리하는 PostgREST RPC
+-- (조회 → 평단가 계산 → PATCH/POST/DELETE 를 여러 번 왕복하던 것을 단일 트랜잭션으로)
+-- Supabase SQL Editor에서 실행하면 /rest/v1/rpc/trade_buy, /rest/v1/rpc/trade_sell 로 노출됩니다.
+
+-- on conflict 대상이 되도록 종목당 한 행 보장
+create unique index if not exists portfolio_symbol_key on public.portfolio (symbol);
+
+-- created_at은 최초 매수 시각으로 두고, 이후 변경 시각은 updated_at에 기록
+alter table public.portfolio add column if not exists updated_at timestamptz;
+
+-- 매수: 없으면 insert, 있으면 수량 합산 + 가중 평단가 갱신 (행 잠금 안에서 계산되므로 동시 매수도 안전)
+create or replace function public.trade_buy(p_symbol text, p_quantity integer, p_price numeric)
+returns public.portfolio
+language plpgsql
+as $$
+declare
+    result public.portfolio;
+begin
+    if p_quantity is null or p_quantity <= 0 or p_price is null or p_price <= 0 then
+        raise exception 'invalid_order' using errcode = 'P0001', detail = 'quantity and price must be positive';
+    end if;
+
+    insert into public.portfolio as p (symbol, quantity, purchase_price, created_at, updated_at)
+    values (p_symbol, p_quantity, p_price, now(), now())
+    on conflict (symbol) do update
+        set purchase_price = (p.purchase_price * p.quantity + excluded.purchase_price * excluded.quantity)
+                             / (p.quantity + excluded.quantity),
+            quantity       = p.quantity + excluded.quantity,
+            updated_at     = now()
+    returning * into result;
+
+    return result;
+end;
+$$;
+
+-- 매도: 보유 행을 잠그고 수량 검증 후 차감, 0이 되면 삭제
+-- 반환: 남은 포지션 (전량 매도 시 quantity = 0, deleted = true)
+create or replace function public.trade_sell(p_symbol text, p_quantity integer)
+returns json
+language plpgsql
+as $$
+declare
+    held public.portfolio;
+    remaining integer;
+begin
+    if p_quantity is null or p_quantity <= 0 then
+        raise exception 'invalid_order' using errcode = 'P0001', detail = 'quantity must be positive';
+    end if;
+
+    select * into held from public.portfolio where symbol = p_symbol for update;
+    if not found then
+        raise exception 'not_held' using errcode = 'P0001', detail = '0';
+    end if;
+    if held.quantity < p_quantity then
+        raise exception 'insufficient_quantity' using errcode = 'P0001', detail = held.quantity::text;
+    end if;
+
+    remaining := held.quantity - p_quantity;
+    if remaining = 0 then
+        delete from public.portfolio where symbol = p_symbol;
+    else
+        update public.portfolio set quantity = remaining, updated_at = now() where symbol = p_symbol;
+    end if;
+
+    return json_build_object(
+        'symbol', p_symbol,
+        'quantity', remaining,
+        'purchase_price', held.purchase_price,
+        'deleted', remaining = 0
+    );
+end;
+$$;
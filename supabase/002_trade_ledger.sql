@@ -0,0 +1,130 @@
+-- FINAL_PROJECT/supabase/002_trade_ledger.sql
+--
+-- 추가 전용(append-only) 거래 원장 + 주기적 포지션 스냅샷
+-- - trades: 모든 체결을 덮어쓰지 않고 한 줄씩 기록 (portfolio는 현재 상태 캐시로 유지)
+-- - position_snapshots: 특정 거래 id까지 접어 둔 포지션 (tools/ledger_tool.py가 주기적으로 기록)
+--   → 현재/과거 시점 포지션 = 그 시점 이전 마지막 스냅샷 + 이후 거래만 접기
+-- 001_trade_rpc.sql 다음에 실행하세요. trade_buy / trade_sell 을 원장 기록 버전으로 교체합니다.
+
+create table if not exists public.trades (
+    id          bigserial primary key,
+    symbol      text        not null,
+    side        text        not null check (side in ('buy', 'sell')),
+    quantity    integer     not null check (quantity > 0),
+    price       numeric,                                -- 매도 가격을 모르면 NULL (실현손익 미반영)
+    executed_at timestamptz not null default now()
+);
+create index if not exists trades_executed_at_idx on public.trades (executed_at);
+
+create table if not exists public.position_snapshots (
+    id            bigserial primary key,
+    last_trade_id bigint      not null,                 -- 이 id까지의 거래가 반영됨
+    taken_at      timestamptz not null,                 -- last_trade_id 거래의 체결 시각
+    positions     jsonb       not null,                 -- {symbol: {quantity, avg_cost, realized_pnl}}
+    recent_ids    jsonb                                 -- last_trade_id 직전 재확인 구간에서 이미 반영된 거래 id 목록
+);
+alter table public.position_snapshots add column if not exists recent_ids jsonb;
+create unique index if not exists position_snapshots_last_trade_idx on public.position_snapshots (last_trade_id);
+
+-- 기존 보유분을 원장의 시작 잔고로 이관: portfolio의 각 종목을 평단가 기준 'buy' 한 건으로 기록
+-- (원장이 비어 있을 때만 실행 → 마이그레이션을 다시 돌려도 중복되지 않음)
+-- 이관하지 않으면 원장에 매수 없이 매도만 남아 포지션이 음수가 됨
+insert into public.trades (symbol, side, quantity, price, executed_at)
+select symbol, 'buy', quantity, purchase_price, coalesce(created_at, now())
+from public.portfolio
+where quantity > 0
+  and not exists (select 1 from public.trades)
+order by coalesce(created_at, now()), symbol;
+
+-- 원장은 수정/삭제 금지
+create or replace function public.trades_append_only() returns trigger
+language plpgsql
+as $$
+begin
+    raise exception 'trades is append-only';
+end;
+$$;
+drop trigger if exists trades_append_only on public.trades;
+create trigger trades_append_only before update or delete on public.trades
+    for each row execute function public.trades_append_only();
+
+-- 매수: 001 버전 + 원장 기록 (반환 타입이 바뀌므로 먼저 삭제)
+drop function if exists public.trade_buy(text, integer, numeric);
+create or replace function public.trade_buy(p_symbol text, p_quantity integer, p_price numeric)
+returns json
+language plpgsql
+as $$
+declare
+    result public.portfolio;
+    trade_id bigint;
+begin
+    if p_quantity is null or p_quantity <= 0 or p_price is null or p_price <= 0 then
+        raise exception 'invalid_order' using errcode = 'P0001', detail = 'quantity and price must be positive';
+    end if;
+
+    insert into public.portfolio as p (symbol, quantity, purchase_price, created_at, updated_at)
+    values (p_symbol, p_quantity, p_price, now(), now())
+    on conflict (symbol) do update
+        set purchase_price = (p.purchase_price * p.quantity + excluded.purchase_price * excluded.quantity)
+                             / (p.quantity + excluded.quantity),
+            quantity       = p.quantity + excluded.quantity,
+            updated_at     = now()
+    returning * into result;
+
+    insert into public.trades (symbol, side, quantity, price)
+    values (p_symbol, 'buy', p_quantity, p_price)
+    returning id into trade_id;
+
+    return json_build_object(
+        'symbol', result.symbol,
+        'quantity', result.quantity,
+        'purchase_price', result.purchase_price,
+        'trade_id', trade_id
+    );
+end;
+$$;
+
+-- 매도: 001 버전 + 매도 가격(선택) + 원장 기록 + 실현손익 반환
+drop function if exists public.trade_sell(text, integer);
+create or replace function public.trade_sell(p_symbol text, p_quantity integer, p_price numeric default null)
+returns json
+language plpgsql
+as $$
+declare
+    held public.portfolio;
+    remaining integer;
+    trade_id bigint;
+begin
+    if p_quantity is null or p_quantity <= 0 or (p_price is not null and p_price <= 0) then
+        raise exception 'invalid_order' using errcode = 'P0001', detail = 'quantity and price must be positive';
+    end if;
+
+    select * into held from public.portfolio where symbol = p_symbol for update;
+    if not found then
+        raise exception 'not_held' using errcode = 'P0001', detail = '0';
+    end if;
+    if held.quantity < p_quantity then
+        raise exception 'insufficient_quantity' using errcode = 'P0001', detail = held.quantity::text;
+    end if;
+
+    remaining := held.quantity - p_quantity;
+    if remaining = 0 then
+        delete from public.portfolio where symbol = p_symbol;
+    else
+        update public.portfolio set quantity = remaining, updated_at = now() where symbol = p_symbol;
+    end if;
+
+    insert into public.trades (symbol, side, quantity, price)
+    values (p_symbol, 'sell', p_quantity, p_price)
+    returning id into trade_id;
+
+    return json_build_object(
+        'symbol', p_symbol,
+        'quantity', remaining,
+        'purchase_price', held.purchase_price,
+        'deleted', remaining = 0,
+        'realized_pnl', case when p_price is null then null else (p_price - held.purchase_price) * p_quantity end,
+        'trade_id', trade_id
+    );
+end;
+$$;
@@ -0,0 +1,43 @@
+-- FINAL_PROJECT/supabase/003_trade_batch.sql
+--
+-- 여러 건의 매수/매도 주문(leg)을 한 번의 요청·하나의 트랜잭션으로 처리하는 RPC
+-- p_legs: [{"side": "buy"|"sell", "symbol": "AAPL", "quantity": 10, "price": 200.5}, ...]
+-- 앞에서부터 순서대로 trade_buy / trade_sell 을 호출하며, 하나라도 실패하면 전체가 롤백됩니다.
+-- 실패 시 hint 에 'leg:<0부터 시작하는 순번>' 을 담아 어느 주문이 거절됐는지 알려줍니다.
+-- 002_trade_ledger.sql 다음에 실행하세요.
+
+create or replace function public.trade_batch(p_legs jsonb)
+returns json
+language plpgsql
+as $$
+declare
+    leg jsonb;
+    idx integer := 0;
+    results jsonb := '[]'::jsonb;
+    result json;
+    err_detail text;
+begin
+    if p_legs is null or jsonb_typeof(p_legs) <> 'array' or jsonb_array_length(p_legs) = 0 then
+        raise exception 'invalid_order' using errcode = 'P0001', detail = 'legs must be a non-empty array';
+    end if;
+
+    for leg in select * from jsonb_array_elements(p_legs) loop
+        begin
+            if leg->>'side' = 'buy' then
+                result := public.trade_buy(leg->>'symbol', (leg->>'quantity')::integer, (leg->>'price')::numeric);
+            elsif leg->>'side' = 'sell' then
+                result := public.trade_sell(leg->>'symbol', (leg->>'quantity')::integer, (leg->>'price')::numeric);
+            else
+                raise exception 'invalid_order' using errcode = 'P0001', detail = 'side must be buy or sell';
+            end if;
+        exception when others then
+            get stacked diagnostics err_detail = pg_exception_detail;
+            raise exception '%', sqlerrm using errcode = 'P0001', detail = err_detail, hint = 'leg:' || idx;
+        end;
+        results := results || jsonb_build_array(jsonb_build_object('side', leg->>'side') || result::jsonb);
+        idx := idx + 1;
+    end loop;
+
+    return results::json;
+end;
+$$;
@@ -0,0 +1,30 @@
+-- FINAL_PROJECT/supabase/004_portfolio_version.sql
+--
+-- 포트폴리오 변경 감지용 RPC (tools/asset_summary_tool.py 의 PortfolioMirror 가 사용)
+-- 행 수 / 최신 updated_at / 전체 행 digest 를 한 번에 돌려주므로, 값이 같으면 표를 다시 받지 않아도 됩니다.
+-- 001 이전에 만들어진 행은 updated_at 이 비어 있으므로 created_at(없으면 현재 시각)으로 채우고,
+-- 이후 직접 insert 하는 행도 updated_at 이 비지 않도록 기본값을 둡니다.
+-- 003_trade_batch.sql 다음에 실행하세요.
+
+update public.portfolio
+set updated_at = coalesce(created_at, now())
+where updated_at is null;
+
+alter table public.portfolio alter column updated_at set default now();
+
+create or replace function public.portfolio_version()
+returns json
+language sql
+stable
+as $$
+    select json_build_object(
+        'count', count(*),
+        'max_updated_at', max(updated_at),
+        -- 삭제·수정·늦게 커밋된 행까지 잡기 위해 내용 전체의 digest 를 함께 비교
+        'digest', md5(coalesce(string_agg(
+            symbol || ':' || quantity || ':' || purchase_price || ':' || coalesce(updated_at::text, ''),
+            ',' order by symbol
+        ), ''))
+    )
+    from public.portfolio;
+$$;
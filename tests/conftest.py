@@ -0,0 +1,28 @@
+# FINAL_PROJECT/tests/conftest.py
+
+# 저장소 루트와 tests/를 import 경로에 추가 (tools.*, fake_postgrest 를 그대로 import) + 로컬 PostgREST 대역 픽스처
+
+import os
+import sys
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TESTS_DIR))
+sys.path.insert(0, TESTS_DIR)
+
+from fake_postgrest import FakeDatabase, start  # noqa: E402
+
+
+@pytest.fixture
+def fake_db():
+    return FakeDatabase()
+
+
+@pytest.fixture
+def fake_postgrest(fake_db):
+    """(db, base_url). 테스트가 끝나면 서버 종료"""
+    server, url = start(fake_db)
+    yield fake_db, url
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,335 @@
+# FINAL_PROJECT/tests/fake_postgrest.py
+
+# 로컬 테스트용 PostgREST 대역 (메모리 저장소 + http.server)
+# - /rest/v1/<table> : GET/POST/PATCH/DELETE, 'col=eq|gt|gte|lt|lte.value' 필터, order/limit,
+#                      select 컬럼 지정, Prefer: return=representation
+# - /rest/v1/rpc/<fn>: supabase/*.sql 의 함수와 같은 의미로 동작하는 파이썬 구현
+# 사용 예)
+#   python tests/fake_postgrest.py --port 54321
+#   SUPABASE_URL=http://127.0.0.1:54321 SUPABASE_ANON_KEY=test python app.py
+
+import json
+import hashlib
+import argparse
+import datetime
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit, parse_qsl
+
+
+class RpcError(Exception):
+    """plpgsql의 raise exception에 해당 (PostgREST 오류 본문 형식으로 응답)"""
+
+    def __init__(self, message: str, details: Optional[str] = None, code: str = "P0001", status: int = 400,
+                 hint: Optional[str] = None):
+        super().__init__(message)
+        self.message = message
+        self.details = details
+        self.code = code
+        self.status = status
+        self.hint = hint
+
+    def body(self) -> Dict[str, Any]:
+        return {"code": self.code, "message": self.message, "details": self.details, "hint": self.hint}
+
+
+def _now() -> str:
+    return datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+
+class FakeDatabase:
+    """테이블별 행 목록. 모든 변경은 하나의 lock 안에서 실행되어 RPC가 트랜잭션처럼 원자적"""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.tables: Dict[str, List[Dict[str, Any]]] = {"portfolio": [], "trades": [], "position_snapshots": []}
+        self.rpcs: Dict[str, Callable[["FakeDatabase", Dict[str, Any]], Any]] = {}
+        self._next_id: Dict[str, int] = {}
+        self.register_rpc("trade_buy", _trade_buy)
+        self.register_rpc("trade_sell", _trade_sell)
+        self.register_rpc("trade_batch", _trade_batch)
+        self.register_rpc("portfolio_version", _portfolio_version)
+
+    def register_rpc(self, name: str, fn: Callable[["FakeDatabase", Dict[str, Any]], Any]) -> None:
+        self.rpcs[name] = fn
+
+    def table(self, name: str) -> List[Dict[str, Any]]:
+        return self.tables.setdefault(name, [])
+
+    def insert(self, name: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        row = dict(row)
+        if "id" not in row:
+            self._next_id[name] = self._next_id.get(name, 0) + 1
+            row["id"] = self._next_id[name]
+        self.table(name).append(row)
+        return row
+
+    def find(self, name: str, **eq) -> List[Dict[str, Any]]:
+        return [r for r in self.table(name) if all(r.get(k) == v for k, v in eq.items())]
+
+    def call(self, fn: str, params: Dict[str, Any]) -> Any:
+        if fn not in self.rpcs:
+            raise RpcError(f"Could not find the function public.{fn}", code="PGRST202", status=404)
+        with self.lock:
+            # 실패하면 변경 전 상태로 되돌림 (트랜잭션 롤백 흉내)
+            backup = {k: [dict(r) for r in v] for k, v in self.tables.items()}
+            ids = dict(self._next_id)
+            try:
+                return self.rpcs[fn](self, params)
+            except Exception:
+                self.tables, self._next_id = backup, ids
+                raise
+
+
+# -----------------------------
+# supabase/001 ~ 004 *.sql 과 같은 의미의 RPC
+# -----------------------------
+def _positive(value: Any, name: str) -> None:
+    if value is None or value <= 0:
+        raise RpcError("invalid_order", f"{name} must be positive")
+
+def _record_trade(db: FakeDatabase, symbol: str, side: str, quantity: int, price: Optional[float]) -> int:
+    row = db.insert("trades", {
+        "symbol": symbol, "side": side, "quantity": int(quantity),
+        "price": None if price is None else float(price), "executed_at": _now(),
+    })
+    return row["id"]
+
+
+def _trade_buy(db: FakeDatabase, params: Dict[str, Any]) -> Dict[str, Any]:
+    symbol, quantity, price = params.get("p_symbol"), params.get("p_quantity"), params.get("p_price")
+    _positive(quantity, "quantity")
+    _positive(price, "price")
+    rows = db.find("portfolio", symbol=symbol)
+    if not rows:
+        row = db.insert("portfolio", {
+            "symbol": symbol, "quantity": int(quantity), "purchase_price": float(price),
+            "created_at": _now(), "updated_at": _now(),
+        })
+    else:
+        row = rows[0]
+        total = row["quantity"] + quantity
+        row["purchase_price"] = (row["purchase_price"] * row["quantity"] + price * quantity) / total
+        row["quantity"] = total
+        row["updated_at"] = _now()
+    trade_id = _record_trade(db, symbol, "buy", quantity, price)
+    return {"symbol": symbol, "quantity": row["quantity"], "purchase_price": row["purchase_price"], "trade_id": trade_id}
+
+
+def _trade_sell(db: FakeDatabase, params: Dict[str, Any]) -> Dict[str, Any]:
+    symbol, quantity, price = params.get("p_symbol"), params.get("p_quantity"), params.get("p_price")
+    _positive(quantity, "quantity")
+    if price is not None:
+        _positive(price, "price")
+    rows = db.find("portfolio", symbol=symbol)
+    if not rows:
+        raise RpcError("not_held", "0")
+    row = rows[0]
+    if row["quantity"] < quantity:
+        raise RpcError("insufficient_quantity", str(row["quantity"]))
+    remaining = row["quantity"] - quantity
+    if remaining == 0:
+        db.table("portfolio").remove(row)
+    else:
+        row["quantity"] = remaining
+        row["updated_at"] = _now()
+    trade_id = _record_trade(db, symbol, "sell", quantity, price)
+    return {
+        "symbol": symbol, "quantity": remaining, "purchase_price": row["purchase_price"], "deleted": remaining == 0,
+        "realized_pnl": None if price is None else (price - row["purchase_price"]) * quantity,
+        "trade_id": trade_id,
+    }
+
+
+
+def _trade_batch(db: FakeDatabase, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """주문 목록을 순서대로 실행. 실패하면 hint='leg:<순번>'으로 거절 (롤백은 FakeDatabase.call이 담당)"""
+    legs = params.get("p_legs")
+    if not isinstance(legs, list) or not legs:
+        raise RpcError("invalid_order", "legs must be a non-empty array")
+    results = []
+    for idx, leg in enumerate(legs):
+        args = {"p_symbol": leg.get("symbol"), "p_quantity": leg.get("quantity"), "p_price": leg.get("price")}
+        try:
+            if leg.get("side") == "buy":
+                result = _trade_buy(db, args)
+            elif leg.get("side") == "sell":
+                result = _trade_sell(db, args)
+            else:
+                raise RpcError("invalid_order", "side must be buy or sell")
+        except RpcError as e:
+            raise RpcError(e.message, e.details, hint=f"leg:{idx}")
+        results.append({"side": leg["side"], **result})
+    return results
+
+
+def _portfolio_version(db: FakeDatabase, params: Dict[str, Any]) -> Dict[str, Any]:
+    """supabase/004_portfolio_version.sql: 행 수 / 최신 updated_at / 내용 digest"""
+    rows = sorted(db.table("portfolio"), key=lambda r: r.get("symbol") or "")
+    text = ",".join(f"{r.get('symbol')}:{r.get('quantity')}:{r.get('purchase_price')}:{r.get('updated_at') or ''}"
+                    for r in rows)
+    stamps = [r["updated_at"] for r in rows if r.get("updated_at")]
+    return {"count": len(rows), "max_updated_at": max(stamps) if stamps else None,
+            "digest": hashlib.md5(text.encode("utf-8")).hexdigest()}
+
+# -----------------------------
+# HTTP 계층
+# -----------------------------
+_OPS = {
+    "eq": lambda a, b: a == b,
+    "gt": lambda a, b: a > b,
+    "gte": lambda a, b: a >= b,
+    "lt": lambda a, b: a < b,
+    "lte": lambda a, b: a <= b,
+}
+_OPTIONS = {"select", "order", "limit", "offset", "on_conflict"}
+
+Filter = Tuple[str, str, str]  # (column, op, value)
+
+
+def _parse_filters(query: str) -> Tuple[List[Filter], Dict[str, str]]:
+    """('col=op.value' 필터 목록, select/order/limit 등 나머지 파라미터)"""
+    filters, options = [], {}
+    for key, value in parse_qsl(query, keep_blank_values=True):
+        op, _, operand = value.partition(".")
+        if key not in _OPTIONS and op in _OPS:
+            filters.append((key, op, operand))
+        else:
+            options[key] = value
+    return filters, options
+
+
+def _coerce(value: Any, operand: str) -> Tuple[Any, Any]:
+    """행 값의 타입에 맞춰 비교 (숫자는 숫자로, 나머지는 문자열로)"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        try:
+            return value, float(operand)
+        except ValueError:
+            pass
+    return str(value), operand
+
+
+def _matches(row: Dict[str, Any], filters: List[Filter]) -> bool:
+    for col, op, operand in filters:
+        value = row.get(col)
+        if value is None:
+            return False
+        a, b = _coerce(value, operand)
+        if not _OPS[op](a, b):
+            return False
+    return True
+
+
+def _apply_options(rows: List[Dict[str, Any]], options: Dict[str, str]) -> List[Dict[str, Any]]:
+    for spec in reversed([s for s in options.get("order", "").split(",") if s]):
+        col, _, direction = spec.partition(".")
+        rows.sort(key=lambda r: (r.get(col) is None, r.get(col)), reverse=direction.startswith("desc"))
+    offset = int(options.get("offset", 0))
+    limit = options.get("limit")
+    rows = rows[offset:offset + int(limit)] if limit else rows[offset:]
+    cols = [c for c in options.get("select", "*").split(",") if c and c != "*"]
+    return [{c: r.get(c) for c in cols} for r in rows] if cols else rows
+
+
+class _Handler(BaseHTTPRequestHandler):
+    db: FakeDatabase = None  # make_server에서 지정
+
+    def log_message(self, fmt, *args):  # 테스트 출력 조용히
+        pass
+
+    def _send(self, status: int, body: Any = None) -> None:
+        payload = b"" if body is None else json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        if payload:
+            self.wfile.write(payload)
+
+    def _body(self) -> Any:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"null") if length else None
+
+    def _route(self) -> Tuple[Optional[str], Optional[str], str]:
+        parts = urlsplit(self.path)
+        path = parts.path.rstrip("/")
+        if not path.startswith("/rest/v1/"):
+            return None, None, parts.query
+        rest = path[len("/rest/v1/"):]
+        if rest.startswith("rpc/"):
+            return None, rest[len("rpc/"):], parts.query
+        return rest, None, parts.query
+
+    def _want_rows(self) -> bool:
+        return "return=representation" in (self.headers.get("Prefer") or "")
+
+    def do_GET(self):
+        table, _, query = self._route()
+        if table is None:
+            return self._send(404, {"message": "not found"})
+        filters, options = _parse_filters(query)
+        with self.db.lock:
+            rows = [dict(r) for r in self.db.table(table) if _matches(r, filters)]
+        self._send(200, _apply_options(rows, options))
+
+    def do_POST(self):
+        table, fn, _ = self._route()
+        body = self._body()
+        if fn is not None:
+            try:
+                result = self.db.call(fn, body or {})
+            except RpcError as e:
+                return self._send(e.status, e.body())
+            return self._send(200, result)
+        if table is None:
+            return self._send(404, {"message": "not found"})
+        rows = body if isinstance(body, list) else [body or {}]
+        with self.db.lock:
+            created = [self.db.insert(table, r) for r in rows]
+        self._send(201, created if self._want_rows() else None)
+
+    def do_PATCH(self):
+        table, _, query = self._route()
+        filters, _ = _parse_filters(query)
+        changes = self._body() or {}
+        with self.db.lock:
+            updated = [r for r in self.db.table(table or "") if _matches(r, filters)]
+            for r in updated:
+                r.update(changes)
+            updated = [dict(r) for r in updated]
+        self._send(200, updated) if self._want_rows() else self._send(204)
+
+    def do_DELETE(self):
+        table, _, query = self._route()
+        filters, _ = _parse_filters(query)
+        with self.db.lock:
+            rows = self.db.table(table or "")
+            removed = [r for r in rows if _matches(r, filters)]
+            rows[:] = [r for r in rows if not _matches(r, filters)]
+        self._send(200, removed) if self._want_rows() else self._send(204)
+
+
+def make_server(db: Optional[FakeDatabase] = None, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    handler = type("FakePostgrestHandler", (_Handler,), {"db": db or FakeDatabase()})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def start(db: Optional[FakeDatabase] = None, host: str = "127.0.0.1", port: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    """백그라운드 스레드로 서버를 띄우고 (server, base_url)을 반환. 종료는 server.shutdown()"""
+    server = make_server(db, host, port)
+    threading.Thread(target=server.serve_forever, daemon=True, name="fake-postgrest").start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="로컬 테스트용 PostgREST 대역")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=54321)
+    args = parser.parse_args()
+    srv = make_server(host=args.host, port=args.port)
+    print(f"fake PostgREST: http://{args.host}:{args.port} (Ctrl+C로 종료)")
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
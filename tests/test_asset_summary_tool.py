@@ -0,0 +1,113 @@
+# FINAL_PROJECT/tests/test_asset_summary_tool.py
+
+# PortfolioMirror ↔ fake PostgREST: portfolio_version 이 그대로면 표를 다시 받지 않고, 바뀌면(삭제 포함) 전체 조회
+
+import asyncio
+
+import pytest
+
+asset_summary_tool = pytest.importorskip("tools.asset_summary_tool")
+from tools import http_client  # noqa: E402
+
+
+@pytest.fixture
+def mirror(fake_postgrest, monkeypatch):
+    db, url = fake_postgrest
+    monkeypatch.setattr(asset_summary_tool, "SUPABASE_URL", url)
+    monkeypatch.setattr(asset_summary_tool, "SUPABASE_ANON_KEY", "test")
+    calls = []
+    get, aget = http_client.get, http_client.aget
+
+    def counting_get(url, **kwargs):
+        calls.append(url)
+        return get(url, **kwargs)
+
+    async def counting_aget(url, **kwargs):
+        calls.append(url)
+        return await aget(url, **kwargs)
+
+    monkeypatch.setattr(http_client, "get", counting_get)
+    monkeypatch.setattr(http_client, "aget", counting_aget)
+    db.call("trade_buy", {"p_symbol": "AAPL", "p_quantity": 3, "p_price": 100.0})
+    db.call("trade_buy", {"p_symbol": "MSFT", "p_quantity": 1, "p_price": 300.0})
+    return db, asset_summary_tool.PortfolioMirror(), calls
+
+
+def _symbols(rows):
+    return sorted(r["symbol"] for r in rows)
+
+
+def test_unchanged_version_reuses_rows(mirror):
+    db, m, calls = mirror
+    assert _symbols(m.refresh()) == ["AAPL", "MSFT"]
+    assert _symbols(m.refresh()) == ["AAPL", "MSFT"]
+    assert len(calls) == 1
+
+
+def test_delete_and_edit_without_timestamp_refetch(mirror):
+    db, m, calls = mirror
+    m.refresh()
+    # 행 삭제: max(updated_at)은 그대로일 수 있지만 count/digest 가 달라짐
+    db.call("trade_sell", {"p_symbol": "MSFT", "p_quantity": 1, "p_price": None})
+    assert _symbols(m.refresh()) == ["AAPL"]
+    # updated_at 을 건드리지 않은 직접 수정도 digest 로 감지
+    db.find("portfolio", symbol="AAPL")[0]["quantity"] = 7
+    assert m.refresh()[0]["quantity"] == 7
+    assert len(calls) == 3
+
+
+def test_missing_version_rpc_falls_back_to_full_fetch(mirror):
+    db, m, calls = mirror
+    del db.rpcs["portfolio_version"]
+    m.refresh()
+    assert _symbols(m.refresh()) == ["AAPL", "MSFT"]
+    assert len(calls) == 2
+
+
+def test_arefresh_matches_refresh(mirror):
+    db, m, calls = mirror
+
+    async def run():
+        first = await m.arefresh()
+        second = await m.arefresh()
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert _symbols(first) == _symbols(second) == ["AAPL", "MSFT"]
+    assert len(calls) == 1
+
+
+@pytest.fixture
+def streaming(mirror, monkeypatch):
+    db, m, calls = mirror
+    events = []
+    monkeypatch.setattr(asset_summary_tool, "_mirror", m)
+    monkeypatch.setattr(asset_summary_tool, "_stream_writer", lambda: events.append)
+    monkeypatch.setattr(asset_summary_tool, "get_quote", lambda symbol: None)
+
+    async def aget_quote(symbol):
+        return None
+
+    monkeypatch.setattr(asset_summary_tool, "aget_quote", aget_quote)
+    # writer가 있으면 배치 조회는 쓰지 않음
+    monkeypatch.setattr(asset_summary_tool, "fetch_quotes", lambda *a, **k: pytest.fail("batch fetch"))
+    monkeypatch.setattr(asset_summary_tool, "afetch_quotes", lambda *a, **k: pytest.fail("batch fetch"))
+    return events
+
+
+def _assert_streamed_per_row(events, text):
+    rows = [e[asset_summary_tool.STREAM_KEY] for e in events]
+    # 머리글 → 행 2개 → 총계
+    assert len(rows) == 4
+    assert "(0/2)" in rows[0] and "(1/2)" in rows[1] and "(2/2)" in rows[2]
+    assert rows[-1] == text and "총계" in text
+
+
+def test_writer_streams_each_row(streaming):
+    text = asset_summary_tool.get_portfolio_summary.func()
+    _assert_streamed_per_row(streaming, text)
+
+
+def test_async_writer_streams_each_row(streaming):
+    text = asyncio.run(asset_summary_tool._aget_portfolio_summary())
+    _assert_streamed_per_row(streaming, text)
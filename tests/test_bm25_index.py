@@ -0,0 +1,56 @@
+# FINAL_PROJECT/tests/test_bm25_index.py
+
+# BM25 빌드는 새 하위 디렉터리에 쓰고 current.json 교체로 공개 → 재빌드 중/후에도 파일 크기가 어긋나지 않음
+
+import json
+import os
+
+import numpy as np
+
+from tools import bm25_index
+from tools.bm25_index import BM25Index, build_bm25_index, load_chunks
+
+
+def _chunks(n):
+    return [{"id": f"c{i}", "text": f"듀레이션 채권 {i} " + "금리 " * i, "page": i} for i in range(n)]
+
+
+def test_rebuild_swaps_whole_build(tmp_path):
+    path = str(tmp_path)
+    build_bm25_index(_chunks(3), path)
+    old = BM25Index.load(path)
+    assert len(old) == 3
+
+    build_bm25_index(_chunks(7), path)
+    # 이미 연 인덱스는 자기 빌드의 파일만 계속 사용
+    assert len(old.search("금리", 10)) == 2
+    new = BM25Index.load(path)
+    assert len(new) == 7 and len(load_chunks(path)) == 7
+    assert new.path != old.path
+
+
+def test_prune_keeps_recent_builds(tmp_path):
+    path = str(tmp_path)
+    for n in (2, 3, 4):
+        build_bm25_index(_chunks(n), path)
+    builds = sorted(d for d in os.listdir(path) if d.startswith(bm25_index.BUILD_PREFIX))
+    assert len(builds) == bm25_index.KEEP_BUILDS
+    with open(os.path.join(path, bm25_index.CURRENT_FILE), encoding="utf-8") as f:
+        assert json.load(f)["dir"] == builds[-1]
+    assert bm25_index.stamp_path(path).endswith(bm25_index.CURRENT_FILE)
+
+
+def test_legacy_layout_loads_and_mismatch_is_rejected(tmp_path):
+    path = str(tmp_path)
+    build_bm25_index(_chunks(3), path)
+    build = bm25_index.active_dir(path)
+    # current.json 없이 path 바로 아래에 파일이 있는 예전 배치
+    for name in os.listdir(build):
+        os.replace(os.path.join(build, name), os.path.join(path, name))
+    os.remove(os.path.join(path, bm25_index.CURRENT_FILE))
+    assert len(BM25Index.load(path)) == 3
+    assert bm25_index.stamp_path(path).endswith(bm25_index.META_FILE)
+
+    # 예전 방식으로 쓰는 도중(배열은 새 것, 청크는 옛 것) → 검색 중 IndexError 대신 로드하지 않음
+    np.save(os.path.join(path, "doc_len.npy"), np.zeros(5, dtype=np.float32))
+    assert BM25Index.load(path) is None
@@ -0,0 +1,94 @@
+# FINAL_PROJECT/tests/test_fake_postgrest.py
+
+# fake PostgREST의 거래 RPC: 매도 초과 거절, 일괄 주문 롤백, HTTP 오류 본문
+
+import pytest
+import requests
+
+from fake_postgrest import RpcError
+
+
+def _buy(db, symbol, quantity, price):
+    return db.call("trade_buy", {"p_symbol": symbol, "p_quantity": quantity, "p_price": price})
+
+
+def test_buy_averages_purchase_price(fake_db):
+    _buy(fake_db, "AAPL", 10, 100.0)
+    pos = _buy(fake_db, "AAPL", 10, 200.0)
+    assert pos["quantity"] == 20
+    assert pos["purchase_price"] == pytest.approx(150.0)
+    assert [t["side"] for t in fake_db.table("trades")] == ["buy", "buy"]
+
+
+def test_oversell_is_rejected_without_changes(fake_db):
+    _buy(fake_db, "AAPL", 3, 100.0)
+    with pytest.raises(RpcError) as exc:
+        fake_db.call("trade_sell", {"p_symbol": "AAPL", "p_quantity": 5, "p_price": 110.0})
+    assert exc.value.message == "insufficient_quantity"
+    assert exc.value.details == "3"
+    assert fake_db.find("portfolio", symbol="AAPL")[0]["quantity"] == 3
+    assert len(fake_db.table("trades")) == 1
+
+
+def test_sell_not_held(fake_db):
+    with pytest.raises(RpcError) as exc:
+        fake_db.call("trade_sell", {"p_symbol": "TSLA", "p_quantity": 1, "p_price": None})
+    assert exc.value.message == "not_held"
+
+
+def test_sell_all_removes_position(fake_db):
+    _buy(fake_db, "AAPL", 3, 100.0)
+    result = fake_db.call("trade_sell", {"p_symbol": "AAPL", "p_quantity": 3, "p_price": 120.0})
+    assert result["deleted"] is True
+    assert result["realized_pnl"] == pytest.approx(60.0)
+    assert fake_db.find("portfolio", symbol="AAPL") == []
+
+
+def test_batch_rolls_back_every_leg_on_failure(fake_db):
+    _buy(fake_db, "AAPL", 3, 100.0)
+    before = {k: [dict(r) for r in v] for k, v in fake_db.tables.items()}
+    legs = [
+        {"side": "buy", "symbol": "MSFT", "quantity": 2, "price": 300.0},
+        {"side": "sell", "symbol": "AAPL", "quantity": 5, "price": 110.0},
+    ]
+    with pytest.raises(RpcError) as exc:
+        fake_db.call("trade_batch", {"p_legs": legs})
+    assert exc.value.message == "insufficient_quantity"
+    assert exc.value.hint == "leg:1"
+    # 앞선 매수 leg도 함께 취소
+    assert fake_db.tables == before
+    # 롤백된 id는 다시 쓰임 (실제 DB의 시퀀스와 달리 대역은 id도 되돌림)
+    assert _buy(fake_db, "MSFT", 1, 300.0)["trade_id"] == 2
+
+
+def test_batch_applies_all_legs_in_order(fake_db):
+    _buy(fake_db, "AAPL", 3, 100.0)
+    results = fake_db.call("trade_batch", {"p_legs": [
+        {"side": "sell", "symbol": "AAPL", "quantity": 3, "price": 110.0},
+        {"side": "buy", "symbol": "MSFT", "quantity": 2, "price": 300.0},
+    ]})
+    assert [r["side"] for r in results] == ["sell", "buy"]
+    assert fake_db.find("portfolio", symbol="AAPL") == []
+    assert fake_db.find("portfolio", symbol="MSFT")[0]["quantity"] == 2
+
+
+def test_batch_rejects_invalid_leg(fake_db):
+    with pytest.raises(RpcError) as exc:
+        fake_db.call("trade_batch", {"p_legs": [
+            {"side": "buy", "symbol": "AAPL", "quantity": 1, "price": 100.0},
+            {"side": "hold", "symbol": "AAPL", "quantity": 1, "price": 100.0},
+        ]})
+    assert exc.value.message == "invalid_order"
+    assert exc.value.hint == "leg:1"
+    assert fake_db.table("portfolio") == []
+
+
+def test_http_error_body(fake_postgrest):
+    db, url = fake_postgrest
+    r = requests.post(f"{url}/rest/v1/rpc/trade_sell", json={"p_symbol": "AAPL", "p_quantity": 1, "p_price": None})
+    assert r.status_code == 400
+    assert r.json() == {"code": "P0001", "message": "not_held", "details": "0", "hint": None}
+
+    r = requests.post(f"{url}/rest/v1/rpc/nope", json={})
+    assert r.status_code == 404
+    assert r.json()["code"] == "PGRST202"
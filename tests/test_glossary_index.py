@@ -0,0 +1,69 @@
+# FINAL_PROJECT/tests/test_glossary_index.py
+
+# 표제어 색인: 오타는 근사 일치, 첫 음절이 다른 비슷한 용어는 다른 용어로 취급
+
+import pytest
+
+from tools.glossary_index import GlossaryEntry, GlossaryIndex
+
+
+def _entry(headword, *aliases):
+    return GlossaryEntry(headword, aliases, headword + " 설명", 0)
+
+
+@pytest.fixture
+def glossary():
+    return GlossaryIndex([
+        _entry("디플레이션"),
+        _entry("인플레이션"),
+        _entry("듀레이션(Duration)", "듀레이션", "Duration"),
+        _entry("국채"),
+        _entry("금리"),
+    ], build_id="test")
+
+
+@pytest.mark.parametrize("query", [
+    "리플레이션이 뭐야?",   # ≠ 디플레이션
+    "딘플레이션",           # 첫 음절이 다름
+    "국내가 뭐야",          # 2음절은 정확 일치만
+    "금지 뜻",
+])
+def test_confusable_terms_do_not_match(glossary, query):
+    assert glossary.match(query) is None
+
+
+@pytest.mark.parametrize("query, headword", [
+    ("디플래이션", "디플레이션"),
+    ("인플래이션이 뭐야?", "인플레이션"),
+    ("듀래이션 뜻", "듀레이션(Duration)"),
+])
+def test_typos_match_fuzzily(glossary, query, headword):
+    m = glossary.match(query)
+    assert m is not None and m.fuzzy
+    assert m.entry.headword == headword
+
+
+def test_exact_match_is_not_fuzzy(glossary):
+    m = glossary.match("디플레이션이 뭐야?")
+    assert m.entry.headword == "디플레이션" and not m.fuzzy
+    assert glossary.match("Duration").entry.headword == "듀레이션(Duration)"
+
+
+def test_fuzzy_hit_uses_query_and_skips_answer_cache(glossary, tmp_path, monkeypatch):
+    # 모듈 import 시 임베딩 클라이언트를 만들므로 키만 채워 둠 (네트워크 호출 없음)
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    term = pytest.importorskip("tools.term_explain_tool")
+    monkeypatch.setattr(term, "TERM_ANSWER_CACHE", True)
+    service = term.TermExplainService()
+    service._answers = term.TermAnswerCache("test", str(tmp_path / "answers.sqlite3"))
+    monkeypatch.setattr(service, "glossary", lambda: glossary)
+
+    fuzzy = service.lookup_entry("디플래이션")
+    assert fuzzy.fuzzy and term._entry_question("디플래이션", fuzzy) == "디플래이션"
+    service._store_answer(fuzzy, "answer")
+    exact = service.lookup_entry("디플레이션")
+    assert service._cached_answer(exact) is None
+    assert term._entry_question("디플레이션?", exact) == "디플레이션"
+    service._store_answer(exact, "answer")
+    assert service._cached_answer(exact) == "answer"
+    assert service._cached_answer(fuzzy) is None
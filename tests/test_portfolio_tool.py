@@ -0,0 +1,111 @@
+# FINAL_PROJECT/tests/test_portfolio_tool.py
+
+# portfolio_tool ↔ fake PostgREST: RPC 오류 → TradeError, 일괄 주문의 'leg:N' → 몇 번째 주문인지 안내
+
+import pytest
+
+# langchain/pydantic 등 앱 의존성이 없는 환경에서는 건너뜀
+portfolio_tool = pytest.importorskip("tools.portfolio_tool")
+TradeError = portfolio_tool.TradeError
+
+
+@pytest.fixture
+def supabase(fake_postgrest, monkeypatch):
+    db, url = fake_postgrest
+    monkeypatch.setattr(portfolio_tool, "SUPABASE_URL", url)
+    monkeypatch.setattr(portfolio_tool, "SUPABASE_ANON_KEY", "test")
+    # 종목 해석은 입력 그대로 (네트워크 없이)
+    monkeypatch.setattr(portfolio_tool, "resolve_symbols", lambda names: {n: n for n in names})
+    return db
+
+
+def test_trade_error_leg():
+    assert TradeError("x", hint="leg:2").leg == 2
+    assert TradeError("x", hint="leg:abc").leg is None
+    assert TradeError("x").leg is None
+
+
+def test_rpc_maps_error_body_to_trade_error(supabase):
+    with pytest.raises(TradeError) as exc:
+        portfolio_tool._rpc("trade_sell", portfolio_tool._sell_params("AAPL", 1, 100.0))
+    assert exc.value.message == "not_held"
+    assert exc.value.leg is None
+
+
+def test_rpc_batch_error_carries_leg(supabase):
+    portfolio_tool._rpc("trade_buy", portfolio_tool._buy_params("AAPL", 3, 100.0))
+    legs = [
+        {"side": "buy", "symbol": "MSFT", "quantity": 2, "price": 300.0},
+        {"side": "sell", "symbol": "AAPL", "quantity": 5, "price": 110.0},
+    ]
+    with pytest.raises(TradeError) as exc:
+        portfolio_tool._rpc("trade_batch", {"p_legs": legs})
+    assert exc.value.leg == 1
+    msg = portfolio_tool._batch_error_message(legs, exc.value)
+    assert msg.startswith("❌ 2번째 주문(AAPL 5주 매도)이 거절되어 전체 주문이 취소되었습니다")
+    assert "보유 수량(3주)" in msg
+
+
+def test_batch_error_message_without_leg():
+    legs = [{"side": "buy", "symbol": "AAPL", "quantity": 1, "price": 1.0}]
+    msg = portfolio_tool._batch_error_message(legs, TradeError("boom", hint="leg:5"))
+    assert msg == "❌ 일괄 주문 처리에 실패하여 전체 주문이 취소되었습니다: boom"
+
+
+def test_prepare_legs_validation():
+    prepared, error = portfolio_tool._prepare_legs([{"side": "buy", "symbol": " ", "quantity": 0}])
+    assert prepared is None
+    assert "1번째 주문: 종목이 비어 있습니다." in error
+    assert "1번째 주문: 수량은 0보다 커야 합니다." in error
+
+
+def test_place_orders_oversell_rolls_back(supabase):
+    portfolio_tool._rpc("trade_buy", portfolio_tool._buy_params("AAPL", 3, 100.0))
+    msg = portfolio_tool.place_orders.invoke({"legs": [
+        {"side": "buy", "symbol": "MSFT", "quantity": 2, "price": 300.0},
+        {"side": "sell", "symbol": "AAPL", "quantity": 5, "price": 110.0},
+    ]})
+    assert msg.startswith("❌ 2번째 주문(AAPL 5주 매도)")
+    assert supabase.find("portfolio", symbol="MSFT") == []
+    assert supabase.find("portfolio", symbol="AAPL")[0]["quantity"] == 3
+    assert len(supabase.table("trades")) == 1
+
+
+def test_place_orders_success(supabase):
+    portfolio_tool._rpc("trade_buy", portfolio_tool._buy_params("AAPL", 3, 100.0))
+    msg = portfolio_tool.place_orders.invoke({"legs": [
+        {"side": "sell", "symbol": "AAPL", "quantity": 3, "price": 110.0},
+        {"side": "buy", "symbol": "MSFT", "quantity": 2, "price": 300.0},
+    ]})
+    assert msg.startswith("✅ 주문 2건을 한 번에 처리했습니다.")
+    assert supabase.find("portfolio", symbol="AAPL") == []
+    assert supabase.find("portfolio", symbol="MSFT")[0]["quantity"] == 2
+
+
+def test_sell_without_price_checks_holding_before_quote(supabase, monkeypatch):
+    fetched = []
+
+    def fake_quote(symbol):
+        fetched.append(symbol)
+        return None
+
+    monkeypatch.setattr(portfolio_tool, "fetch_quote", fake_quote)
+    assert portfolio_tool.sell_stock.invoke({"action_input": "AAPL,1"}).startswith("❌ AAPL을(를) 보유하고 있지 않아")
+    portfolio_tool._rpc("trade_buy", portfolio_tool._buy_params("AAPL", 3, 100.0))
+    assert "보유 수량(3주)" in portfolio_tool.sell_stock.invoke({"action_input": "AAPL,5"})
+    assert fetched == []
+    # 팔 수 있는 주문만 시세를 조회 (실패하면 가격 없이 기록)
+    assert portfolio_tool.sell_stock.invoke({"action_input": "AAPL,1"}).startswith("✅ AAPL 1주를 매도했습니다.")
+    assert fetched == ["AAPL"]
+    assert supabase.table("trades")[-1]["price"] is None
+
+
+def test_rpc_result_non_json_bodies_raise_trade_error():
+    import httpx
+
+    for status in (200, 502):
+        response = httpx.Response(status, content=b"<html>bad gateway</html>")
+        with pytest.raises(TradeError) as exc:
+            portfolio_tool._rpc_result(response)
+        assert f"HTTP {status}" in exc.value.message
+    assert portfolio_tool._rpc_result(httpx.Response(200, json={"ok": True})) == {"ok": True}
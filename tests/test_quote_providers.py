@@ -0,0 +1,51 @@
+# FINAL_PROJECT/tests/test_quote_providers.py
+
+# ProviderEngine 서킷: 모두 열려 있으면 강제 시도 없이 바로 실패, 배치 소스도 call()로 통계/서킷에 기록
+
+import asyncio
+
+from tools.quote_providers import OPEN, ProviderEngine, provider
+
+
+def _engine():
+    return ProviderEngine(hedge_delay=0.05, failure_threshold=1, cooldown=60)
+
+
+def _failing(calls, name):
+    @provider(name)
+    def fn(*args):
+        calls.append(name)
+        raise ConnectionError("down")
+    return fn
+
+
+def test_all_open_fails_fast_without_calling():
+    engine, calls = _engine(), []
+    a, b = _failing(calls, "a"), _failing(calls, "b")
+    assert engine.fetch([a, b], "AAPL") == (None, None)
+    assert sorted(calls) == ["a", "b"]
+    assert {st["state"] for st in engine.stats().values()} == {OPEN}
+    # cooldown 중에는 어느 소스도 다시 호출하지 않음 (동기/비동기 모두)
+    assert engine.fetch([a, b], "AAPL") == (None, None)
+
+    async def afail(*args):
+        calls.append("async")
+        return 1.0
+
+    assert asyncio.run(engine.afetch([provider("a")(afail)], "AAPL")) == (None, None)
+    assert sorted(calls) == ["a", "b"]
+
+
+def test_call_records_batch_failures_and_empty_results():
+    engine, calls = _engine(), []
+    batch = _failing(calls, "batch")
+    assert engine.call(batch, ["AAPL"], default={}) == {}
+    assert engine.stats()["batch"]["state"] == OPEN
+    # 서킷이 열려 있으면 호출하지 않고 default
+    assert engine.call(batch, ["AAPL"], default={}) == {}
+    assert calls == ["batch"]
+
+    empty = provider("empty")(lambda syms: {})
+    assert engine.call(empty, ["AAPL"], default={}) == {}
+    st = engine.stats()["empty"]
+    assert st["empty"] == 1 and st["consecutive_failures"] == 0
@@ -0,0 +1,24 @@
+# FINAL_PROJECT/tests/test_stock_price_tool.py
+
+# fetch_quotes 입력 해석: 이미 해석된 티커는 다시 종목 인덱스를 거치지 않음
+
+import pytest
+
+stock_price_tool = pytest.importorskip("tools.stock_price_tool")
+
+
+def test_resolved_inputs_skip_resolution(monkeypatch):
+    def fail(names):
+        raise AssertionError(f"resolve_symbols called with {names}")
+
+    monkeypatch.setattr(stock_price_tool, "resolve_symbols", fail)
+    assert stock_price_tool._resolve_inputs(["SM", "SOIL"], True) == {"SM": "SM", "SOIL": "SOIL"}
+    assert stock_price_tool._resolve_inputs(["005930.KS", "035720.kq"], False) == {
+        "005930.KS": "005930.KS", "035720.kq": "035720.KQ",
+    }
+
+
+def test_names_are_resolved(monkeypatch):
+    monkeypatch.setattr(stock_price_tool, "resolve_symbols", lambda names: {n: "AAPL" for n in names})
+    assert stock_price_tool._resolve_inputs(["애플", "005930.KS"], False) == {"애플": "AAPL", "005930.KS": "005930.KS"}
+
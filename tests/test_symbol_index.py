@@ -0,0 +1,63 @@
+# FINAL_PROJECT/tests/test_symbol_index.py
+
+# 로컬 종목 인덱스: 티커 입력은 티커 열만, 우선주 등 덧붙인 이름은 다른 종목으로 근사 일치하지 않음
+
+import pytest
+
+from tools.resolver_cache import ResolverCache
+from tools.symbol_index import get_symbol_index
+
+
+@pytest.fixture
+def index():
+    return get_symbol_index()
+
+
+def test_ticker_column_only(index):
+    # 'SM'(SM Energy), 'SOIL'은 이름/별칭(에스엠의 'SM', S-Oil → 'soil')과 대조하지 않음
+    assert index.ticker("SM") is None
+    assert index.ticker("SOIL") is None
+    assert index.ticker("aapl") == "AAPL"
+    assert index.ticker("005930") == "005930.KS"
+    assert index.ticker("BRK.B") == "BRK-B"
+
+
+def test_preferred_share_not_fuzzy_matched_to_common(index):
+    assert index.lookup("삼성전자우") is None
+    assert all(sym != "005930.KS" for _, sym in index.fuzzy("삼성전자우"))
+    # 오타는 여전히 근사 일치
+    assert index.lookup("삼성전ㅈ") == "005930.KS"
+
+
+def test_short_partial_input(index):
+    assert index.lookup("애") is None
+    assert index.lookup("애플") == "AAPL"
+
+
+def test_resolver_keeps_ticker_input(tmp_path, monkeypatch):
+    resolver = pytest.importorskip("tools.symbol_resolver")
+    monkeypatch.setattr(resolver, "_memo", ResolverCache(str(tmp_path / "resolver.sqlite3")))
+    for text in ("SM", "SOIL"):
+        done, sym, up, _, _ = resolver._resolve_local(text)
+        assert not done and sym is None and up == text
+        # 인덱스에서 못 찾은 티커는 티커 그대로 (STRICT가 아니면 검증 없이)
+        monkeypatch.setattr(resolver, "STRICT", False)
+        assert resolver._resolve_uncached(text, up)[0] == text
+    done, sym, _, _, _ = resolver._resolve_local("삼성전자우")
+    assert sym != "005930.KS"
+    assert resolver._resolve_local("삼성전자")[1] == "005930.KS"
+
+
+def test_resolver_memo_keeps_ticker_punctuation(tmp_path, monkeypatch):
+    resolver = pytest.importorskip("tools.symbol_resolver")
+    monkeypatch.setattr(resolver, "_memo", ResolverCache(str(tmp_path / "resolver.sqlite3")))
+    # 인덱스에 없는 클래스 주식 표기: '.'과 '-'가 다른 메모 키
+    assert resolver._memo_key("ZZQ.A") != resolver._memo_key("ZZQ-A")
+    assert resolver._memo_key("애플 주식") == resolver._memo_key("애플주식")
+    resolver._memo.put(resolver._memo_key("ZZQ-A"), "ZZQ-A", "ticker")
+    assert resolver._resolve_local("ZZQ-A")[:2] == (True, "ZZQ-A")
+    assert resolver._resolve_local("ZZQ.A")[0] is False
+
+    # 비동기 경로도 같은 로컬 단계 (워커 스레드에서)
+    import asyncio
+    assert asyncio.run(resolver._aresolve_symbol("ZZQ-A")) == "ZZQ-A"
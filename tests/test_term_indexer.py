@@ -0,0 +1,27 @@
+# FINAL_PROJECT/tests/test_term_indexer.py
+
+# 해시 id 도입 전 문서(chunk_id 메타데이터 없음)는 인덱싱 전에 지워져 중복으로 남지 않음
+
+import uuid
+
+import pytest
+
+
+@pytest.fixture
+def term_indexer(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    return pytest.importorskip("tools.term_indexer")
+
+
+def test_purge_legacy_removes_docs_without_chunk_id(term_indexer):
+    Chroma = pytest.importorskip("langchain_chroma").Chroma
+    from langchain_core.embeddings import FakeEmbeddings
+
+    vs = Chroma(collection_name=f"t{uuid.uuid4().hex}", embedding_function=FakeEmbeddings(size=8))
+    vs.add_texts(["a", "b", "c"], metadatas=[{"page": 1}, {"page": 2}, {}])
+    new_ids = [term_indexer.chunk_id(t) for t in ("d", "e")]
+    vs.add_texts(["d", "e"], metadatas=[{"chunk_id": i} for i in new_ids], ids=new_ids)
+
+    assert term_indexer._purge_legacy(vs, page=2) == 3
+    assert sorted(vs.get(include=[])["ids"]) == sorted(new_ids)
+    assert term_indexer._purge_legacy(vs, page=2) == 0
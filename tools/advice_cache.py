@@ -0,0 +1,148 @@
+# FINAL_PROJECT/tools/advice_cache.py
+
+# 종목 조언(LLM 결과) 캐시 (SQLite)
+# - 키: (프롬프트 버전, 티커, 해당 시장 기준 거래일, 가격 구간)
+#   → 같은 날 가격이 거의 그대로면 LLM을 다시 부르지 않음
+# - TTL + 최근 사용(last_access) 기준 LRU 축출, 적중률 통계 제공
+
+import os
+import math
+import time
+import datetime
+import threading
+from typing import Any, Dict, Optional
+
+import pytz
+
+from tools.sqlite_store import open_db
+from tools.symbol_resolver import is_krx_symbol
+
+ADVICE_CACHE_PATH = os.getenv("ADVICE_CACHE_PATH", os.path.join("data", "cache", "advice.sqlite3"))
+ADVICE_CACHE_TTL = int(os.getenv("ADVICE_CACHE_TTL", str(12 * 3600)))         # 12시간
+ADVICE_CACHE_MAX = int(os.getenv("ADVICE_CACHE_MAX", "2000"))
+ADVICE_PRICE_BUCKET_PCT = float(os.getenv("ADVICE_PRICE_BUCKET_PCT", "1.0"))  # 가격 구간 폭 (%)
+
+MARKET_TZ = {"KRX": pytz.timezone("Asia/Seoul"), "US": pytz.timezone("America/New_York")}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS advice (
+    key         TEXT PRIMARY KEY,
+    symbol      TEXT NOT NULL,
+    advice      TEXT NOT NULL,
+    created_at  REAL NOT NULL,
+    expires_at  REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_advice_access ON advice (last_access);
+"""
+
+
+def trading_date(symbol: str, now: Optional[float] = None) -> str:
+    tz = MARKET_TZ["KRX" if is_krx_symbol(symbol) else "US"]
+    ts = now if now is not None else time.time()
+    return datetime.datetime.fromtimestamp(ts, tz).strftime("%Y-%m-%d")
+
+
+def price_bucket(price: Optional[float], pct: float = ADVICE_PRICE_BUCKET_PCT) -> str:
+    """로그 스케일 구간 번호 (가격 수준과 무관하게 같은 비율 폭)"""
+    if price is None or price <= 0:
+        return "na"
+    return str(math.floor(math.log(price) / math.log1p(pct / 100.0)))
+
+
+def advice_key(symbol: str, price: Optional[float], prompt_version: str, now: Optional[float] = None) -> str:
+    return f"{prompt_version}|{symbol}|{trading_date(symbol, now)}|{price_bucket(price)}"
+
+
+class AdviceCache:
+    def __init__(self, prompt_version: str, path: str = ADVICE_CACHE_PATH,
+                 ttl: int = ADVICE_CACHE_TTL, max_entries: int = ADVICE_CACHE_MAX):
+        self.prompt_version = prompt_version
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._conn = None
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._expired = 0
+        self._evictions = 0
+
+    def _db(self):
+        if self._conn is None:
+            self._conn = open_db(self.path, _SCHEMA)
+        return self._conn
+
+    def key(self, symbol: str, price: Optional[float]) -> str:
+        return advice_key(symbol, price, self.prompt_version)
+
+    def get(self, symbol: str, price: Optional[float]) -> Optional[str]:
+        key = self.key(symbol, price)
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._db()
+                row = conn.execute("SELECT advice, expires_at FROM advice WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    self._misses += 1
+                    return None
+                if row[1] <= now:
+                    conn.execute("DELETE FROM advice WHERE key = ?", (key,))
+                    conn.commit()
+                    self._expired += 1
+                    self._misses += 1
+                    return None
+                conn.execute("UPDATE advice SET last_access = ? WHERE key = ?", (now, key))
+                conn.commit()
+                self._hits += 1
+                return row[0]
+        except Exception as e:
+            print(f"⚠️ 조언 캐시 조회 실패: {e}")
+            return None
+
+    def put(self, symbol: str, price: Optional[float], advice: str) -> None:
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._db()
+                conn.execute(
+                    """INSERT OR REPLACE INTO advice (key, symbol, advice, created_at, expires_at, last_access)
+                       VALUES (?, ?, ?, ?, ?, ?)""",
+                    (self.key(symbol, price), symbol, advice, now, now + self.ttl, now),
+                )
+                self._evict(conn, now)
+                conn.commit()
+        except Exception as e:
+            print(f"⚠️ 조언 캐시 저장 실패: {e}")
+
+    def _evict(self, conn, now: float) -> None:
+        """만료 항목 삭제 후, 상한을 넘으면 가장 오래 안 쓴 항목부터 축출 (lock 보유 상태에서 호출)"""
+        conn.execute("DELETE FROM advice WHERE expires_at <= ?", (now,))
+        over = conn.execute("SELECT COUNT(*) FROM advice").fetchone()[0] - self.max_entries
+        if over > 0:
+            cur = conn.execute(
+                "DELETE FROM advice WHERE key IN (SELECT key FROM advice ORDER BY last_access ASC LIMIT ?)", (over,)
+            )
+            self._evictions += cur.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            try:
+                size = self._db().execute("SELECT COUNT(*) FROM advice").fetchone()[0]
+            except Exception:
+                size = None
+            total = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "expired": self._expired,
+                "evictions": self._evictions,
+                "size": size,
+                "hit_rate": self._hits / total if total else 0.0,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            conn = self._db()
+            conn.execute("DELETE FROM advice")
+            conn.commit()
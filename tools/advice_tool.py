@@ -5,12 +5,16 @@
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import StrOutputParser
+from pydantic import BaseModel, Field, ValidationError
 import os
-from typing import Tuple, Any
+import asyncio
+from typing import Tuple, Any, Optional, Dict, List
 
-from tools.symbol_resolver import resolve_symbol
-from tools.stock_price_tool import get_stock_price
+from tools.symbol_resolver import resolve_symbol, aresolve_symbol
+from tools.stock_price_tool import get_quote, aget_quote
+from tools.quote import Quote, format_quote
+from tools.quant_analytics import quant_context, aquant_context
+from tools.advice_cache import AdviceCache
 
 from langchain_core.tools import tool 
 
@@ -23,61 +27,115 @@ llm = ChatOpenAI(
     openai_api_key=api_key
 )
 
-# advice_tool.py 파일에서 advice_prompt 부분을 이 내용으로 교체해주세요.
+class StockAdvice(BaseModel):
+    """종목 조언 구조 (LLM이 이 스키마대로 응답)"""
+    summary: str = Field(description="2~3문장 요약")
+    pros: List[str] = Field(description="장점 2~3개, 각 한 문장")
+    risks: List[str] = Field(description="리스크 2~3개, 각 한 문장")
+    conclusion: str = Field(description="중립적인 한 줄 결론")
 
-# advice_tool.py 파일에서 advice_prompt 부분을 이 내용으로 교체해주세요.
+advice_prompt = PromptTemplate.from_template("""
+You are a stock analyst. Answer in KOREAN, filling every field of the schema.
+If the context contains quantitative metrics (returns, volatility, drawdown, beta, moving-average gaps), cite the relevant numbers in the pros and risks.
 
-# advice_tool.py 파일에서 advice_prompt 부분을 이 내용으로 교체해주세요.
+Stock: {symbol}
+Context: {context}
+""")
 
-advice_prompt = PromptTemplate.from_template("""
-You are a helpful assistant that provides stock analysis in a structured format in KOREAN.
-You MUST follow the user's requested format EXACTLY.
+chain = advice_prompt | llm.with_structured_output(StockAdvice, method="json_schema")
 
-The user wants the output in the following format. Do not add any text before or after this structure.
-[요약]
-(2-3 sentences summary)
+# 프롬프트/출력 형식을 바꾸면 올려서 이전 캐시를 무효화
+ADVICE_PROMPT_VERSION = "v3"
+_advice_cache = AdviceCache(prompt_version=ADVICE_PROMPT_VERSION)
 
-[장점]
-- (Pro 1)
-- (Pro 2)
+def render_advice(advice: StockAdvice) -> str:
+    """채팅 출력용 텍스트 (기존 [요약]/[장점]/[리스크]/[결론] 형식 유지)"""
+    pros = "\n".join(f"- {p}" for p in advice.pros)
+    risks = "\n".join(f"- {r}" for r in advice.risks)
+    return f"[요약]\n{advice.summary}\n\n[장점]\n{pros}\n\n[리스크]\n{risks}\n\n[결론(한 줄)]\n{advice.conclusion}"
 
-[리스크]
-- (Risk 1)
-- (Risk 2)
+def get_advice_cache_stats() -> Dict[str, Any]:
+    return _advice_cache.stats()
 
-[결론(한 줄)]
-(A single, neutral summary sentence)
+def _price_of(quote: Optional[Quote]) -> Optional[float]:
+    return quote.price if quote else None
 
----
-Now, provide the analysis for the following stock based on the provided context. Remember to use the EXACT format above.
+def _context(quote: Optional[Quote], metrics: str) -> str:
+    return "\n".join(part for part in (format_quote(quote) if quote else "", metrics) if part)
 
-Stock: {symbol}
-Context: {context}
+def _cached(sym: str, quote: Optional[Quote]) -> Optional[StockAdvice]:
+    raw = _advice_cache.get(sym, _price_of(quote))
+    if raw is None:
+        return None
+    try:
+        return StockAdvice.model_validate_json(raw)
+    except ValidationError:
+        return None
 
-Structured Analysis:
-""")
+def _store(sym: str, quote: Optional[Quote], advice: StockAdvice) -> StockAdvice:
+    _advice_cache.put(sym, _price_of(quote), advice.model_dump_json())
+    return advice
+
+def _generate(sym: str, quote: Optional[Quote], metrics: str) -> Optional[StockAdvice]:
+    try:
+        advice = chain.invoke({"symbol": sym, "context": _context(quote, metrics)})
+    except Exception as e:
+        print(f"⚠️ 조언 생성 실패({sym}): {e}")
+        return None
+    return _store(sym, quote, advice)
 
-chain = advice_prompt | llm | StrOutputParser()
+async def _agenerate(sym: str, quote: Optional[Quote], metrics: str) -> Optional[StockAdvice]:
+    try:
+        advice = await chain.ainvoke({"symbol": sym, "context": _context(quote, metrics)})
+    except Exception as e:
+        print(f"⚠️ 조언 생성 실패({sym}): {e}")
+        return None
+    # 캐시는 동기 SQLite라 이벤트 루프 밖에서
+    return await asyncio.to_thread(_store, sym, quote, advice)
+
+def advise(sym: str, quote: Optional[Quote], metrics: str = "") -> Optional[StockAdvice]:
+    """
+    해석된 티커와 (이미 조회한) 시세/정량 지표로 조언만 생성합니다. 시세를 다시 조회하지 않음.
+    metrics: quant_analytics.symbol_context()가 만든 지표 한 줄
+    같은 거래일·비슷한 가격대의 조언이 캐시에 있으면 LLM을 부르지 않습니다. 실패 시 None.
+    """
+    cached = _cached(sym, quote)
+    return cached if cached is not None else _generate(sym, quote, metrics)
+
+async def aadvise(sym: str, quote: Optional[Quote], metrics: str = "") -> Optional[StockAdvice]:
+    cached = await asyncio.to_thread(_cached, sym, quote)
+    return cached if cached is not None else await _agenerate(sym, quote, metrics)
+
+def _advice_text(sym: str, advice: Optional[StockAdvice]) -> str:
+    return render_advice(advice) if advice else f"❌ 조언 생성 실패({sym})"
 
 @tool
 def get_stock_advice(name_or_symbol: str) -> str:
     """
     한국어 종목명 또는 티커를 받아서
     1) 티커로 해석(resolve)
-    2) (선택) 현재가 한 줄을 컨텍스트로 주입
+    2) (선택) 현재가 한 줄 + 정량 지표(수익률/변동성/낙폭/베타/이평 괴리)를 컨텍스트로 주입
     3) 프롬프트 체인 실행
     """
     sym = resolve_symbol(name_or_symbol)
     if not sym:
         return f"❌ 종목을 찾지 못했습니다: '{name_or_symbol}'"
 
-    # get_stock_price 함수의 반환값을 받아 성공 여부로 판단하도록 수정
-    is_success, price_line = get_stock_price(sym)
-    
-    # 성공했을 경우에만 컨텍스트로 주입
-    ctx = price_line if is_success else ""
+    quote = get_quote(sym)
+    advice = _cached(sym, quote)
+    if advice is None:
+        # 시세/지표 조회에 성공한 것만 컨텍스트로 주입 (지표는 캐시 미스일 때만 계산)
+        advice = _generate(sym, quote, quant_context(sym))
+    return _advice_text(sym, advice)
 
-    try:
-        return chain.invoke({"symbol": sym, "context": ctx})
-    except Exception as e:
-        return f"❌ 조언 생성 실패({sym}): {e}"
\ No newline at end of file
+async def _aget_stock_advice(name_or_symbol: str) -> str:
+    sym = await aresolve_symbol(name_or_symbol)
+    if not sym:
+        return f"❌ 종목을 찾지 못했습니다: '{name_or_symbol}'"
+    quote = await aget_quote(sym)
+    advice = await asyncio.to_thread(_cached, sym, quote)
+    if advice is None:
+        advice = await _agenerate(sym, quote, await aquant_context(sym))
+    return _advice_text(sym, advice)
+
+get_stock_advice.coroutine = _aget_stock_advice
@@ -1,103 +1,318 @@
 # FINAL_PROJECT/tools/asset_summary_tool.py
 
+# 포트폴리오 평가 파이프라인
+# 1) 변경 감지: portfolio_version RPC(행 수/최신 updated_at/digest)가 그대로면 기억한 행 재사용, 바뀌면 전체 조회
+# 2) 시세: 보유 종목 전체를 fetch_quotes 한 번으로 배치 조회
+# 3) 행별 평가 결과 캐시: 수량/평단가/현재가가 그대로면 재계산·재포맷하지 않음
+# 4) 통화별 총계는 배열 연산으로 합산
+# 5) 스트리밍 모드: 그래프 안(custom 스트림 writer가 있을 때)에서는 종목별로 시세를 조회해
+#    도착하는 순서대로 행을 내보내고 마지막에 총계. writer가 없으면 배치 조회 한 번
+
 import os
-import re
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import requests
+import httpx
+import numpy as np
 from dotenv import load_dotenv
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple, NamedTuple, Iterator, AsyncIterator, Callable
 
-from tools.stock_price_tool import get_stock_price
+from tools import http_client
+from tools.stock_price_tool import fetch_quotes, afetch_quotes, get_quote, aget_quote
+from tools.quote import Quote, currency_for
 
-from langchain_core.tools import tool 
+from langchain_core.tools import tool
 
 load_dotenv()
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY")
 
+TABLE_HEADER = [
+    "| 종목 | 보유 수량 | 평단가 | 현재가 | 평가 금액 | 평가 손익 |",
+    "|:---:|:---:|:---:|:---:|:---:|:---:|"
+]
+TOTAL_CURRENCIES = ("KRW", "USD")
+STREAM_CONCURRENCY = int(os.getenv("SUMMARY_STREAM_CONCURRENCY", "8"))  # 스트리밍 모드 동시 시세 조회 수
+STREAM_KEY = "portfolio_summary"  # custom 스트림 이벤트 키
+
+def _portfolio_url() -> str:
+    return f"{SUPABASE_URL}/rest/v1/portfolio"
+
+def _headers() -> Dict[str, str]:
+    return {
+        "apikey": SUPABASE_ANON_KEY,
+        "Authorization": f"Bearer {SUPABASE_ANON_KEY}",
+    }
+
+def _version_url() -> str:
+    return f"{SUPABASE_URL}/rest/v1/rpc/portfolio_version"
+
+# -----------------------------
+# 1) 포트폴리오 미러 (버전이 그대로면 마지막으로 받은 행을 재사용)
+# -----------------------------
+FULL_PARAMS = {"select": "*"}
+
+def _version_result(response) -> Optional[Dict[str, Any]]:
+    """portfolio_version RPC 응답 → 버전 dict. 함수가 없거나(404) 응답이 이상하면 None (= 전체 조회)"""
+    if response.status_code != 200:
+        return None
+    try:
+        body = response.json()
+    except ValueError:
+        return None
+    return body if isinstance(body, dict) else None
+
+class PortfolioMirror:
+    """
+    supabase/004_portfolio_version.sql 의 (count, max_updated_at, digest)로 변경 여부만 확인하고,
+    바뀌었으면 표 전체를 다시 받는다. 보유 종목 수가 작아 전체 조회가 싸고, 부분 조회로는
+    삭제나 늦게 커밋된 행을 놓칠 수 있기 때문. 버전을 먼저 읽고 행을 나중에 받으므로,
+    그 사이에 생긴 변경은 다음 refresh에서 버전이 달라져 다시 반영된다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows: List[Dict[str, Any]] = []
+        self._version: Optional[Dict[str, Any]] = None
+
+    def rows(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._rows)
+
+    def current(self, version: Optional[Dict[str, Any]]) -> bool:
+        with self._lock:
+            return version is not None and version == self._version
+
+    def apply(self, rows: List[Dict[str, Any]], version: Optional[Dict[str, Any]]) -> None:
+        with self._lock:
+            self._rows = list(rows)
+            self._version = version
+
+    def refresh(self) -> List[Dict[str, Any]]:
+        try:
+            version = _version_result(http_client.post(_version_url(), headers=_headers(), json={}))
+        except requests.exceptions.RequestException:
+            version = None
+        if self.current(version):
+            return self.rows()
+        response = http_client.get(_portfolio_url(), headers=_headers(), params=FULL_PARAMS)
+        response.raise_for_status()
+        self.apply(response.json() or [], version)
+        return self.rows()
+
+    async def arefresh(self) -> List[Dict[str, Any]]:
+        try:
+            version = _version_result(await http_client.apost(_version_url(), headers=_headers(), json={}))
+        except httpx.HTTPError:
+            version = None
+        if self.current(version):
+            return self.rows()
+        response = await http_client.aget(_portfolio_url(), headers=_headers(), params=FULL_PARAMS)
+        response.raise_for_status()
+        self.apply(response.json() or [], version)
+        return self.rows()
+
+_mirror = PortfolioMirror()
+
+# -----------------------------
+# 2) 행별 평가 (입력이 같으면 캐시된 결과 재사용)
+# -----------------------------
+class RowValuation(NamedTuple):
+    key: Tuple[Any, Any, Optional[float]]  # (수량, 평단가, 현재가)
+    currency: str
+    valuation: float
+    profit_loss: float
+    line: str
+
+_valuation_cache: Dict[str, RowValuation] = {}
+_valuation_lock = threading.Lock()
+
+def _total_currency(currency: str) -> str:
+    return "KRW" if currency == "KRW" else "USD"  # 기본값은 달러로 처리
+
+def _value_row(stock: Dict[str, Any], quote: Optional[Quote]) -> RowValuation:
+    symbol = stock.get('symbol')
+    quantity = stock.get('quantity', 0)
+    purchase_price = stock.get('purchase_price', 0)
+    key = (quantity, purchase_price, quote.price if quote else None)
+
+    with _valuation_lock:
+        cached = _valuation_cache.get(symbol or '')
+    if cached is not None and cached.key == key:
+        return cached
+
+    currency = _total_currency(quote.currency if quote else currency_for(symbol or ''))
+    current_price_str = "조회실패"
+    current_price = 0.0
+    if quote is not None:
+        current_price = quote.price
+        current_price_str = f"{quote.sign}{current_price:,.2f}"
+
+    valuation = current_price * quantity
+    profit_loss = (current_price - purchase_price) * quantity
+
+    if currency == 'KRW':
+        # 평단가와 평가금액/손익에 원화 표시 추가
+        purchase_price_str = f"₩{purchase_price:,.0f}"
+        valuation_str = f"₩{valuation:,.0f}"
+        profit_loss_str = f"₩{profit_loss:,.0f}"
+    else:
+        purchase_price_str = f"${purchase_price:,.2f}"
+        valuation_str = f"${valuation:,.2f}"
+        profit_loss_str = f"${profit_loss:,.2f}"
+
+    line = f"| {symbol} | {quantity:,} | {purchase_price_str} | {current_price_str} | {valuation_str} | {profit_loss_str} |"
+    row = RowValuation(key, currency, valuation, profit_loss, line)
+    with _valuation_lock:
+        _valuation_cache[symbol or ''] = row
+    return row
+
+def _forget_removed(symbols: List[str]) -> None:
+    """더 이상 보유하지 않는 종목의 평가 캐시 정리"""
+    keep = set(symbols)
+    with _valuation_lock:
+        for symbol in [s for s in _valuation_cache if s not in keep]:
+            del _valuation_cache[symbol]
+
+# -----------------------------
+# 3) 통화별 총계 (배열 연산)
+# -----------------------------
+def _totals(rows: List[RowValuation]) -> Dict[str, Tuple[float, float]]:
+    currencies = np.array([r.currency for r in rows])
+    amounts = np.array([[r.valuation, r.profit_loss] for r in rows], dtype=float).reshape(-1, 2)
+    return {c: tuple(amounts[currencies == c].sum(axis=0)) for c in TOTAL_CURRENCIES}
+
+def _render_totals(totals: Dict[str, Tuple[float, float]]) -> List[str]:
+    krw_val, krw_pl = totals["KRW"]
+    usd_val, usd_pl = totals["USD"]
+    return [
+        "\n---",
+        f"**💰 원화(KRW) 총계**",
+        f"- 총 평가 금액: ₩{krw_val:,.0f}",
+        f"- 총 평가 손익: ₩{krw_pl:,.0f}",
+        f"\n**💰 달러(USD) 총계**",
+        f"- 총 평가 금액: ${usd_val:,.2f}",
+        f"- 총 평가 손익: ${usd_pl:,.2f}",
+    ]
+
+def _render_summary(portfolio_data: List[Dict[str, Any]], quotes: Dict[str, Optional[Quote]]) -> str:
+    rows = [_value_row(stock, quotes.get(stock.get('symbol') or '')) for stock in portfolio_data]
+    _forget_removed([stock.get('symbol') or '' for stock in portfolio_data])
+    return "\n".join(TABLE_HEADER + [r.line for r in rows] + _render_totals(_totals(rows)))
+
+def _symbols(portfolio_data: List[Dict[str, Any]]) -> List[str]:
+    return [stock.get('symbol') or '' for stock in portfolio_data]
+
+# -----------------------------
+# 5) 스트리밍 모드
+# -----------------------------
+PORTFOLIO_ERROR = "❌ 포트폴리 데이터를 가져오는 중 오류가 발생했습니다: {}"
+EMPTY_PORTFOLIO = "현재 보유 주식이 없습니다."
+
+class _SummaryStream:
+    """도착 순서대로 행을 쌓아 가며 그 시점까지의 마크다운 전체를 만들어 줌"""
+
+    def __init__(self, portfolio_data: List[Dict[str, Any]]):
+        self.total = len(portfolio_data)
+        self.rows: List[RowValuation] = []
+        _forget_removed(_symbols(portfolio_data))
+
+    def add(self, stock: Dict[str, Any], quote: Optional[Quote]) -> str:
+        self.rows.append(_value_row(stock, quote))
+        return self.partial()
+
+    def partial(self) -> str:
+        progress = f"\n⏳ 시세 조회 중... ({len(self.rows)}/{self.total})"
+        return "\n".join(TABLE_HEADER + [r.line for r in self.rows]) + progress
+
+    def finish(self) -> str:
+        return "\n".join(TABLE_HEADER + [r.line for r in self.rows] + _render_totals(_totals(self.rows)))
+
+def _stream_rows(portfolio_data: List[Dict[str, Any]]) -> Iterator[str]:
+    """
+    표 머리글 → 시세가 도착하는 순서대로 한 행씩 → 마지막에 총계.
+    매번 그 시점까지의 전체 마크다운을 yield 합니다. (첫 행까지의 시간 = 시세 1건)
+    """
+    stream = _SummaryStream(portfolio_data)
+    yield stream.partial()
+    with ThreadPoolExecutor(max_workers=max(1, min(STREAM_CONCURRENCY, len(portfolio_data)))) as ex:
+        # DB의 종목은 이미 정규화된 티커 → 이름 해석 없이 바로 시세 조회
+        futures = {ex.submit(get_quote, stock.get('symbol') or ''): stock for stock in portfolio_data}
+        for fut in as_completed(futures):
+            try:
+                quote = fut.result()
+            except Exception:
+                quote = None
+            yield stream.add(futures[fut], quote)
+    yield stream.finish()
+
+async def _astream_rows(portfolio_data: List[Dict[str, Any]]) -> AsyncIterator[str]:
+    """_stream_rows의 asyncio 버전"""
+    stream = _SummaryStream(portfolio_data)
+    yield stream.partial()
+    sem = asyncio.Semaphore(max(1, STREAM_CONCURRENCY))
+
+    async def _priced(stock: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[Quote]]:
+        async with sem:
+            try:
+                return stock, await aget_quote(stock.get('symbol') or '')
+            except Exception:
+                return stock, None
+
+    for next_done in asyncio.as_completed([_priced(stock) for stock in portfolio_data]):
+        stock, quote = await next_done
+        yield stream.add(stock, quote)
+    yield stream.finish()
+
+def _stream_writer() -> Optional[Callable[[Any], None]]:
+    """LangGraph 실행 중이면 custom 스트림 writer, 아니면 None"""
+    try:
+        from langgraph.config import get_stream_writer
+        return get_stream_writer()
+    except Exception:
+        return None
+
 @tool
 def get_portfolio_summary() -> str:
     """
     Supabase DB에서 전체 포트폴리오를 조회하고, 현재가와 평가 손익을 통화별로 요약하여 반환합니다.
     """
-    url = f"{SUPABASE_URL}/rest/v1/portfolio?select=*"
-    headers = {
-        "apikey": SUPABASE_ANON_KEY,
-        "Authorization": f"Bearer {SUPABASE_ANON_KEY}",
-    }
-    
+    # 그래프 안이면 writer가 있음 → 시세가 도착하는 대로 한 행씩 custom 스트림으로 전달
+    writer = _stream_writer()
     try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        portfolio_data = response.json()
+        portfolio_data = _mirror.refresh()
     except requests.exceptions.RequestException as e:
-        return f"❌ 포트폴리 데이터를 가져오는 중 오류가 발생했습니다: {e}"
+        return PORTFOLIO_ERROR.format(e)
 
     if not portfolio_data:
-        return "현재 보유 주식이 없습니다."
+        return EMPTY_PORTFOLIO
 
-    summary_lines = [
-        "| 종목 | 보유 수량 | 평단가 | 현재가 | 평가 금액 | 평가 손익 |",
-        "|:---:|:---:|:---:|:---:|:---:|:---:|"
-    ]
-    
-    # ✅ [수정] 통화별 총계를 위한 변수 초기화
-    total_valuation_krw, total_profit_loss_krw = 0.0, 0.0
-    total_valuation_usd, total_profit_loss_usd = 0.0, 0.0
-
-    for stock in portfolio_data:
-        symbol = stock.get('symbol')
-        quantity = stock.get('quantity', 0)
-        purchase_price = stock.get('purchase_price', 0)
-        
-        is_success, price_info = get_stock_price(symbol)
-        
-        current_price_str = "조회실패"
-        current_price = 0.0
-        currency_symbol = '' # 통화 기호 저장용
-
-        if is_success:
-            # ✅ [수정] 통화 기호(₩ 또는 $) 뒤의 숫자만 찾는 정규식으로 변경
-            match = re.search(r'([₩\$])\s*([\d,.]+)', price_info)
-            if match:
-                currency_symbol = match.group(1)
-                price_value = match.group(2)
-                current_price = float(price_value.replace(',', ''))
-                current_price_str = f"{currency_symbol}{current_price:,.2f}"
-            else: # 만약 통화 기호를 못찾으면 예전 방식으로 한번 더 시도
-                fallback_match = re.search(r'[\d,.]+', price_info)
-                if fallback_match:
-                    current_price = float(fallback_match.group().replace(',', ''))
-                    current_price_str = f"{current_price:,.2f}"
-
-        valuation = current_price * quantity
-        profit_loss = (current_price - purchase_price) * quantity
-        
-        # ✅ [수정] 통화에 따라 각기 다른 총계 변수에 더하기
-        if '₩' in price_info or (currency_symbol == '₩'):
-            total_valuation_krw += valuation
-            total_profit_loss_krw += profit_loss
-            # 평단가와 평가금액/손익에 원화 표시 추가
-            purchase_price_str = f"₩{purchase_price:,.0f}"
-            valuation_str = f"₩{valuation:,.0f}"
-            profit_loss_str = f"₩{profit_loss:,.0f}"
-        else: # 기본값은 달러로 처리
-            total_valuation_usd += valuation
-            total_profit_loss_usd += profit_loss
-            purchase_price_str = f"${purchase_price:,.2f}"
-            valuation_str = f"${valuation:,.2f}"
-            profit_loss_str = f"${profit_loss:,.2f}"
-        
-        summary_lines.append(
-            f"| {symbol} | {quantity:,} | {purchase_price_str} | {current_price_str} | {valuation_str} | {profit_loss_str} |"
-        )
-    
-    # ✅ [수정] 통화별로 분리된 최종 결과 문자열 생성
-    summary_lines.append("\n---")
-    summary_lines.append(f"**💰 원화(KRW) 총계**")
-    summary_lines.append(f"- 총 평가 금액: ₩{total_valuation_krw:,.0f}")
-    summary_lines.append(f"- 총 평가 손익: ₩{total_profit_loss_krw:,.0f}")
-    summary_lines.append(f"\n**💰 달러(USD) 총계**")
-    summary_lines.append(f"- 총 평가 금액: ${total_valuation_usd:,.2f}")
-    summary_lines.append(f"- 총 평가 손익: ${total_profit_loss_usd:,.2f}")
-    
-    return "\n".join(summary_lines)
\ No newline at end of file
+    if writer is not None:
+        text = ""
+        for text in _stream_rows(portfolio_data):
+            writer({STREAM_KEY: text})
+        return text
+    # ✅ 스트리밍이 없으면 보유 종목 전체를 한 번에 배치 조회 (종목별 순차 호출 제거)
+    quotes = fetch_quotes(_symbols(portfolio_data))
+    return _render_summary(portfolio_data, quotes)
+
+async def _aget_portfolio_summary() -> str:
+    writer = _stream_writer()
+    try:
+        portfolio_data = await _mirror.arefresh()
+    except httpx.HTTPError as e:
+        return PORTFOLIO_ERROR.format(e)
+
+    if not portfolio_data:
+        return EMPTY_PORTFOLIO
+
+    if writer is not None:
+        text = ""
+        async for text in _astream_rows(portfolio_data):
+            writer({STREAM_KEY: text})
+        return text
+    quotes = await afetch_quotes(_symbols(portfolio_data))
+    return _render_summary(portfolio_data, quotes)
+
+get_portfolio_summary.coroutine = _aget_portfolio_summary
@@ -0,0 +1,190 @@
+# FINAL_PROJECT/tools/bm25_index.py
+
+# 용어집 청크용 BM25 역색인 (빌드 시 1회 생성 → 디스크에 저장 → 조회 시 memory-map)
+# - 벡터 인덱스(Chroma)와 같은 청크/같은 chunk_id를 쓰므로 두 검색 결과를 그대로 순위 융합할 수 있음
+# - 게시 목록(postings)은 CSR 형태의 numpy 배열: term_ptr[t]:term_ptr[t+1] 구간이 용어 t의 (문서, tf) 목록
+# - 한글은 조사가 붙어도 걸리도록 어절 + 음절 bigram으로 토큰화 ("듀레이션이" → 듀레, 레이, 이션, 션이 ...)
+# - 빌드마다 새 하위 디렉터리(build-*)에 전부 쓴 뒤 current.json 하나를 os.replace로 바꿔 공개
+#   → 읽는 쪽은 항상 한 빌드의 파일만 보게 되어, 빌드 도중 다시 읽어도 파일 간 크기가 어긋나지 않음
+
+import os
+import re
+import json
+import time
+import shutil
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+BM25_DIR = os.getenv("TERM_BM25_DIR", os.path.join("data", "bm25_terms"))
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"[0-9a-z]+|[가-힣]+")
+
+_ARRAYS = ("term_ptr", "post_doc", "post_tf", "doc_len", "idf")
+META_FILE = "meta.json"
+CHUNKS_FILE = "chunks.json"
+CURRENT_FILE = "current.json"   # {"dir": "build-..."} 현재 공개된 빌드
+BUILD_PREFIX = "build-"
+KEEP_BUILDS = 2                  # 직전 빌드는 남겨 둠 (교체 직전에 경로를 읽은 다른 프로세스용)
+
+
+def tokenize(text: str) -> List[str]:
+    tokens: List[str] = []
+    for tok in _TOKEN_RE.findall(text.lower()):
+        tokens.append(tok)
+        if len(tok) > 2 and "가" <= tok[0] <= "힣":
+            tokens.extend(tok[i:i + 2] for i in range(len(tok) - 1))
+    return tokens
+
+
+# -----------------------------
+# 빌드 (인덱싱 시)
+# -----------------------------
+def build_bm25_index(chunks: Iterable[Dict], path: str = BM25_DIR) -> int:
+    """chunks: [{"id", "text", "page", ...}] → path 아래 npy/json 파일로 저장. 청크 수를 반환"""
+    chunks = list(chunks)
+    vocab: Dict[str, int] = {}
+    per_term: List[List[Tuple[int, int]]] = []
+    doc_len = np.zeros(len(chunks), dtype=np.float32)
+
+    for d, chunk in enumerate(chunks):
+        counts = Counter(tokenize(chunk["text"]))
+        doc_len[d] = sum(counts.values())
+        for term, tf in counts.items():
+            tid = vocab.setdefault(term, len(vocab))
+            if tid == len(per_term):
+                per_term.append([])
+            per_term[tid].append((d, tf))
+
+    df = np.array([len(p) for p in per_term], dtype=np.int64)
+    term_ptr = np.zeros(len(per_term) + 1, dtype=np.int64)
+    np.cumsum(df, out=term_ptr[1:])
+    flat = [pair for postings in per_term for pair in postings]
+    post_doc = np.array([d for d, _ in flat], dtype=np.int32)
+    post_tf = np.array([tf for _, tf in flat], dtype=np.float32)
+
+    n = max(len(chunks), 1)
+    idf = np.log(1.0 + (n - df + 0.5) / (df + 0.5)).astype(np.float32)
+    avgdl = float(doc_len.mean()) if len(chunks) else 0.0
+
+    name = f"{BUILD_PREFIX}{time.time_ns():020d}"
+    out = os.path.join(path, name)
+    os.makedirs(out)
+    arrays = {"term_ptr": term_ptr, "post_doc": post_doc, "post_tf": post_tf, "doc_len": doc_len, "idf": idf}
+    for arr_name, arr in arrays.items():
+        np.save(os.path.join(out, f"{arr_name}.npy"), arr)
+    _write_json(os.path.join(out, CHUNKS_FILE), chunks)
+    _write_json(os.path.join(out, META_FILE), {
+        "vocab": vocab, "n_docs": len(chunks), "avgdl": avgdl, "k1": BM25_K1, "b": BM25_B,
+    })
+    # 한 번의 rename으로 새 빌드 공개
+    _write_json(os.path.join(path, CURRENT_FILE), {"dir": name})
+    _prune_builds(path)
+    return len(chunks)
+
+
+def _prune_builds(path: str, keep: int = KEEP_BUILDS) -> None:
+    """오래된 빌드 삭제. 다른 프로세스가 아직 열고 있어 지우지 못하면(Windows) 다음 빌드 때 다시 시도"""
+    builds = sorted(d for d in os.listdir(path) if d.startswith(BUILD_PREFIX))
+    for d in builds[:-keep]:
+        shutil.rmtree(os.path.join(path, d), ignore_errors=True)
+
+
+def active_dir(path: str = BM25_DIR) -> str:
+    """현재 공개된 빌드 디렉터리. current.json이 없으면 예전 배치(path 바로 아래 파일)"""
+    try:
+        with open(os.path.join(path, CURRENT_FILE), encoding="utf-8") as f:
+            return os.path.join(path, json.load(f)["dir"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return path
+
+
+def stamp_path(path: str = BM25_DIR) -> str:
+    """변경 감지용 파일 (새 빌드가 공개되면 수정 시각이 바뀜)"""
+    current = os.path.join(path, CURRENT_FILE)
+    return current if os.path.exists(current) else os.path.join(path, META_FILE)
+
+
+def load_chunks(path: str = BM25_DIR) -> List[Dict]:
+    """저장된 청크 목록 (증분 빌드 시 기존 청크에 새 청크를 합쳐 다시 색인하는 용도)"""
+    try:
+        with open(os.path.join(active_dir(path), CHUNKS_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def _write_json(path: str, data) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+# -----------------------------
+# 조회
+# -----------------------------
+class BM25Index:
+    def __init__(self, path: str, meta: Dict, chunks: List[Dict], arrays: Dict[str, np.ndarray]):
+        self.path = path
+        self.vocab: Dict[str, int] = meta["vocab"]
+        self.k1 = float(meta.get("k1", BM25_K1))
+        self.b = float(meta.get("b", BM25_B))
+        self.avgdl = float(meta.get("avgdl") or 1.0)
+        self.chunks = chunks
+        self.term_ptr = arrays["term_ptr"]
+        self.post_doc = arrays["post_doc"]
+        self.post_tf = arrays["post_tf"]
+        self.doc_len = arrays["doc_len"]
+        self.idf = arrays["idf"]
+
+    @classmethod
+    def load(cls, path: str = BM25_DIR) -> Optional["BM25Index"]:
+        """저장된 인덱스(현재 공개된 빌드)를 memory-map으로 연다. 없거나 깨졌으면 None"""
+        build = active_dir(path)
+        meta_path = os.path.join(build, META_FILE)
+        if not os.path.exists(meta_path):
+            return None
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(os.path.join(build, CHUNKS_FILE), encoding="utf-8") as f:
+                chunks = json.load(f)
+            arrays = {name: np.load(os.path.join(build, f"{name}.npy"), mmap_mode="r") for name in _ARRAYS}
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ BM25 인덱스 로드 실패: {e}")
+            return None
+        # 예전 배치(파일별 교체)로 쓰는 도중이면 파일끼리 어긋날 수 있음 → 검색 중 IndexError 대신 로드 실패로
+        if not (int(meta.get("n_docs", -1)) == len(chunks) == len(arrays["doc_len"])
+                and len(arrays["term_ptr"]) == len(meta["vocab"]) + 1):
+            print(f"⚠️ BM25 인덱스 파일이 서로 맞지 않아 건너뜁니다: {build}")
+            return None
+        return cls(build, meta, chunks, arrays)
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def search(self, query: str, k: int) -> List[Tuple[int, float]]:
+        """(청크 번호, 점수) 상위 k개 (점수 내림차순)"""
+        term_ids = {self.vocab[t] for t in tokenize(query) if t in self.vocab}
+        if not term_ids or not self.chunks:
+            return []
+        scores = np.zeros(len(self.chunks), dtype=np.float32)
+        norm = self.k1 * (1.0 - self.b + self.b * np.asarray(self.doc_len) / self.avgdl)
+        for tid in term_ids:
+            lo, hi = int(self.term_ptr[tid]), int(self.term_ptr[tid + 1])
+            docs = self.post_doc[lo:hi]
+            tf = self.post_tf[lo:hi]
+            # 한 용어의 게시 목록 안에서 문서 번호는 중복되지 않으므로 fancy index 누적으로 충분
+            scores[docs] += self.idf[tid] * tf * (self.k1 + 1.0) / (tf + norm[docs])
+        hit = np.flatnonzero(scores)
+        if hit.size > k:
+            hit = hit[np.argpartition(-scores[hit], k - 1)[:k]]
+        order = hit[np.argsort(-scores[hit], kind="stable")]
+        return [(int(i), float(scores[i])) for i in order]
+
+    def chunk(self, i: int) -> Dict:
+        return self.chunks[i]
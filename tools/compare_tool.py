@@ -1,114 +1,182 @@
 # FINAL_PROJECT/tools/compare_tool.py
 
-# 두 개의 주식 종목 정보를 비교하여, 상세한 분석 리포트를 생성
+# 여러 주식 종목 정보를 비교하여, 상세한 분석 리포트를 생성
+# (종목 해석 1회 → 시세·일봉 히스토리 일괄 조회 → 종목별 조언을 상한 있는 병렬 실행 → 비교 프롬프트 1회)
 
-import re
 import os
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import List, Dict, Any
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
 
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
-from tools.stock_price_tool import get_stock_price
-from tools.advice_tool import get_stock_advice
+from tools.symbol_resolver import resolve_symbols
+from tools.stock_price_tool import fetch_quotes, afetch_quotes
+from tools.quote import Quote, format_quote
+from tools.advice_tool import StockAdvice, advise, aadvise
+from tools.quant_analytics import QuantReport, analyze, aanalyze, symbol_context, correlation_context
 
-from langchain_core.tools import tool 
+from langchain_core.tools import tool
+
+ADVICE_CONCURRENCY = int(os.getenv("COMPARE_ADVICE_CONCURRENCY", "4"))  # 동시에 돌릴 종목별 조언 LLM 호출 수
 
 # LLM 체인 설정
 llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.5)
 comparison_prompt = PromptTemplate.from_template(
-    """너는 두 주식의 장단점을 비교하여 투자자에게 조언하는 금융 분석가야.
-아래에 제공된 두 종목의 정보를 바탕으로, 두 종목의 특징을 중립적인 관점에서 비교하고 종합적인 의견을 1~2문단으로 요약해줘.
+    """너는 여러 주식의 장단점을 비교하여 투자자에게 조언하는 금융 분석가야.
+아래에 제공된 {count}개 종목의 정보를 바탕으로, 각 종목의 특징을 중립적인 관점에서 비교하고 종합적인 의견을 1~2문단으로 요약해줘.
+
+{stocks}
 
-[종목 1: {s1_name} 정보]
-- 현재가: {s1_price}
-- 장점: {s1_pros}
-- 리스크: {s1_risks}
+{correlation}
 
-[종목 2: {s2_name} 정보]
-- 현재가: {s2_price}
-- 장점: {s2_pros}
-- 리스크: {s2_risks}
+정량 지표가 있으면 수익률·변동성·낙폭·베타·상관관계 수치를 근거로 비교해줘.
 
 [비교 분석]
 """
 )
 comparison_chain = comparison_prompt | llm | StrOutputParser()
 
-@tool
-def compare_two_stocks(symbols: List[str]) -> str:
-    """
-    두 종목의 주가와 조언을 병렬로 가져와 비교 브리핑을 생성합니다.
-    """
-    cleaned_symbols = [s.strip() for s in symbols]
-
-    if len(cleaned_symbols) < 2:
-        return "비교할 종목을 2개 이상 입력해 주세요. 예: 'TSLA와 AAPL 비교해줘'"
+def _advice_points(points: List[str]) -> str:
+    return " / ".join(points) if points else "정보 없음"
 
-    s1, s2 = cleaned_symbols[0], cleaned_symbols[1]
-    results: Dict[str, Dict[str, Any]] = {s1: {}, s2: {}}
+def _price_text(symbol: str, quote: Optional[Quote]) -> str:
+    return format_quote(quote) if quote else f"❌ 주가 조회 실패: {symbol}"
 
-    with ThreadPoolExecutor(max_workers=4) as ex:
-        futures = {
-            ex.submit(get_stock_price, s1): (s1, "price"),
-            ex.submit(get_stock_price, s2): (s2, "price"),
-            ex.submit(get_stock_advice, s1): (s1, "advice"),
-            ex.submit(get_stock_advice, s2): (s2, "advice"),
+def _plan(symbols: List[str]) -> Tuple[List[str], Dict[str, str], List[str]]:
+    """
+    입력 정리 + 종목 해석(1회). (표시 이름 목록, 표시 이름 → 티커, 못 찾은 입력) 반환.
+    같은 티커로 해석되는 입력은 하나로 합칩니다.
+    """
+    cleaned = list(dict.fromkeys(s.strip() for s in symbols if s and s.strip()))
+    resolved = resolve_symbols(cleaned)
+    names: List[str] = []
+    tickers: Dict[str, str] = {}
+    seen = set()
+    unresolved = []
+    for name in cleaned:
+        sym = resolved.get(name)
+        if not sym:
+            unresolved.append(name)
+            continue
+        if sym in seen:
+            continue
+        seen.add(sym)
+        names.append(name)
+        tickers[name] = sym
+    return names, tickers, unresolved
+
+def _stock_block(idx: int, name: str, data: Dict[str, str]) -> str:
+    return (f"[종목 {idx}: {name} 정보]\n"
+            f"- 현재가: {data['price']}\n"
+            f"- 지표: {data['metrics'] or '정보 없음'}\n"
+            f"- 장점: {data['pros']}\n"
+            f"- 리스크: {data['risks']}")
+
+def _collect(names: List[str], tickers: Dict[str, str], quotes: Dict[str, Optional[Quote]],
+             metrics: Dict[str, str], advices: Dict[str, Optional[StockAdvice]]) -> Dict[str, Dict[str, str]]:
+    rows: Dict[str, Dict[str, str]] = {}
+    for name in names:
+        sym = tickers[name]
+        advice = advices.get(name)
+        rows[name] = {
+            "price": _price_text(sym, quotes.get(sym)),
+            "metrics": metrics.get(name, ""),
+            "pros": _advice_points(advice.pros) if advice else "정보 없음",
+            "risks": _advice_points(advice.risks) if advice else "정보 없음",
         }
-        for fut in as_completed(futures):
-            symbol, result_type = futures[fut]
-            try:
-                result = fut.result()
-                if result_type == "price":
-                    is_success, content = result
-                    results[symbol]["price"] = content if is_success else f"❌ 주가 조회 실패: {content}"
-                else:
-                    results[symbol]["advice"] = result
-            except Exception as e:
-                results[symbol][result_type] = f"❌ {result_type} 조회 실패: {e}"
-
-    def format_advice_section(advice_text: str) -> Dict[str, str]:
-        if "❌" in advice_text:
-            return {"요약": advice_text, "장점": "정보 없음", "리스크": "정보 없음"}
-        try:
-            summary = (re.search(r"\[요약\]\s*([\s\S]*?)\s*\[장점\]", advice_text, re.DOTALL).group(1) or "").strip()
-            pros = (re.search(r"\[장점\]\s*([\s\S]*?)\s*\[리스크\]", advice_text, re.DOTALL).group(1) or "").strip().replace("- ", "")
-            risks = (re.search(r"\[리스크\]\s*([\s\S]*?)\s*(\[결론\(한 줄\)\]|\[결론\])", advice_text, re.DOTALL).group(1) or "").strip().replace("- ", "")
-            return {"요약": summary, "장점": pros, "리스크": risks}
-        except Exception:
-            return {"요약": advice_text, "장점": "파싱 실패", "리스크": "파싱 실패"}
-
-    s1_advice_data = format_advice_section(results[s1].get('advice', '정보 없음'))
-    s2_advice_data = format_advice_section(results[s2].get('advice', '정보 없음'))
-
-    comparison_summary = comparison_chain.invoke({
-        "s1_name": s1,
-        "s1_price": results[s1].get('price', '정보 없음'),
-        "s1_pros": s1_advice_data.get('장점', '정보 없음'),
-        "s1_risks": s1_advice_data.get('리스크', '정보 없음'),
-        "s2_name": s2,
-        "s2_price": results[s2].get('price', '정보 없음'),
-        "s2_pros": s2_advice_data.get('장점', '정보 없음'),
-        "s2_risks": s2_advice_data.get('리스크', '정보 없음'),
-    })
-    
+    return rows
+
+def _metrics_by_name(names: List[str], tickers: Dict[str, str], report: Optional[QuantReport]) -> Dict[str, str]:
+    return {name: symbol_context(report, tickers[name]) for name in names}
+
+def _correlation_text(names: List[str], tickers: Dict[str, str], report: Optional[QuantReport]) -> str:
+    return correlation_context(report, {tickers[n]: n for n in names})
+
+def _comparison_inputs(names: List[str], rows: Dict[str, Dict[str, str]], correlation: str) -> Dict[str, Any]:
+    blocks = [_stock_block(i, name, rows[name]) for i, name in enumerate(names, 1)]
+    return {"count": len(names), "stocks": "\n\n".join(blocks), "correlation": correlation}
+
+def _render_comparison(names: List[str], rows: Dict[str, Dict[str, str]], correlation: str,
+                       comparison_summary: str, unresolved: List[str]) -> str:
+    sections = []
+    for name in names:
+        data = rows[name]
+        sections.append(
+            f"### 📊 **{name}** 분석 요약\n"
+            f"- **현재가**: {data['price']}\n"
+            + (f"- **정량 지표**: {data['metrics']}\n" if data['metrics'] else "")
+            + f"- **주요 장점**: {data['pros']}\n"
+            f"- **주요 리스크**: {data['risks']}"
+        )
+    skipped = f"\n⚠️ 종목을 찾지 못해 제외: {', '.join(unresolved)}\n" if unresolved else ""
     final_output = f"""
-✅ **{s1} vs {s2} 비교 분석**
----
-### 📊 **{s1}** 분석 요약
-- **현재가**: {results[s1].get('price', '정보 없음')}
-- **주요 장점**: {s1_advice_data.get('장점', '정보 없음')}
-- **주요 리스크**: {s1_advice_data.get('리스크', '정보 없음')}
-### 📊 **{s2}** 분석 요약
-- **현재가**: {results[s2].get('price', '정보 없음')}
-- **주요 장점**: {s2_advice_data.get('장점', '정보 없음')}
-- **주요 리스크**: {s2_advice_data.get('리스크', '정보 없음')}
+✅ **{' vs '.join(names)} 비교 분석**
+---{skipped}
+{chr(10).join(sections)}
+{correlation}
 ---
 ### ⚖️ **AI 종합 비교 분석**
 {comparison_summary}
 ---
 ※ 투자 판단의 최종 책임은 사용자에게 있으며, 본 내용은 정보 제공 목적입니다.
 """
-    return final_output.strip()
\ No newline at end of file
+    return final_output.strip()
+
+def _too_few(unresolved: List[str]) -> str:
+    msg = "비교할 종목을 2개 이상 입력해 주세요. 예: 'TSLA와 AAPL 비교해줘'"
+    if unresolved:
+        msg += f"\n(찾지 못한 종목: {', '.join(unresolved)})"
+    return msg
+
+@tool
+def compare_stocks(symbols: List[str]) -> str:
+    """
+    2개 이상 여러 종목의 주가와 조언을 모아 비교 브리핑을 생성합니다. (예: ['TSLA', 'AAPL', '삼성전자'])
+    """
+    names, tickers, unresolved = _plan(symbols)
+    if len(names) < 2:
+        return _too_few(unresolved)
+
+    # 시세·일봉 히스토리는 배치로 한 번에, 조언은 이미 받은 시세/지표를 넘겨 중복 조회 없이
+    syms = [tickers[n] for n in names]
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        quotes_f = ex.submit(fetch_quotes, syms, True)
+        report_f = ex.submit(analyze, syms)
+        quotes, report = quotes_f.result(), report_f.result()
+    metrics = _metrics_by_name(names, tickers, report)
+
+    workers = max(1, min(ADVICE_CONCURRENCY, len(names)))
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        advice_list = list(ex.map(lambda n: advise(tickers[n], quotes.get(tickers[n]), metrics[n]), names))
+    advices = dict(zip(names, advice_list))
+
+    rows = _collect(names, tickers, quotes, metrics, advices)
+    correlation = _correlation_text(names, tickers, report)
+    summary = comparison_chain.invoke(_comparison_inputs(names, rows, correlation))
+    return _render_comparison(names, rows, correlation, summary, unresolved)
+
+async def _acompare_stocks(symbols: List[str]) -> str:
+    names, tickers, unresolved = await asyncio.to_thread(_plan, symbols)
+    if len(names) < 2:
+        return _too_few(unresolved)
+
+    syms = [tickers[n] for n in names]
+    quotes, report = await asyncio.gather(afetch_quotes(syms, resolved=True), aanalyze(syms))
+    metrics = _metrics_by_name(names, tickers, report)
+    sem = asyncio.Semaphore(max(1, ADVICE_CONCURRENCY))
+
+    async def _one(name: str) -> Optional[StockAdvice]:
+        async with sem:
+            return await aadvise(tickers[name], quotes.get(tickers[name]), metrics[name])
+
+    advices = dict(zip(names, await asyncio.gather(*[_one(n) for n in names])))
+
+    rows = _collect(names, tickers, quotes, metrics, advices)
+    correlation = _correlation_text(names, tickers, report)
+    summary = await comparison_chain.ainvoke(_comparison_inputs(names, rows, correlation))
+    return _render_comparison(names, rows, correlation, summary, unresolved)
+
+compare_stocks.coroutine = _acompare_stocks
@@ -0,0 +1,293 @@
+# FINAL_PROJECT/tools/embedding_cache.py
+
+# 임베딩 디스크 캐시 (모델 + 텍스트 해시 → float32 벡터)
+# - 벡터는 모델별 고정 크기 float32 파일(np.memmap)의 슬롯에, 해시 → 슬롯 색인은 SQLite에 저장
+# - 슬롯 수(EMBED_CACHE_MAX)를 넘으면 가장 오래 안 쓴 항목의 슬롯을 재사용 (LRU 축출)
+# - 여러 프로세스(앱 + 인덱서)가 같은 파일을 써도 안전하도록 슬롯은 BEGIN IMMEDIATE 트랜잭션 안에서 예약(ready=0)하고,
+#   벡터를 디스크에 내린 뒤 ready=1로 공개. 조회는 ready=1만 보고, 읽은 뒤 색인이 그대로인지 다시 확인
+# - CachedEmbeddings로 기존 임베딩 모델을 감싸면 인덱싱(embed_documents)과 질의(embed_query)가 같은 캐시를 공유
+
+import os
+import re
+import time
+import hashlib
+import asyncio
+import threading
+from typing import Any, Dict, List, Optional, Set
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from tools.sqlite_store import open_db
+
+EMBED_CACHE_DIR = os.getenv("EMBED_CACHE_DIR", os.path.join("data", "cache", "embeddings"))
+EMBED_CACHE_MAX = int(os.getenv("EMBED_CACHE_MAX", "20000"))  # 1536차원 기준 약 120MB
+RESERVE_STALE_SEC = 60.0  # 이보다 오래 ready=0인 예약은 쓰던 프로세스가 죽은 것으로 보고 축출 대상에 포함
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS vectors (
+    key         TEXT PRIMARY KEY,
+    slot        INTEGER NOT NULL UNIQUE,
+    last_access REAL NOT NULL,
+    ready       INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS idx_vectors_access ON vectors (last_access);
+CREATE TABLE IF NOT EXISTS meta (
+    name  TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def embedding_key(model: str, text: str) -> str:
+    return hashlib.sha1(f"{model}\x00{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """모델 하나의 벡터 저장소. 차원은 첫 저장 때 정해져 meta에 기록됨"""
+
+    def __init__(self, model: str, path: str = EMBED_CACHE_DIR, capacity: int = EMBED_CACHE_MAX):
+        self.model = model
+        self.capacity = capacity
+        base = os.path.join(path, re.sub(r"[^0-9A-Za-z._-]+", "_", model))
+        self.vec_path = base + ".f32"
+        self.db_path = base + ".sqlite3"
+        self._conn = None
+        self._mm: Optional[np.memmap] = None
+        self._dim: Optional[int] = None
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    # --- 내부: lock 보유 상태에서 호출 ---
+    def _db(self):
+        if self._conn is None:
+            self._conn = open_db(self.db_path, _SCHEMA)
+            cols = {r[1] for r in self._conn.execute("PRAGMA table_info(vectors)")}
+            if "ready" not in cols:
+                self._conn.execute("ALTER TABLE vectors ADD COLUMN ready INTEGER NOT NULL DEFAULT 1")
+            row = self._conn.execute("SELECT value FROM meta WHERE name = 'dim'").fetchone()
+            self._dim = int(row[0]) if row else None
+            # 상한을 줄였으면 범위 밖 슬롯은 버림
+            self._conn.execute("DELETE FROM vectors WHERE slot >= ?", (self.capacity,))
+            self._conn.commit()
+        return self._conn
+
+    def _vectors(self, dim: Optional[int] = None) -> Optional[np.memmap]:
+        if self._mm is not None:
+            return self._mm
+        conn = self._db()
+        if self._dim is None:
+            if dim is None:
+                return None
+            conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('dim', ?)", (str(dim),))
+            conn.commit()
+            self._dim = dim
+        need = self.capacity * self._dim * 4
+        # 파일은 희소(sparse)하게 늘려 두고 r+로 연다 (쓴 슬롯만 실제 디스크를 차지)
+        with open(self.vec_path, "ab") as f:
+            if f.tell() < need:
+                f.truncate(need)
+        self._mm = np.memmap(self.vec_path, dtype=np.float32, mode="r+", shape=(self.capacity, self._dim))
+        return self._mm
+
+    def _free_slots(self, conn, n: int, keep: Set[str], now: float) -> List[int]:
+        """빈 슬롯 n개 (BEGIN IMMEDIATE 안에서 호출). 모자라면 keep(이번에 함께 쓰는 키)과 진행 중인 예약을 빼고 가장 오래 안 쓴 항목부터 축출"""
+        used = conn.execute("SELECT COUNT(*), COALESCE(MAX(slot), -1) FROM vectors").fetchone()
+        count, top = used
+        slots: List[int] = []
+        if count == top + 1:
+            slots = list(range(top + 1, min(self.capacity, top + 1 + n)))
+        else:
+            taken = {r[0] for r in conn.execute("SELECT slot FROM vectors")}
+            slots = [s for s in range(self.capacity) if s not in taken][:n]
+        short = n - len(slots)
+        if short > 0:
+            rows = conn.execute(
+                "SELECT key, slot FROM vectors WHERE ready = 1 OR last_access < ? ORDER BY last_access ASC LIMIT ?",
+                (now - RESERVE_STALE_SEC, short + len(keep)),
+            ).fetchall()
+            rows = [r for r in rows if r[0] not in keep][:short]
+            # 옛 키 삭제는 예약과 같은 트랜잭션에서 확정되고, 슬롯 덮어쓰기는 그 뒤 → 옛 키가 새 벡터를 가리키지 않음
+            conn.executemany("DELETE FROM vectors WHERE key = ?", [(k,) for k, _ in rows])
+            slots.extend(s for _, s in rows)
+            self._evictions += len(rows)
+        return slots
+
+    def _lookup(self, conn, keys: List[str]) -> Dict[str, int]:
+        found: Dict[str, int] = {}
+        for i in range(0, len(keys), 500):
+            part = keys[i:i + 500]
+            marks = ",".join("?" * len(part))
+            found.update(conn.execute(f"SELECT key, slot FROM vectors WHERE ready = 1 AND key IN ({marks})", part))
+        return found
+
+    def _reserve(self, conn, keys: List[str], now: float) -> Dict[str, int]:
+        """
+        다른 프로세스와 겹치지 않게 슬롯 예약 → {키: 슬롯} (벡터를 새로 써야 하는 키만).
+        이미 ready인 키는 접근 시각만 갱신. 예약 행은 ready=0이라 벡터를 다 쓰기 전엔 아무도 읽지 않음
+        """
+        if conn.in_transaction:
+            conn.commit()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            existing: Dict[str, tuple] = {}
+            for i in range(0, len(keys), 500):
+                part = keys[i:i + 500]
+                marks = ",".join("?" * len(part))
+                for k, slot, ready in conn.execute(
+                    f"SELECT key, slot, ready FROM vectors WHERE key IN ({marks})", part
+                ):
+                    existing[k] = (slot, ready)
+            conn.executemany(
+                "UPDATE vectors SET last_access = ? WHERE key = ?", [(now, k) for k in existing]
+            )
+            todo = {k: slot for k, (slot, ready) in existing.items() if not ready}
+            new_keys = [k for k in keys if k not in existing][:self.capacity - len(existing)]
+            fresh = dict(zip(new_keys, self._free_slots(conn, len(new_keys), set(existing), now)))
+            conn.executemany(
+                "INSERT INTO vectors (key, slot, last_access, ready) VALUES (?, ?, ?, 0)",
+                [(k, s, now) for k, s in fresh.items()],
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        todo.update(fresh)
+        return todo
+
+    # --- 공개 API ---
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        if not keys:
+            return {}
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._db()
+                found = self._lookup(conn, keys)
+                mm = self._vectors() if found else None
+                if mm is None:
+                    self._misses += len(set(keys))
+                    return {}
+                out = {k: mm[s].tolist() for k, s in found.items()}
+                # 읽는 사이 다른 프로세스가 슬롯을 축출·재사용했으면 색인이 바뀌어 있음 → 그 항목은 버림
+                still = self._lookup(conn, list(found))
+                out = {k: v for k, v in out.items() if still.get(k) == found[k]}
+                conn.executemany("UPDATE vectors SET last_access = ? WHERE key = ?", [(now, k) for k in out])
+                conn.commit()
+                self._hits += len(out)
+                self._misses += len(set(keys)) - len(out)
+                return out
+        except Exception as e:
+            print(f"⚠️ 임베딩 캐시 조회 실패: {e}")
+            return {}
+
+    def put_many(self, items: Dict[str, List[float]]) -> None:
+        if not items:
+            return
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._db()
+                dim = len(next(iter(items.values())))
+                mm = self._vectors(dim)
+                if mm.shape[1] != dim:
+                    print(f"⚠️ 임베딩 차원 불일치({mm.shape[1]} != {dim}): 캐시 저장 생략")
+                    return
+                slots = self._reserve(conn, list(items), now)
+                if not slots:
+                    return
+                for k, s in slots.items():
+                    mm[s] = np.asarray(items[k], dtype=np.float32)
+                # 벡터를 먼저 디스크에 내린 뒤 공개 → 색인이 덜 쓴 슬롯을 가리키는 일이 없음
+                mm.flush()
+                conn.executemany(
+                    "UPDATE vectors SET ready = 1, last_access = ? WHERE key = ? AND slot = ?",
+                    [(now, k, s) for k, s in slots.items()],
+                )
+                conn.commit()
+        except Exception as e:
+            print(f"⚠️ 임베딩 캐시 저장 실패: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            try:
+                size = self._db().execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+            except Exception:
+                size = None
+            total = self._hits + self._misses
+            return {
+                "model": self.model,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "size": size,
+                "capacity": self.capacity,
+                "hit_rate": self._hits / total if total else 0.0,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            conn = self._db()
+            conn.execute("DELETE FROM vectors")
+            conn.commit()
+
+
+class CachedEmbeddings(Embeddings):
+    """임베딩 모델 앞단 캐시. 캐시에 없는 텍스트만 모아 한 번에 원래 모델로 보냄"""
+
+    def __init__(self, inner: Embeddings, model: str, store: Optional[EmbeddingStore] = None):
+        self.inner = inner
+        self.model = model
+        self.store = store or EmbeddingStore(model)
+
+    def _keys(self, texts: List[str]) -> List[str]:
+        return [embedding_key(self.model, t) for t in texts]
+
+    def _missing(self, texts: List[str], keys: List[str], cached: Dict[str, List[float]]) -> List[str]:
+        # 같은 텍스트가 여러 번 있어도 한 번만 임베딩
+        seen, out = set(), []
+        for t, k in zip(texts, keys):
+            if k not in cached and k not in seen:
+                seen.add(k)
+                out.append(t)
+        return out
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = self._keys(texts)
+        cached = self.store.get_many(keys)
+        missing = self._missing(texts, keys, cached)
+        if missing:
+            fresh = dict(zip(self._keys(missing), self.inner.embed_documents(missing)))
+            self.store.put_many(fresh)
+            cached.update(fresh)
+        return [cached[k] for k in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = embedding_key(self.model, text)
+        hit = self.store.get_many([key]).get(key)
+        if hit is not None:
+            return hit
+        vec = self.inner.embed_query(text)
+        self.store.put_many({key: vec})
+        return vec
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = self._keys(texts)
+        cached = await asyncio.to_thread(self.store.get_many, keys)
+        missing = self._missing(texts, keys, cached)
+        if missing:
+            fresh = dict(zip(self._keys(missing), await self.inner.aembed_documents(missing)))
+            await asyncio.to_thread(self.store.put_many, fresh)
+            cached.update(fresh)
+        return [cached[k] for k in keys]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        key = embedding_key(self.model, text)
+        hit = (await asyncio.to_thread(self.store.get_many, [key])).get(key)
+        if hit is not None:
+            return hit
+        vec = await self.inner.aembed_query(text)
+        await asyncio.to_thread(self.store.put_many, {key: vec})
+        return vec
@@ -0,0 +1,289 @@
+# FINAL_PROJECT/tools/glossary_index.py
+
+# 『경제금융용어 700선』 표제어 → 항목 본문 색인 (인덱스 빌드 시 추출해 JSON으로 저장)
+# - "듀레이션이 뭐야?" 같은 질문은 조사/의문 어미를 떼고 표제어와 바로 대조
+# - 정확 일치 → 한글 자모 단위 근사 일치(오타 1~2자) 순으로 찾고, 찾으면 임베딩/벡터 검색 없이 그 항목만 사용
+#   근사 일치는 첫 음절이 같을 때만 (또는 아주 긴 표제어의 한 글자 오타): 리플레이션 ≠ 디플레이션
+# - 표제어별로 포맷된 답변을 SQLite에 저장해 두면 LLM 호출도 건너뜀 (정확 일치일 때만)
+
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from tools.sqlite_store import open_db
+from tools.symbol_index import edit_distance, to_jamo
+
+GLOSSARY_PATH = os.getenv("TERM_GLOSSARY_PATH", os.path.join("data", "glossary_terms.json"))
+TERM_ANSWER_CACHE_PATH = os.getenv("TERM_ANSWER_CACHE_PATH", os.path.join("data", "cache", "term_answers.sqlite3"))
+
+MAX_HEADWORD_LEN = 40   # 이보다 긴 줄은 표제어로 보지 않음
+FUZZY_MIN_CHARS = 3     # 이보다 짧은 키(2음절 등)는 근사 일치 안 함: "국내"→국채, "금지"→금리 같은 오인 방지
+FUZZY_MIN_RATIO = 0.95  # 첫 음절이 다른 근사 일치는 자모 유사도가 이 이상일 때만 인정
+RELATED_PREFIX = "연관검색어"
+
+
+class GlossaryEntry(NamedTuple):
+    headword: str
+    aliases: Tuple[str, ...]   # 괄호 속 영문/약어 등 (예: 듀레이션(Duration) → ("듀레이션", "Duration"))
+    text: str                  # 표제어 + 본문 (+ 연관검색어 줄)
+    page: int                  # 0-base (PyMuPDFLoader와 같은 기준)
+
+
+class GlossaryMatch(NamedTuple):
+    entry: GlossaryEntry
+    fuzzy: bool                # 근사 일치(질문한 용어와 표제어가 다름)
+
+
+# -----------------------------
+# 정규화
+# -----------------------------
+_KEY_STRIP_RE = re.compile(r"[\s\.\,\-\_\·\/\(\)\[\]\'\"“”‘’]+")
+_TAIL_PUNCT_RE = re.compile(r"[\s\?\？\!\.\~…]+$")
+
+# 뒤에서부터 반복해서 떼어낼 질문 표현 (공백 제거 후 기준, 긴 것부터)
+_QUESTION_TAILS = (
+    "무엇인가요", "무엇인지", "무엇이야", "무엇이죠", "무엇", "뭔가요", "뭐예요", "뭐에요", "뭐야", "뭐지", "뭐니", "뭔지", "뭐",
+    "알려주세요", "알려줘", "설명해주세요", "설명해줘", "가르쳐줘", "궁금해", "에대해서", "에대해",
+    "이란", "란", "의뜻", "뜻", "의의미", "의미", "개념", "정의", "용어",
+)
+_PARTICLES = ("이", "가", "은", "는", "을", "를", "의")
+
+
+def normalize_term(text: str) -> str:
+    return _KEY_STRIP_RE.sub("", text or "").lower()
+
+
+def query_candidates(query: str) -> List[str]:
+    """질문 → 표제어 후보 (덜 떼어낸 것부터). 표제어 자체가 어미처럼 끝나는 경우를 위해 중간 단계도 모두 포함"""
+    text = normalize_term(_TAIL_PUNCT_RE.sub("", query))
+    out: List[str] = []
+    changed = True
+    while text and changed:
+        if text not in out:
+            out.append(text)
+        changed = False
+        for tail in _QUESTION_TAILS:
+            if text.endswith(tail) and len(text) > len(tail):
+                text, changed = text[:-len(tail)], True
+                break
+    if text and text not in out:
+        out.append(text)
+    core = out[-1] if out else ""
+    for p in _PARTICLES:
+        if core.endswith(p) and len(core) > len(p) + 1:
+            out.append(core[:-len(p)])
+    return out
+
+
+def split_headword(line: str) -> Tuple[str, Tuple[str, ...]]:
+    """'가계부실위험지수(HDRI)' → ('가계부실위험지수(HDRI)', ('가계부실위험지수', 'HDRI'))"""
+    m = re.match(r"^(.+?)\s*\((.+)\)\s*$", line)
+    if not m:
+        return line, ()
+    inner = tuple(a.strip() for a in re.split(r"[,/]", m.group(2)) if a.strip())
+    return line, (m.group(1).strip(),) + inner
+
+
+# -----------------------------
+# 추출 (인덱스 빌드 시)
+# -----------------------------
+def _is_noise(line: str) -> bool:
+    return not line or line.isdigit() or "경제금융용어" in line
+
+
+def _looks_like_headword(line: str) -> bool:
+    return len(line) <= MAX_HEADWORD_LEN and not line.endswith((".", ",", ":")) and not line.startswith(RELATED_PREFIX)
+
+
+def extract_entries(pages: Iterable[Tuple[int, str]]) -> List[GlossaryEntry]:
+    """
+    (페이지 번호, 페이지 텍스트) → 표제어 항목들.
+    용어집은 '표제어 줄 → 본문 → 연관검색어 줄' 구조라, 연관검색어 줄(쉼표로 끝나면 다음 줄까지)을 항목 경계로 본다.
+    연관검색어가 없는 항목은 새 페이지 첫 줄이 표제어 모양이고 직전 본문이 문장으로 끝났을 때 경계로 본다.
+    """
+    entries: List[GlossaryEntry] = []
+    head: Optional[str] = None
+    head_page = 0
+    body: List[str] = []
+    expect_head = True       # 다음 의미 있는 줄이 표제어일 차례
+    in_related = False       # 연관검색어 목록이 다음 줄로 이어지는 중
+
+    def flush():
+        if head and body:
+            line, aliases = split_headword(head)
+            entries.append(GlossaryEntry(line, aliases, "\n".join([head] + body), head_page))
+
+    for page, text in pages:
+        first_on_page = True
+        for raw in text.splitlines():
+            line = raw.strip()
+            if _is_noise(line):
+                continue
+            if in_related:
+                body.append(line)
+                in_related = line.endswith(",")
+                continue
+            page_break = (first_on_page and head is not None and body
+                          and body[-1].endswith("다.") and _looks_like_headword(line))
+            first_on_page = False
+            if (expect_head or page_break) and _looks_like_headword(line):
+                flush()
+                head, head_page, body = line, page, []
+                expect_head = False
+                continue
+            body.append(line)
+            if line.startswith(RELATED_PREFIX):
+                in_related = line.endswith(",")
+                expect_head = True
+    flush()
+    return entries
+
+
+def save_glossary(entries: List[GlossaryEntry], path: str = GLOSSARY_PATH) -> str:
+    """JSON으로 저장하고 내용 해시(build_id)를 반환. build_id가 바뀌면 답변 캐시도 자동으로 무효화됨"""
+    rows = [e._asdict() for e in entries]
+    payload = json.dumps(rows, ensure_ascii=False, sort_keys=True)
+    build_id = hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+    parent = os.path.dirname(path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"build_id": build_id, "entries": rows}, f, ensure_ascii=False)
+    os.replace(tmp, path)
+    return build_id
+
+
+# -----------------------------
+# 조회
+# -----------------------------
+class GlossaryIndex:
+    def __init__(self, entries: Iterable[GlossaryEntry], build_id: str = ""):
+        self.build_id = build_id
+        self.entries: List[GlossaryEntry] = list(entries)
+        self._exact: Dict[str, int] = {}
+        self._jamo_keys: List[Tuple[str, str, int]] = []  # (자모 문자열, 정규화 키, 항목 번호)
+        for i, e in enumerate(self.entries):
+            for key in {e.headword, *e.aliases}:
+                norm = normalize_term(key)
+                if len(norm) < 2:
+                    continue
+                self._exact.setdefault(norm, i)
+                if len(norm) >= FUZZY_MIN_CHARS:
+                    self._jamo_keys.append((to_jamo(norm), norm, i))
+
+    @classmethod
+    def load(cls, path: str = GLOSSARY_PATH) -> Optional["GlossaryIndex"]:
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            entries = [
+                GlossaryEntry(r["headword"], tuple(r.get("aliases") or ()), r["text"], int(r.get("page", 0)))
+                for r in data.get("entries", [])
+            ]
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ 용어집 표제어 색인 로드 실패: {e}")
+            return None
+        return cls(entries, data.get("build_id", ""))
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _fuzzy(self, key: str) -> Optional[int]:
+        """
+        자모 편집 거리가 가장 가까운 항목이 하나뿐일 때만 반환 (짧은 키는 정확 일치만).
+        첫 음절이 다르면 다른 용어일 가능성이 커서(리플레이션/디플레이션) 유사도가 FUZZY_MIN_RATIO 이상일 때만 인정
+        """
+        if len(key) < FUZZY_MIN_CHARS:
+            return None
+        target = to_jamo(key)
+        limit = 1 if len(target) <= 6 else 2
+        best: Dict[int, int] = {}
+        for jamo, norm, i in self._jamo_keys:
+            d = edit_distance(target, jamo, limit)
+            if d > limit or d >= best.get(i, limit + 1):
+                continue
+            if norm[0] != key[0] and 1 - d / max(len(target), len(jamo)) < FUZZY_MIN_RATIO:
+                continue
+            best[i] = d
+        ranked = sorted((d, i) for i, d in best.items())
+        if ranked and (len(ranked) == 1 or ranked[0][0] < ranked[1][0]):
+            return ranked[0][1]
+        return None
+
+    def match(self, query: str) -> Optional[GlossaryMatch]:
+        """질문이 표제어 하나를 가리키면 그 항목 (정확 일치 우선, 없으면 근사 일치)"""
+        cands = [c for c in query_candidates(query) if len(c) >= 2]
+        for c in cands:
+            i = self._exact.get(c)
+            if i is not None:
+                return GlossaryMatch(self.entries[i], False)
+        # 근사 일치는 질문 표현을 다 떼어낸 뒤의 후보들로만
+        for c in cands[-2:]:
+            i = self._fuzzy(c)
+            if i is not None:
+                return GlossaryMatch(self.entries[i], True)
+        return None
+
+    def lookup(self, query: str) -> Optional[GlossaryEntry]:
+        m = self.match(query)
+        return m.entry if m else None
+
+
+# -----------------------------
+# 표제어별 포맷된 답변 캐시
+# -----------------------------
+_ANSWER_SCHEMA = """
+CREATE TABLE IF NOT EXISTS term_answers (
+    key        TEXT PRIMARY KEY,
+    answer     TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+
+class TermAnswerCache:
+    """키: (프롬프트 버전, 용어집 build_id, 표제어). 용어집은 정적이라 TTL 없이 보관"""
+
+    def __init__(self, prompt_version: str, path: str = TERM_ANSWER_CACHE_PATH):
+        self.prompt_version = prompt_version
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self):
+        if self._conn is None:
+            self._conn = open_db(self.path, _ANSWER_SCHEMA)
+        return self._conn
+
+    def _key(self, build_id: str, headword: str) -> str:
+        return f"{self.prompt_version}|{build_id}|{headword}"
+
+    def get(self, build_id: str, headword: str) -> Optional[str]:
+        try:
+            with self._lock:
+                row = self._db().execute(
+                    "SELECT answer FROM term_answers WHERE key = ?", (self._key(build_id, headword),)
+                ).fetchone()
+            return row[0] if row else None
+        except Exception as e:
+            print(f"⚠️ 용어 답변 캐시 조회 실패: {e}")
+            return None
+
+    def put(self, build_id: str, headword: str, answer: str) -> None:
+        try:
+            with self._lock:
+                conn = self._db()
+                conn.execute(
+                    "INSERT OR REPLACE INTO term_answers (key, answer, created_at) VALUES (?, ?, ?)",
+                    (self._key(build_id, headword), answer, time.time()),
+                )
+                conn.commit()
+        except Exception as e:
+            print(f"⚠️ 용어 답변 캐시 저장 실패: {e}")
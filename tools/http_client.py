@@ -0,0 +1,152 @@
+# FINAL_PROJECT/tools/http_client.py
+
+# 모든 외부 HTTP 호출이 공유하는 클라이언트 계층
+# - 호스트별 keep-alive 커넥션 풀 (매 요청마다 TCP+TLS 핸드셰이크 반복 방지)
+# - 기본 connect/read 타임아웃 (타임아웃 없이 매달리는 호출 방지)
+# - 멱등 메서드에 한해 백오프 재시도
+# - 같은 설정의 httpx 기반 비동기 클라이언트
+
+import os
+import asyncio
+import threading
+import weakref
+from typing import Any, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import httpx
+
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3"))
+READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "10"))
+DEFAULT_TIMEOUT: Tuple[float, float] = (CONNECT_TIMEOUT, READ_TIMEOUT)
+
+POOL_HOSTS = int(os.getenv("HTTP_POOL_HOSTS", "20"))       # 캐시할 호스트별 풀 개수
+POOL_PER_HOST = int(os.getenv("HTTP_POOL_PER_HOST", "32"))  # 호스트당 최대 커넥션 수
+MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "2"))
+BACKOFF = float(os.getenv("HTTP_BACKOFF", "0.3"))
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+Timeout = Union[float, Tuple[float, float], None]
+
+# -----------------------------
+# 동기 (requests.Session)
+# -----------------------------
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def _build_session() -> requests.Session:
+    retry = Retry(
+        total=MAX_RETRIES,
+        backoff_factor=BACKOFF,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=IDEMPOTENT_METHODS,  # POST/PATCH는 중복 실행 위험이 있어 재시도하지 않음
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=POOL_PER_HOST, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def request(method: str, url: str, timeout: Timeout = None, **kwargs: Any) -> requests.Response:
+    return get_session().request(method, url, timeout=timeout or DEFAULT_TIMEOUT, **kwargs)
+
+
+def get(url: str, **kwargs: Any) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs: Any) -> requests.Response:
+    return request("POST", url, **kwargs)
+
+
+def patch(url: str, **kwargs: Any) -> requests.Response:
+    return request("PATCH", url, **kwargs)
+
+
+def delete(url: str, **kwargs: Any) -> requests.Response:
+    return request("DELETE", url, **kwargs)
+
+
+# -----------------------------
+# 비동기 (httpx.AsyncClient) — 이벤트 루프마다 하나씩
+# -----------------------------
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def get_async_client() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=POOL_HOSTS * POOL_PER_HOST, max_keepalive_connections=POOL_PER_HOST),
+            transport=httpx.AsyncHTTPTransport(retries=MAX_RETRIES),  # 연결 실패 재시도
+        )
+        _async_clients[loop] = client
+    return client
+
+
+def _to_httpx_timeout(timeout: Timeout) -> Optional[httpx.Timeout]:
+    if timeout is None:
+        return None
+    if isinstance(timeout, tuple):
+        return httpx.Timeout(timeout[1], connect=timeout[0])
+    return httpx.Timeout(timeout)
+
+
+async def arequest(method: str, url: str, timeout: Timeout = None, **kwargs: Any) -> httpx.Response:
+    """requests 스타일 인자(params/json/headers/timeout)를 받아 httpx로 호출합니다."""
+    client = get_async_client()
+    if timeout is not None:
+        kwargs["timeout"] = _to_httpx_timeout(timeout)
+    retries = MAX_RETRIES if method.upper() in IDEMPOTENT_METHODS else 0
+    attempt = 0
+    while True:
+        try:
+            resp = await client.request(method, url, **kwargs)
+            if resp.status_code not in RETRY_STATUSES or attempt >= retries:
+                return resp
+        except httpx.TransportError:
+            if attempt >= retries:
+                raise
+        await asyncio.sleep(BACKOFF * (2 ** attempt))
+        attempt += 1
+
+
+async def aget(url: str, **kwargs: Any) -> httpx.Response:
+    return await arequest("GET", url, **kwargs)
+
+
+async def apost(url: str, **kwargs: Any) -> httpx.Response:
+    return await arequest("POST", url, **kwargs)
+
+
+async def apatch(url: str, **kwargs: Any) -> httpx.Response:
+    return await arequest("PATCH", url, **kwargs)
+
+
+async def adelete(url: str, **kwargs: Any) -> httpx.Response:
+    return await arequest("DELETE", url, **kwargs)
+
+
+async def aclose() -> None:
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
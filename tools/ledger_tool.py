@@ -0,0 +1,303 @@
+# FINAL_PROJECT/tools/ledger_tool.py
+
+# 거래 원장(trades) 기반 포지션 계산 (supabase/002_trade_ledger.sql)
+# - 전체 원장을 매번 다시 읽지 않고 "마지막 스냅샷 + 그 이후 거래"만 접어서(fold) 계산
+# - 프로세스 안에서는 마지막으로 접은 상태를 기억해, 다음 조회 때는 새 거래만 받아옴
+# - 스냅샷 이후 거래가 LEDGER_SNAPSHOT_EVERY건 쌓이면 새 스냅샷을 기록
+# - 과거 시점 조회: 그 시점 이전 마지막 스냅샷 + (스냅샷 이후 ~ 그 시점) 거래
+# - bigserial id는 커밋 순서와 다를 수 있어(낮은 id가 늦게 커밋) 커서 뒤 LEDGER_RESCAN_WINDOW개 id를
+#   매번 다시 훑고, 이미 반영한 id(recent_ids)는 건너뜀
+
+import os
+import asyncio
+import datetime
+import threading
+from typing import Any, Dict, FrozenSet, Iterable, List, NamedTuple, Optional
+
+import pytz
+import requests
+from dotenv import load_dotenv
+
+from tools import http_client
+from langchain_core.tools import tool
+
+load_dotenv()
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY")
+
+LEDGER_SNAPSHOT_EVERY = int(os.getenv("LEDGER_SNAPSHOT_EVERY", "50"))  # 스냅샷 간격 (거래 건수)
+LEDGER_PAGE_SIZE = int(os.getenv("LEDGER_PAGE_SIZE", "1000"))          # PostgREST 한 번에 받을 거래 수
+LEDGER_RESCAN_WINDOW = int(os.getenv("LEDGER_RESCAN_WINDOW", "200"))   # 커서 뒤로 다시 확인할 id 개수
+
+KST = pytz.timezone("Asia/Seoul")
+
+
+class Position(NamedTuple):
+    quantity: int
+    avg_cost: float
+    realized_pnl: float
+
+
+class LedgerState(NamedTuple):
+    last_trade_id: int              # 이 id까지의 거래가 반영됨 (0 = 빈 원장)
+    as_of: Optional[str]            # last_trade_id 거래의 체결 시각
+    positions: Dict[str, Position]  # 전량 매도한 종목도 실현손익 보존을 위해 quantity=0으로 유지
+    recent_ids: FrozenSet[int] = frozenset()  # (last_trade_id - 재확인 구간, last_trade_id] 안에서 반영된 id
+
+    def holdings(self) -> Dict[str, Position]:
+        return {s: p for s, p in self.positions.items() if p.quantity > 0}
+
+    def realized_pnl(self) -> float:
+        return sum(p.realized_pnl for p in self.positions.values())
+
+
+EMPTY_STATE = LedgerState(0, None, {})
+
+
+# -----------------------------
+# 순수 계산 (fold)
+# -----------------------------
+def apply_trade(positions: Dict[str, Position], trade: Dict[str, Any]) -> None:
+    """거래 한 건을 포지션에 반영 (이동평균 원가법, 매도는 평단가 유지 + 실현손익 누적)"""
+    symbol = trade["symbol"]
+    qty = int(trade["quantity"])
+    price = trade.get("price")
+    pos = positions.get(symbol, Position(0, 0.0, 0.0))
+
+    if trade["side"] == "buy":
+        total = pos.quantity + qty
+        avg = (pos.avg_cost * pos.quantity + float(price) * qty) / total
+        positions[symbol] = Position(total, avg, pos.realized_pnl)
+        return
+
+    realized = pos.realized_pnl + ((float(price) - pos.avg_cost) * qty if price is not None else 0.0)
+    remaining = pos.quantity - qty
+    positions[symbol] = Position(remaining, pos.avg_cost if remaining > 0 else 0.0, realized)
+
+
+def window_floor(last_trade_id: int, window: int = LEDGER_RESCAN_WINDOW) -> int:
+    """이 id보다 큰 거래는 매번 다시 받아 recent_ids로 중복을 거름"""
+    return max(0, last_trade_id - window)
+
+
+def fold(state: LedgerState, trades: Iterable[Dict[str, Any]], window: int = LEDGER_RESCAN_WINDOW) -> LedgerState:
+    """이미 반영한 id(recent_ids)는 건너뛰고 반영. 늦게 커밋된 낮은 id도 재확인 구간 안이면 잡힘"""
+    positions = dict(state.positions)
+    last_id, as_of = state.last_trade_id, state.as_of
+    recent = set(state.recent_ids)
+    for trade in trades:
+        trade_id = int(trade["id"])
+        if trade_id in recent:
+            continue
+        apply_trade(positions, trade)
+        recent.add(trade_id)
+        if trade_id > last_id:
+            last_id, as_of = trade_id, trade.get("executed_at")
+    floor = window_floor(last_id, window)
+    return LedgerState(last_id, as_of, positions, frozenset(i for i in recent if i > floor))
+
+
+def _positions_to_json(positions: Dict[str, Position]) -> Dict[str, Dict[str, float]]:
+    return {s: p._asdict() for s, p in positions.items()}
+
+
+def _positions_from_json(data: Dict[str, Dict[str, Any]]) -> Dict[str, Position]:
+    return {
+        s: Position(int(p.get("quantity", 0)), float(p.get("avg_cost", 0.0)), float(p.get("realized_pnl", 0.0)))
+        for s, p in (data or {}).items()
+    }
+
+
+def _snapshot_to_state(row: Optional[Dict[str, Any]]) -> LedgerState:
+    if not row:
+        return EMPTY_STATE
+    recent = frozenset(int(i) for i in (row.get("recent_ids") or []))
+    return LedgerState(int(row["last_trade_id"]), row.get("taken_at"), _positions_from_json(row.get("positions")), recent)
+
+
+def to_utc_iso(when: str) -> str:
+    """'2025-08-01' / '2025-08-01 15:30' / ISO 문자열 → UTC ISO (날짜만 주면 그날 KST 장 마감 후까지 포함)"""
+    text = when.strip()
+    try:
+        dt = datetime.datetime.fromisoformat(text)
+    except ValueError:
+        raise ValueError(f"날짜 형식을 해석할 수 없습니다: {when}")
+    if len(text) <= 10:
+        dt = dt.replace(hour=23, minute=59, second=59)
+    if dt.tzinfo is None:
+        dt = KST.localize(dt)
+    return dt.astimezone(datetime.timezone.utc).isoformat()
+
+
+def parse_ts(text: Optional[str]) -> Optional[datetime.datetime]:
+    """PostgREST timestamptz 문자열 → aware datetime (문자열 비교는 오프셋/소수점 자릿수가 다르면 틀림)"""
+    if not text:
+        return None
+    try:
+        dt = datetime.datetime.fromisoformat(text.strip().replace("Z", "+00:00").replace(" ", "T", 1))
+    except ValueError:
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=datetime.timezone.utc)
+
+
+# -----------------------------
+# Supabase 원장 클라이언트
+# -----------------------------
+class Ledger:
+    def __init__(self, base_url: Optional[str] = None, api_key: Optional[str] = None,
+                 snapshot_every: int = LEDGER_SNAPSHOT_EVERY, page_size: int = LEDGER_PAGE_SIZE):
+        self.base_url = base_url or SUPABASE_URL
+        self.api_key = api_key or SUPABASE_ANON_KEY
+        self.snapshot_every = snapshot_every
+        self.page_size = page_size
+        self._lock = threading.Lock()
+        self._state: Optional[LedgerState] = None   # 마지막으로 접은 최신 상태
+        self._snapshot_id = 0                        # 마지막 스냅샷의 last_trade_id
+
+    def _headers(self, **extra: str) -> Dict[str, str]:
+        return {"apikey": self.api_key, "Authorization": f"Bearer {self.api_key}", **extra}
+
+    def _get(self, table: str, params: Dict[str, str]) -> List[Dict[str, Any]]:
+        r = http_client.get(f"{self.base_url}/rest/v1/{table}", headers=self._headers(), params=params)
+        r.raise_for_status()
+        return r.json() or []
+
+    def _latest_snapshot(self, until: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        params = {"select": "*", "order": "last_trade_id.desc", "limit": "1"}
+        if until:
+            params["taken_at"] = f"lte.{until}"
+        rows = self._get("position_snapshots", params)
+        return rows[0] if rows else None
+
+    def _trades_after(self, trade_id: int, until: Optional[str] = None) -> List[Dict[str, Any]]:
+        """id > trade_id 인 거래를 id 순으로 (페이지 단위)"""
+        out: List[Dict[str, Any]] = []
+        cursor = max(0, trade_id)
+        while True:
+            params = {"select": "*", "id": f"gt.{cursor}", "order": "id.asc", "limit": str(self.page_size)}
+            if until:
+                params["executed_at"] = f"lte.{until}"
+            page = self._get("trades", params)
+            out.extend(page)
+            if len(page) < self.page_size:
+                return out
+            cursor = int(page[-1]["id"])
+
+    def _write_snapshot(self, state: LedgerState) -> None:
+        payload = {
+            "last_trade_id": state.last_trade_id,
+            "taken_at": state.as_of,
+            "positions": _positions_to_json(state.positions),
+            "recent_ids": sorted(state.recent_ids),
+        }
+        try:
+            http_client.post(
+                f"{self.base_url}/rest/v1/position_snapshots?on_conflict=last_trade_id",
+                headers=self._headers(**{"Content-Type": "application/json", "Prefer": "resolution=ignore-duplicates"}),
+                json=payload,
+            ).raise_for_status()
+            self._snapshot_id = state.last_trade_id
+        except requests.exceptions.RequestException as e:
+            print(f"⚠️ 포지션 스냅샷 기록 실패: {e}")
+
+    def _since(self, state: LedgerState, until: Optional[str] = None) -> LedgerState:
+        """state 이후 거래 반영. 재확인 구간(last_trade_id 뒤쪽)부터 다시 받아 늦게 보인 거래를 줍는다"""
+        trades = self._trades_after(window_floor(state.last_trade_id), until)
+        return fold(state, trades)
+
+    def _from_snapshot(self, row: Optional[Dict[str, Any]], until: Optional[str] = None) -> LedgerState:
+        state = _snapshot_to_state(row)
+        if row and row.get("recent_ids") is None:
+            # recent_ids가 없는 예전 스냅샷: 구간 안의 기존 거래는 이미 반영된 것으로 간주 (이전 동작과 동일)
+            known = self._trades_after(window_floor(state.last_trade_id), until)
+            state = state._replace(recent_ids=frozenset(
+                int(t["id"]) for t in known if int(t["id"]) <= state.last_trade_id
+            ))
+        return state
+
+    def current(self) -> LedgerState:
+        """최신 포지션. 기억한 상태(없으면 마지막 스냅샷) 이후의 거래만 받아 반영"""
+        with self._lock:
+            state = self._state
+            if state is None:
+                state = self._from_snapshot(self._latest_snapshot())
+                self._snapshot_id = state.last_trade_id
+            state = self._since(state)
+            self._state = state
+            if state.last_trade_id - self._snapshot_id >= self.snapshot_every:
+                self._write_snapshot(state)
+            return state
+
+    def at(self, when: str) -> LedgerState:
+        """when(UTC ISO) 시점의 포지션"""
+        cached = self._state
+        cached_at, until = parse_ts(cached.as_of if cached else None), parse_ts(when)
+        if cached_at is not None and until is not None and cached_at <= until:
+            # 기억한 최신 상태가 그 시점 이전이면 그 사이 거래만 추가로 반영
+            return self._since(cached, when)
+        return self._since(self._from_snapshot(self._latest_snapshot(when), when), when)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._state = None
+            self._snapshot_id = 0
+
+
+_ledger: Optional[Ledger] = None
+_ledger_lock = threading.Lock()
+
+
+def get_ledger() -> Ledger:
+    global _ledger
+    if _ledger is None:
+        with _ledger_lock:
+            if _ledger is None:
+                _ledger = Ledger()
+    return _ledger
+
+
+# -----------------------------
+# LangChain tool
+# -----------------------------
+def _render_positions(state: LedgerState, label: str) -> str:
+    lines = [
+        f"**📒 거래 원장 기준 포지션 ({label})**",
+        "| 종목 | 보유 수량 | 평균 단가 | 실현 손익 |",
+        "|:---:|:---:|:---:|:---:|",
+    ]
+    for symbol, pos in sorted(state.positions.items()):
+        if pos.quantity == 0 and pos.realized_pnl == 0:
+            continue
+        lines.append(f"| {symbol} | {pos.quantity:,} | {pos.avg_cost:,.2f} | {pos.realized_pnl:,.2f} |")
+    if len(lines) == 3:
+        return f"{label} 기준 거래 기록이 없습니다."
+    lines.append(f"\n- 총 실현 손익: {state.realized_pnl():,.2f} (종목 통화 기준 단순 합계)")
+    return "\n".join(lines)
+
+
+@tool
+def get_trade_ledger(as_of: str = "") -> str:
+    """
+    거래 원장을 기준으로 종목별 보유 수량, 평균 단가, 실현 손익을 보여줍니다.
+    as_of에 날짜/시각(예: '2025-08-01', '2025-08-01 15:30')을 주면 그 시점의 포지션을, 비우면 현재 포지션을 반환합니다.
+    """
+    if not SUPABASE_URL or not SUPABASE_ANON_KEY:
+        return "❌ Supabase 환경 변수가 설정되지 않았습니다."
+    try:
+        if as_of.strip():
+            state = get_ledger().at(to_utc_iso(as_of))
+            label = as_of.strip()
+        else:
+            state = get_ledger().current()
+            label = "현재"
+    except ValueError as e:
+        return f"❌ {e}"
+    except requests.exceptions.RequestException as e:
+        return f"❌ 거래 원장을 가져오는 중 오류가 발생했습니다: {e}"
+    return _render_positions(state, label)
+
+
+async def _aget_trade_ledger(as_of: str = "") -> str:
+    return await asyncio.to_thread(get_trade_ledger.func, as_of)
+
+get_trade_ledger.coroutine = _aget_trade_ledger
@@ -0,0 +1,153 @@
+# FINAL_PROJECT/tools/market_store.py
+
+# 재시작해도 남는 로컬 시세 저장소 (SQLite)
+# - quotes: 조회한 모든 시세를 소스/시각과 함께 기록 → 시작 시 메모리 캐시 예열
+#           QUOTE_RETENTION_DAYS보다 오래된 행은 시작 시와 기록 중 PRUNE_INTERVAL마다 삭제
+# - bars:   Yahoo chart 등에서 받은 봉 데이터를 버리지 않고 보관해 재사용
+
+import os
+import time
+import threading
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from tools.sqlite_store import open_db
+
+MARKET_STORE_PATH = os.getenv("MARKET_STORE_PATH", os.path.join("data", "cache", "market.sqlite3"))
+QUOTE_RETENTION_DAYS = int(os.getenv("QUOTE_RETENTION_DAYS", "30"))
+PRUNE_INTERVAL = 3600.0   # 기록 중 오래된 시세 정리 주기(초)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS quotes (
+    symbol     TEXT NOT NULL,
+    price      REAL NOT NULL,
+    source     TEXT,
+    fetched_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_quotes_symbol_time ON quotes (symbol, fetched_at);
+CREATE INDEX IF NOT EXISTS idx_quotes_time ON quotes (fetched_at);
+
+CREATE TABLE IF NOT EXISTS bars (
+    symbol   TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    ts       INTEGER NOT NULL,   -- 봉 시작 시각 (epoch seconds)
+    open     REAL,
+    high     REAL,
+    low      REAL,
+    close    REAL,
+    volume   REAL,
+    PRIMARY KEY (symbol, interval, ts)
+) WITHOUT ROWID;
+"""
+
+
+class StoredQuote(NamedTuple):
+    symbol: str
+    price: float
+    source: Optional[str]
+    fetched_at: float
+
+
+Bar = Tuple[int, Optional[float], Optional[float], Optional[float], Optional[float], Optional[float]]
+
+
+class MarketStore:
+    def __init__(self, path: str = MARKET_STORE_PATH):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+        self._pruned_at = 0.0
+
+    def _db(self):
+        if self._conn is None:
+            self._conn = open_db(self.path, _SCHEMA)
+        return self._conn
+
+    # ---- quotes ----
+    def record_quotes(self, rows: Iterable[Tuple[str, float, Optional[str]]], fetched_at: Optional[float] = None) -> None:
+        ts = fetched_at if fetched_at is not None else time.time()
+        data = [(sym, float(price), source, ts) for sym, price, source in rows]
+        if not data:
+            return
+        try:
+            with self._lock:
+                conn = self._db()
+                conn.executemany("INSERT INTO quotes (symbol, price, source, fetched_at) VALUES (?, ?, ?, ?)", data)
+                conn.commit()
+                due = time.time() - self._pruned_at >= PRUNE_INTERVAL
+            if due:
+                self.prune()
+        except Exception as e:
+            print(f"⚠️ 시세 저장 실패: {e}")
+
+    def record_quote(self, symbol: str, price: float, source: Optional[str] = None) -> None:
+        self.record_quotes([(symbol, price, source)])
+
+    def latest_quotes(self, max_age: float) -> List[StoredQuote]:
+        """max_age초 이내에 기록된 종목별 최신 시세"""
+        try:
+            with self._lock:
+                rows = self._db().execute(
+                    """SELECT symbol, price, source, MAX(fetched_at) FROM quotes
+                       WHERE fetched_at >= ? GROUP BY symbol""",
+                    (time.time() - max_age,),
+                ).fetchall()
+        except Exception as e:
+            print(f"⚠️ 시세 저장소 조회 실패: {e}")
+            return []
+        return [StoredQuote(*row) for row in rows]
+
+    # ---- bars ----
+    def record_bars(self, symbol: str, interval: str, bars: Iterable[Bar]) -> None:
+        data = [(symbol, interval, int(b[0]), *b[1:]) for b in bars]
+        if not data:
+            return
+        try:
+            with self._lock:
+                conn = self._db()
+                conn.executemany(
+                    """INSERT OR REPLACE INTO bars (symbol, interval, ts, open, high, low, close, volume)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                    data,
+                )
+                conn.commit()
+        except Exception as e:
+            print(f"⚠️ 봉 데이터 저장 실패: {e}")
+
+    def get_bars_many(self, symbols: List[str], interval: str, since: int = 0) -> List[Tuple[str, int, Optional[float]]]:
+        """여러 종목의 (symbol, ts, close)를 한 번의 쿼리로 조회"""
+        if not symbols:
+            return []
+        marks = ",".join("?" * len(symbols))
+        with self._lock:
+            return self._db().execute(
+                f"""SELECT symbol, ts, close FROM bars
+                    WHERE interval = ? AND ts >= ? AND symbol IN ({marks}) ORDER BY symbol, ts""",
+                (interval, since, *symbols),
+            ).fetchall()
+
+    # ---- 정리 ----
+    def prune(self, retention_days: int = QUOTE_RETENTION_DAYS) -> int:
+        """보관 기간이 지난 시세 삭제. 삭제한 행 수를 반환"""
+        try:
+            with self._lock:
+                self._pruned_at = time.time()
+                conn = self._db()
+                cur = conn.execute("DELETE FROM quotes WHERE fetched_at < ?", (self._pruned_at - retention_days * 86400,))
+                conn.commit()
+                return cur.rowcount
+        except Exception as e:
+            print(f"⚠️ 시세 저장소 정리 실패: {e}")
+            return 0
+
+
+_store: Optional[MarketStore] = None
+_store_lock = threading.Lock()
+
+
+def get_market_store() -> MarketStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = MarketStore()
+    return _store
@@ -1,66 +1,154 @@
 # FINAL_PROJECT/tools/portfolio_tool.py (최종 완성본)
 
 import os
+import asyncio
 import requests
+import httpx
 from dotenv import load_dotenv
-from typing import Optional, Dict, Any
-import datetime
-import pytz
+from typing import Optional, Dict, Any, Tuple, List, Literal
+from pydantic import BaseModel, Field
 
+from tools import http_client
+from tools.stock_price_tool import fetch_quote, afetch_quote, fetch_quotes
+from tools.symbol_resolver import resolve_symbols
 from langchain_core.tools import tool # ⭐️ langchain_core.tools에서 tool을 import 하도록 수정
 
 load_dotenv()
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY")
 
-def _get_existing_stock(symbol: str) -> Optional[dict]:
-    url = f"{SUPABASE_URL}/rest/v1/portfolio?symbol=eq.{symbol}"
-    headers = {
-        "apikey": SUPABASE_ANON_KEY,
-        "Authorization": f"Bearer {SUPABASE_ANON_KEY}",
-    }
-    try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        data = response.json()
-        return data[0] if data else None
-    except Exception:
+# -----------------------------
+# 서버 측 원자적 거래 (supabase/001_trade_rpc.sql, 002_trade_ledger.sql 의 trade_buy / trade_sell RPC)
+# 조회 → 계산 → PATCH/POST/DELETE 여러 번 왕복하던 것을 한 번의 요청으로 처리
+# -----------------------------
+class TradeError(Exception):
+    """RPC가 raise exception으로 거절한 거래 (message: not_held / insufficient_quantity / invalid_order)"""
+
+    def __init__(self, message: str, details: Optional[str] = None, hint: Optional[str] = None):
+        super().__init__(message)
+        self.message = message
+        self.details = details
+        self.hint = hint  # trade_batch: 'leg:<순번>'
+
+    @property
+    def leg(self) -> Optional[int]:
+        if self.hint and self.hint.startswith("leg:"):
+            try:
+                return int(self.hint[4:])
+            except ValueError:
+                return None
         return None
 
-def _update_portfolio(symbol: str, payload: Dict[str, Any]) -> bool:
-    url = f"{SUPABASE_URL}/rest/v1/portfolio?symbol=eq.{symbol}"
-    headers = {
+def _insert_headers() -> Dict[str, str]:
+    return {
         "apikey": SUPABASE_ANON_KEY,
         "Authorization": f"Bearer {SUPABASE_ANON_KEY}",
-        "Content-Type": "application/json",
-        "Prefer": "return=representation"
+        "Content-Type": "application/json"
     }
-    try:
-        response = requests.patch(url, headers=headers, json=payload)
-        response.raise_for_status()
-        return True
-    except Exception as e:
-        print(f"--- Supabase 업데이트 오류 ---")
-        print(f"심볼: {symbol}, 페이로드: {payload}")
-        if hasattr(e, 'response') and e.response is not None:
-            print(f"상세 오류: {e.response.text}")
-        else:
-            print(f"오류: {e}")
-        print(f"--------------------------")
-        return False
 
-def _delete_stock(symbol: str) -> bool:
-    url = f"{SUPABASE_URL}/rest/v1/portfolio?symbol=eq.{symbol}"
-    headers = {
-        "apikey": SUPABASE_ANON_KEY,
-        "Authorization": f"Bearer {SUPABASE_ANON_KEY}",
-    }
+def _rpc_url(fn: str) -> str:
+    return f"{SUPABASE_URL}/rest/v1/rpc/{fn}"
+
+def _rpc_result(response) -> Any:
+    """
+    PostgREST 오류 본문({code, message, details})을 TradeError로 변환.
+    JSON이 아닌 응답(프록시 오류 페이지 등)도 requests/httpx 양쪽 모두 TradeError로
+    """
     try:
-        response = requests.delete(url, headers=headers)
-        response.raise_for_status()
-        return True
-    except Exception:
-        return False
+        body = response.json()
+    except ValueError:  # requests.JSONDecodeError / json.JSONDecodeError 모두 ValueError
+        body = None
+    if response.status_code >= 400:
+        body = body if isinstance(body, dict) else {}
+        raise TradeError(body.get("message") or f"HTTP {response.status_code}", body.get("details"), body.get("hint"))
+    if body is None:
+        raise TradeError(f"HTTP {response.status_code} 응답을 해석할 수 없습니다")
+    return body
+
+def _rpc(fn: str, params: Dict[str, Any]) -> Any:
+    return _rpc_result(http_client.post(_rpc_url(fn), headers=_insert_headers(), json=params))
+
+async def _arpc(fn: str, params: Dict[str, Any]) -> Any:
+    return _rpc_result(await http_client.apost(_rpc_url(fn), headers=_insert_headers(), json=params))
+
+def _buy_params(symbol: str, quantity: int, price: float) -> Dict[str, Any]:
+    return {"p_symbol": symbol, "p_quantity": quantity, "p_price": price}
+
+def _sell_params(symbol: str, quantity: int, price: Optional[float]) -> Dict[str, Any]:
+    return {"p_symbol": symbol, "p_quantity": quantity, "p_price": price}
+
+def _parse_buy_input(action_input: str) -> Tuple[str, int, float]:
+    symbol, quantity_str, price_str = action_input.split(',')
+    return symbol.strip(), int(quantity_str.strip()), float(price_str.strip())
+
+def _parse_sell_input(action_input: str) -> Tuple[str, int, Optional[float]]:
+    """'종목명,수량' 또는 '종목명,수량,가격' (가격이 없으면 현재가로 원장에 기록)"""
+    parts = action_input.split(',')
+    if len(parts) not in (2, 3):
+        raise ValueError("입력값은 2개 또는 3개여야 합니다.")
+    price = float(parts[2].strip()) if len(parts) == 3 and parts[2].strip() else None
+    return parts[0].strip(), int(parts[1].strip()), price
+
+BUY_FORMAT_ERROR = "❌ 입력 형식이 올바르지 않습니다. '종목명,수량,가격' 형식으로 입력해주세요."
+SELL_FORMAT_ERROR = "❌ 입력 형식이 올바르지 않습니다. '종목명,수량' 또는 '종목명,수량,가격' 형식으로 입력해주세요. (예: 'AAPL,5')"
+ENV_ERROR = "❌ Supabase 환경 변수가 설정되지 않았습니다."
+
+def _buy_message(symbol: str, quantity: int, position: Dict[str, Any]) -> str:
+    if position["quantity"] == quantity:
+        return f"✅ {symbol} {quantity}주를 신규 매수하여 Supabase에 기록했습니다."
+    return (f"✅ {symbol} {quantity}주를 추가 매수했습니다. "
+            f"(총 {position['quantity']}주, 평단가: {position['purchase_price']:,.2f})")
+
+def _sell_message(symbol: str, quantity: int, result: Dict[str, Any]) -> str:
+    realized = result.get("realized_pnl")
+    pnl = f" 실현 손익: {realized:,.2f}" if realized is not None else ""
+    if result.get("deleted"):
+        return f"✅ {symbol} {quantity}주를 전량 매도하여 포트폴리오에서 삭제했습니다.{pnl}"
+    return f"✅ {symbol} {quantity}주를 매도했습니다. (남은 수량: {result['quantity']}주){pnl}"
+
+def _holding_params(symbol: str) -> Dict[str, str]:
+    return {"select": "quantity", "symbol": f"eq.{symbol}"}
+
+def _check_sellable(symbol: str, quantity: int, rows: List[Dict[str, Any]]) -> None:
+    """보유 없음/수량 부족이면 RPC와 같은 TradeError (최종 판정은 어차피 RPC가 행 잠금 후 다시 함)"""
+    held = int(rows[0].get("quantity") or 0) if rows else 0
+    if held <= 0:
+        raise TradeError("not_held", "0")
+    if held < quantity:
+        raise TradeError("insufficient_quantity", str(held))
+
+def _sell_price(symbol: str, quantity: int, price: Optional[float]) -> Optional[float]:
+    """
+    매도 가격이 없으면 현재가를 원장 기록/실현손익 계산에 사용 (조회 실패 시 None으로 기록).
+    보유 수량을 먼저 확인해, 팔 수 없는 주문 때문에 시세 API를 부르지 않음
+    """
+    if price is not None:
+        return price
+    response = http_client.get(f"{SUPABASE_URL}/rest/v1/portfolio", headers=_insert_headers(),
+                               params=_holding_params(symbol))
+    response.raise_for_status()
+    _check_sellable(symbol, quantity, response.json() or [])
+    quote = fetch_quote(symbol)
+    return quote.price if quote else None
+
+async def _asell_price(symbol: str, quantity: int, price: Optional[float]) -> Optional[float]:
+    if price is not None:
+        return price
+    response = await http_client.aget(f"{SUPABASE_URL}/rest/v1/portfolio", headers=_insert_headers(),
+                                      params=_holding_params(symbol))
+    response.raise_for_status()
+    _check_sellable(symbol, quantity, response.json() or [])
+    quote = await afetch_quote(symbol)
+    return quote.price if quote else None
+
+def _trade_error_message(symbol: str, quantity: int, err: TradeError) -> str:
+    if err.message == "not_held":
+        return f"❌ {symbol}을(를) 보유하고 있지 않아 매도할 수 없습니다."
+    if err.message == "insufficient_quantity":
+        return f"❌ 매도하려는 수량({quantity}주)이 보유 수량({err.details}주)보다 많습니다."
+    if err.message == "invalid_order":
+        return f"❌ 수량과 가격은 0보다 커야 합니다. ({err.details})"
+    return f"❌ {symbol} 거래 처리에 실패했습니다: {err.message}"
 
 @tool
 def buy_stock(action_input: str) -> str:
@@ -70,101 +158,186 @@ def buy_stock(action_input: str) -> str:
         action_input (str): '종목명,수량,가격' 형식의 문자열 (예: "AAPL,10,200.50").
     """
     if not SUPABASE_URL or not SUPABASE_ANON_KEY:
-        return "❌ Supabase 환경 변수가 설정되지 않았습니다."
+        return ENV_ERROR
     try:
-        symbol, quantity_str, price_str = action_input.split(',')
-        symbol = symbol.strip()
-        quantity = int(quantity_str.strip())
-        price = float(price_str.strip())
+        symbol, quantity, price = _parse_buy_input(action_input)
     except ValueError:
-        return "❌ 입력 형식이 올바르지 않습니다. '종목명,수량,가격' 형식으로 입력해주세요."
-
-    korea_timezone = pytz.timezone('Asia/Seoul')
-    now_kst_iso = datetime.datetime.now(korea_timezone).isoformat()
-
-    existing_stock = _get_existing_stock(symbol)
-
-    if existing_stock:
-        old_quantity = existing_stock['quantity']
-        old_avg_price = existing_stock['purchase_price']
-        
-        total_cost = (old_avg_price * old_quantity) + (price * quantity)
-        total_quantity = old_quantity + quantity
-        
-        new_avg_price = total_cost / total_quantity
-        
-        update_payload = {
-            "quantity": total_quantity,
-            "purchase_price": new_avg_price,
-            "created_at": now_kst_iso # 👈 컬럼명 수정
-        }
-        if _update_portfolio(symbol, update_payload):
-            return (f"✅ {symbol} {quantity}주를 추가 매수했습니다. "
-                    f"(총 {total_quantity}주, 평단가: {new_avg_price:,.2f})")
-        else:
-            return f"❌ {symbol} 정보 업데이트에 실패했습니다."
-    else:
-        url = f"{SUPABASE_URL}/rest/v1/portfolio"
-        headers = {
-            "apikey": SUPABASE_ANON_KEY,
-            "Authorization": f"Bearer {SUPABASE_ANON_KEY}",
-            "Content-Type": "application/json"
-        }
-        payload = {
-            "symbol": symbol, 
-            "quantity": quantity, 
-            "purchase_price": price,
-            "created_at": now_kst_iso # 👈 컬럼명 수정
-        }
-        try:
-            requests.post(url, headers=headers, json=payload).raise_for_status()
-            return f"✅ {symbol} {quantity}주를 신규 매수하여 Supabase에 기록했습니다."
-        except requests.exceptions.RequestException as e:
-            return f"❌ Supabase에 거래 기록 실패: {e}"
+        return BUY_FORMAT_ERROR
+
+    # 평단가 계산/신규·추가 판단은 서버 트랜잭션 안에서 (동시 매수도 손실 없이 합산)
+    try:
+        position = _rpc("trade_buy", _buy_params(symbol, quantity, price))
+    except TradeError as e:
+        return _trade_error_message(symbol, quantity, e)
+    except requests.exceptions.RequestException as e:
+        return f"❌ Supabase에 거래 기록 실패: {e}"
+    return _buy_message(symbol, quantity, position)
 
 @tool
 def sell_stock(action_input: str) -> str:
     """
     사용자의 요청에 따라 주식을 매도합니다. 매도 후 수량이 0이 되면 포트폴리오에서 자동 삭제됩니다.
+    매도 가격을 생략하면 현재가로 거래 원장에 기록하고 실현 손익을 계산합니다.
     Args:
-        action_input (str): '종목명,수량' 형식의 문자열 (예: "AAPL,5").
+        action_input (str): '종목명,수량' 또는 '종목명,수량,가격' 형식의 문자열 (예: "AAPL,5", "AAPL,5,210.5").
     """
     if not SUPABASE_URL or not SUPABASE_ANON_KEY:
-        return "❌ Supabase 환경 변수가 설정되지 않았습니다."
+        return ENV_ERROR
     
     try:
-        parts = action_input.split(',')
-        if len(parts) != 2:
-            raise ValueError("입력값은 정확히 2개여야 합니다.")
-        symbol = parts[0].strip()
-        quantity = int(parts[1].strip())
+        symbol, quantity, price = _parse_sell_input(action_input)
     except ValueError:
-        return "❌ 입력 형식이 올바르지 않습니다. '종목명,수량' 형식으로 입력해주세요. (예: 'AAPL,5')"
-    
-    existing_stock = _get_existing_stock(symbol)
-    if not existing_stock:
-        return f"❌ {symbol}을(를) 보유하고 있지 않아 매도할 수 없습니다."
-    
-    current_quantity = existing_stock['quantity']
-    if current_quantity < quantity:
-        return f"❌ 매도하려는 수량({quantity}주)이 보유 수량({current_quantity}주)보다 많습니다."
-
-    new_quantity = current_quantity - quantity
-
-    if new_quantity > 0:
-        korea_timezone = pytz.timezone('Asia/Seoul')
-        now_kst_iso = datetime.datetime.now(korea_timezone).isoformat()
-        
-        update_payload = {
-            "quantity": new_quantity,
-            "created_at": now_kst_iso # 👈 컬럼명 수정
-        }
-        if _update_portfolio(symbol, update_payload):
-            return f"✅ {symbol} {quantity}주를 매도했습니다. (남은 수량: {new_quantity}주)"
-        else:
-            return f"❌ {symbol} 정보 업데이트에 실패했습니다."
-    else:
-        if _delete_stock(symbol):
-            return f"✅ {symbol} {quantity}주를 전량 매도하여 포트폴리오에서 삭제했습니다."
+        return SELL_FORMAT_ERROR
+
+    # 보유 확인 → 차감/삭제 → 원장 기록을 서버에서 행 잠금 후 한 번에
+    try:
+        result = _rpc("trade_sell", _sell_params(symbol, quantity, _sell_price(symbol, quantity, price)))
+    except TradeError as e:
+        return _trade_error_message(symbol, quantity, e)
+    except requests.exceptions.RequestException as e:
+        return f"❌ Supabase에 거래 기록 실패: {e}"
+    return _sell_message(symbol, quantity, result)
+
+# -----------------------------
+# 비동기 버전 (LangGraph ToolNode의 ainvoke 경로)
+# -----------------------------
+async def _abuy_stock(action_input: str) -> str:
+    if not SUPABASE_URL or not SUPABASE_ANON_KEY:
+        return ENV_ERROR
+    try:
+        symbol, quantity, price = _parse_buy_input(action_input)
+    except ValueError:
+        return BUY_FORMAT_ERROR
+
+    try:
+        position = await _arpc("trade_buy", _buy_params(symbol, quantity, price))
+    except TradeError as e:
+        return _trade_error_message(symbol, quantity, e)
+    except httpx.HTTPError as e:
+        return f"❌ Supabase에 거래 기록 실패: {e}"
+    return _buy_message(symbol, quantity, position)
+
+async def _asell_stock(action_input: str) -> str:
+    if not SUPABASE_URL or not SUPABASE_ANON_KEY:
+        return ENV_ERROR
+    try:
+        symbol, quantity, price = _parse_sell_input(action_input)
+    except ValueError:
+        return SELL_FORMAT_ERROR
+
+    try:
+        result = await _arpc("trade_sell", _sell_params(symbol, quantity, await _asell_price(symbol, quantity, price)))
+    except TradeError as e:
+        return _trade_error_message(symbol, quantity, e)
+    except httpx.HTTPError as e:
+        return f"❌ Supabase에 거래 기록 실패: {e}"
+    return _sell_message(symbol, quantity, result)
+
+buy_stock.coroutine = _abuy_stock
+sell_stock.coroutine = _asell_stock
+
+# -----------------------------
+# 여러 건 일괄 주문 (supabase/003_trade_batch.sql 의 trade_batch RPC)
+# 모든 주문을 먼저 검증·해석한 뒤, 한 번의 승인과 한 번의 요청으로 전부 적용 (하나라도 실패하면 전체 취소)
+# -----------------------------
+class OrderLeg(BaseModel):
+    side: Literal["buy", "sell"] = Field(description="매수는 'buy', 매도는 'sell'")
+    symbol: str = Field(description="종목명 또는 티커 (예: 'AAPL', '삼성전자')")
+    quantity: int = Field(description="주문 수량 (양의 정수)")
+    price: Optional[float] = Field(default=None, description="주문 가격. 생략하면 현재가 사용")
+
+def _leg_label(leg: Dict[str, Any]) -> str:
+    side = "매수" if leg["side"] == "buy" else "매도"
+    return f"{leg['symbol']} {leg['quantity']}주 {side}"
+
+def _prepare_legs(legs: List[OrderLeg]) -> Tuple[Optional[List[Dict[str, Any]]], Optional[str]]:
+    """
+    주문 검증 + 종목 해석(일괄) + 가격이 빠진 주문의 현재가 채우기(일괄).
+    (RPC에 보낼 leg 목록, 오류 메시지) 중 하나를 반환합니다.
+    """
+    if not legs:
+        return None, "❌ 주문이 비어 있습니다."
+    legs = [OrderLeg.model_validate(leg) if isinstance(leg, dict) else leg for leg in legs]
+    errors = []
+    for i, leg in enumerate(legs, 1):
+        if not leg.symbol.strip():
+            errors.append(f"{i}번째 주문: 종목이 비어 있습니다.")
+        if leg.quantity <= 0:
+            errors.append(f"{i}번째 주문: 수량은 0보다 커야 합니다.")
+        if leg.price is not None and leg.price <= 0:
+            errors.append(f"{i}번째 주문: 가격은 0보다 커야 합니다.")
+    if errors:
+        return None, "❌ 주문을 확인해주세요.\n" + "\n".join(f"- {e}" for e in errors)
+
+    names = [leg.symbol.strip() for leg in legs]
+    resolved = resolve_symbols(names)
+    unknown = list(dict.fromkeys(n for n in names if not resolved.get(n)))
+    if unknown:
+        return None, f"❌ 종목을 찾지 못했습니다: {', '.join(unknown)}"
+
+    # 단건 매수/매도와 같은 키로 기록되도록 종목은 입력한 그대로 저장, 해석 결과는 시세 조회에만 사용
+    need_quote = list(dict.fromkeys(resolved[n] for n, leg in zip(names, legs) if leg.price is None))
+    quotes = fetch_quotes(need_quote, resolved=True) if need_quote else {}
+    prepared = []
+    for name, leg in zip(names, legs):
+        price = leg.price
+        if price is None:
+            quote = quotes.get(resolved[name])
+            if quote is None and leg.side == "buy":
+                return None, f"❌ {name}의 현재가를 조회하지 못해 매수 가격을 정할 수 없습니다. 가격을 지정해주세요."
+            price = quote.price if quote else None
+        prepared.append({"side": leg.side, "symbol": name, "quantity": leg.quantity, "price": price})
+    return prepared, None
+
+def _batch_message(legs: List[Dict[str, Any]], results: List[Dict[str, Any]]) -> str:
+    lines = [f"✅ 주문 {len(legs)}건을 한 번에 처리했습니다."]
+    for leg, result in zip(legs, results):
+        if leg["side"] == "buy":
+            lines.append("- " + _buy_message(leg["symbol"], leg["quantity"], result).lstrip("✅ "))
         else:
-            return f"❌ {symbol} 종목 삭제에 실패했습니다."
\ No newline at end of file
+            lines.append("- " + _sell_message(leg["symbol"], leg["quantity"], result).lstrip("✅ "))
+    return "\n".join(lines)
+
+def _batch_error_message(legs: List[Dict[str, Any]], err: TradeError) -> str:
+    idx = err.leg
+    if idx is None or idx >= len(legs):
+        return f"❌ 일괄 주문 처리에 실패하여 전체 주문이 취소되었습니다: {err.message}"
+    leg = legs[idx]
+    reason = _trade_error_message(leg["symbol"], leg["quantity"], err).lstrip("❌ ")
+    return f"❌ {idx + 1}번째 주문({_leg_label(leg)})이 거절되어 전체 주문이 취소되었습니다: {reason}"
+
+@tool
+def place_orders(legs: List[OrderLeg]) -> str:
+    """
+    여러 종목의 매수/매도 주문을 한 번에 실행합니다. 리밸런싱처럼 주문이 2건 이상일 때 사용하세요.
+    모든 주문을 먼저 검증한 뒤 하나의 트랜잭션으로 처리하며, 하나라도 실패하면 전체가 취소됩니다.
+    예: [{"side": "sell", "symbol": "TSLA", "quantity": 5}, {"side": "buy", "symbol": "AAPL", "quantity": 3, "price": 210}]
+    """
+    if not SUPABASE_URL or not SUPABASE_ANON_KEY:
+        return ENV_ERROR
+    prepared, error = _prepare_legs(legs)
+    if error:
+        return error
+    try:
+        results = _rpc("trade_batch", {"p_legs": prepared})
+    except TradeError as e:
+        return _batch_error_message(prepared, e)
+    except requests.exceptions.RequestException as e:
+        return f"❌ Supabase에 거래 기록 실패: {e}"
+    return _batch_message(prepared, results)
+
+async def _aplace_orders(legs: List[OrderLeg]) -> str:
+    if not SUPABASE_URL or not SUPABASE_ANON_KEY:
+        return ENV_ERROR
+    prepared, error = await asyncio.to_thread(_prepare_legs, legs)
+    if error:
+        return error
+    try:
+        results = await _arpc("trade_batch", {"p_legs": prepared})
+    except TradeError as e:
+        return _batch_error_message(prepared, e)
+    except httpx.HTTPError as e:
+        return f"❌ Supabase에 거래 기록 실패: {e}"
+    return _batch_message(prepared, results)
+
+place_orders.coroutine = _aplace_orders
@@ -0,0 +1,378 @@
+# FINAL_PROJECT/tools/quant_analytics.py
+
+# 여러 종목의 일봉 히스토리를 한 번에 받아 NumPy 벡터 연산으로 정량 지표를 계산
+# - 수익률(1M/3M/1Y), 연환산 변동성, 최대/현재 낙폭, 벤치마크 대비 베타, 이동평균(20/60/200) 괴리율
+# - 일간 수익률 상관계수 행렬 (종목별 거래일이 달라도 pairwise-complete 방식)
+# - 히스토리는 메모리 + 로컬 시세 저장소(bars, interval="1d")에 보관, 부족한 구간만 증분 다운로드
+# - 종가는 수정주가(auto_adjust)라 분할/배당이 생기면 과거 값 전체의 기준이 바뀜
+#   → 증분 다운로드가 저장된 날과 겹치는 구간의 값이 달라졌으면 그 종목은 전체 기간을 다시 받음
+
+import os
+import time
+import asyncio
+import warnings
+import threading
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from tools.market_store import get_market_store
+from tools.singleflight import coalesce
+from tools.symbol_resolver import is_krx_symbol
+
+HISTORY_YEARS = int(os.getenv("QUANT_HISTORY_YEARS", "3"))            # 보관/분석할 기간
+HISTORY_TTL = float(os.getenv("QUANT_HISTORY_TTL", str(6 * 3600)))    # 메모리 히스토리 재확인 주기
+HISTORY_STALE_DAYS = int(os.getenv("QUANT_HISTORY_STALE_DAYS", "3"))  # 마지막 봉이 이보다 오래되면 증분 다운로드
+ADJUST_TOLERANCE = 5e-4    # 겹치는 날 종가가 이 비율 이상 다르면 수정주가 기준이 바뀐 것으로 봄
+MIN_OVERLAP = 20           # 상관계수/베타 계산에 필요한 최소 공통 관측 수
+TRADING_DAYS = 252
+BAR_INTERVAL = "1d"
+DAY = 86400
+
+RETURN_WINDOWS = {"1M": 30, "3M": 91, "1Y": 365}  # 달력 기준 일수 (시장별 휴장일 차이 흡수)
+MA_WINDOWS = (20, 60, 200)
+
+History = Tuple[np.ndarray, np.ndarray]  # (일자 epoch seconds, 종가)
+
+
+def benchmark_for(symbol: str) -> str:
+    if symbol.upper().endswith(".KQ"):
+        return "^KQ11"
+    return "^KS11" if is_krx_symbol(symbol) else "^GSPC"
+
+
+# -----------------------------
+# 히스토리 로딩 (메모리 → SQLite → yfinance 일괄 다운로드)
+# -----------------------------
+_history: Dict[str, Tuple[float, np.ndarray, np.ndarray]] = {}
+_history_lock = threading.Lock()
+
+
+def _day_floor(ts: float) -> int:
+    return int(ts // DAY * DAY)
+
+
+def _frame_to_bars(df, symbols: List[str]) -> Dict[str, list]:
+    """yf.download 결과(DataFrame)를 종목별 봉 목록으로 변환"""
+    out: Dict[str, list] = {}
+    multi = getattr(df.columns, "nlevels", 1) > 1
+    for sym in symbols:
+        try:
+            sub = df[sym] if multi else df
+        except KeyError:
+            continue
+        sub = sub.dropna(subset=["Close"])
+        if sub.empty:
+            continue
+        idx = sub.index.tz_localize(None) if getattr(sub.index, "tz", None) is not None else sub.index
+        days = np.asarray(idx, dtype="datetime64[D]").astype(np.int64) * DAY
+        cols = [sub[c].to_numpy(dtype=float) if c in sub else np.full(len(sub), np.nan)
+                for c in ("Open", "High", "Low", "Close", "Volume")]
+        out[sym] = [(int(d), *(float(v) for v in vals)) for d, *vals in zip(days, *cols)]
+    return out
+
+
+@coalesce
+def _download(symbols: Tuple[str, ...], start: Optional[int]) -> Dict[str, list]:
+    """여러 종목 일봉을 yf.download 한 번으로 조회 (start가 없으면 전체 기간)"""
+    if not symbols:
+        return {}
+    try:
+        import yfinance as yf
+        kwargs = {"period": f"{HISTORY_YEARS}y"} if start is None else \
+                 {"start": time.strftime("%Y-%m-%d", time.gmtime(start))}
+        df = yf.download(
+            tickers=list(symbols), interval=BAR_INTERVAL, group_by="ticker",
+            auto_adjust=True, progress=False, threads=True, **kwargs,
+        )
+        if df is None or df.empty:
+            return {}
+        bars = _frame_to_bars(df, list(symbols))
+    except Exception as e:
+        print(f"⚠️ 일봉 히스토리 다운로드 실패: {e}")
+        return {}
+
+    store = get_market_store()
+    for sym, rows in bars.items():
+        store.record_bars(sym, BAR_INTERVAL, rows)
+    return bars
+
+
+def _stored_history(symbols: List[str], since: int) -> Dict[str, History]:
+    try:
+        rows = get_market_store().get_bars_many(symbols, BAR_INTERVAL, since)
+    except Exception as e:
+        print(f"⚠️ 일봉 저장소 조회 실패: {e}")
+        return {}
+    grouped: Dict[str, list] = defaultdict(list)
+    for sym, ts, close in rows:
+        if close is not None:
+            grouped[sym].append((ts, close))
+    return {
+        sym: (np.array([r[0] for r in pts], dtype=np.int64), np.array([r[1] for r in pts], dtype=float))
+        for sym, pts in grouped.items()
+    }
+
+
+def _rebased(stored: History, new: list) -> bool:
+    """증분 다운로드와 저장된 종가가 겹치는 날(마지막 저장 봉 제외: 장중에 받은 값일 수 있음)에 어긋나는지"""
+    days, closes = stored
+    if len(days) < 2 or not new:
+        return False
+    nd = np.array([b[0] for b in new], dtype=np.int64)
+    nc = np.array([b[4] for b in new], dtype=float)
+    _, i_old, i_new = np.intersect1d(days[:-1], nd, return_indices=True)
+    if not len(i_old):
+        return False
+    old, fresh = closes[i_old], nc[i_new]
+    ok = np.isfinite(old) & np.isfinite(fresh) & (old != 0)
+    return bool(np.any(np.abs(fresh[ok] / old[ok] - 1.0) > ADJUST_TOLERANCE))
+
+
+def load_history(symbols: List[str]) -> Dict[str, History]:
+    """종목별 (일자, 종가) 배열. 저장소에 최신 봉이 있으면 다운로드하지 않고, 오래됐으면 그 이후만 받음"""
+    now = time.time()
+    since = _day_floor(now - HISTORY_YEARS * 365 * DAY)
+    symbols = list(dict.fromkeys(symbols))
+
+    out: Dict[str, History] = {}
+    with _history_lock:
+        for sym in symbols:
+            hit = _history.get(sym)
+            if hit and now - hit[0] < HISTORY_TTL:
+                out[sym] = (hit[1], hit[2])
+    missing = [s for s in symbols if s not in out]
+    if not missing:
+        return out
+
+    stored = _stored_history(missing, since)
+    stale_after = _day_floor(now) - HISTORY_STALE_DAYS * DAY
+    full = tuple(s for s in missing if s not in stored)
+    partial = tuple(s for s in missing if s in stored and stored[s][0][-1] < stale_after)
+
+    downloads: Dict[str, list] = {}
+    if full:
+        downloads.update(_download(full, None))
+    if partial:
+        # 마지막 저장 봉 하루 전부터 받아 기준 변경 여부를 비교할 겹치는 날을 확보
+        start = int(min(stored[s][0][-2] if len(stored[s][0]) > 1 else stored[s][0][-1] for s in partial))
+        downloads.update(_download(partial, start))
+        rebase = tuple(s for s in partial if _rebased(stored[s], downloads.get(s)))
+        if rebase:
+            refetched = _download(rebase, None)
+            downloads.update(refetched)
+            for sym in rebase:
+                if sym in refetched:
+                    stored.pop(sym)  # 예전 기준의 저장 값은 버리고 새로 받은 전체 기간만 사용
+
+    for sym in missing:
+        days, closes = stored.get(sym, (np.empty(0, np.int64), np.empty(0)))
+        new = downloads.get(sym)
+        if new:
+            nd = np.array([b[0] for b in new], dtype=np.int64)
+            nc = np.array([b[4] for b in new], dtype=float)
+            days, uniq = np.unique(np.concatenate([nd, days]), return_index=True)  # 겹치는 날짜는 새 값 우선
+            closes = np.concatenate([nc, closes])[uniq]
+        keep = days >= since
+        days, closes = days[keep], closes[keep]
+        if len(days):
+            out[sym] = (days, closes)
+
+    with _history_lock:
+        for sym in missing:
+            if sym in out:
+                _history[sym] = (now, *out[sym])
+    return out
+
+
+# -----------------------------
+# 벡터 연산
+# -----------------------------
+def price_matrix(history: Dict[str, History], symbols: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """종목별 시계열을 (T일 × N종목) 종가 행렬로 정렬. 거래가 없던 칸은 NaN"""
+    lengths = [len(history[s][0]) if s in history else 0 for s in symbols]
+    if not any(lengths):
+        return np.empty(0, np.int64), np.empty((0, len(symbols)))
+    all_days = np.concatenate([history[s][0] for s, n in zip(symbols, lengths) if n])
+    all_close = np.concatenate([history[s][1] for s, n in zip(symbols, lengths) if n])
+    cols = np.repeat(np.arange(len(symbols)), lengths)
+    days = np.unique(all_days)
+    P = np.full((len(days), len(symbols)), np.nan)
+    P[np.searchsorted(days, all_days), cols] = all_close
+    return days, P
+
+
+def forward_fill(P: np.ndarray) -> np.ndarray:
+    T, N = P.shape
+    idx = np.where(~np.isnan(P), np.arange(T)[:, None], 0)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    return P[idx, np.arange(N)]
+
+
+def daily_returns(P: np.ndarray, Pff: np.ndarray) -> np.ndarray:
+    """실제 거래일의 종가를 직전 관측 종가와 비교 (휴장일을 건너뛴 수익률은 재개일에 반영)"""
+    R = np.full(P.shape, np.nan)
+    R[1:] = P[1:] / Pff[:-1] - 1.0
+    return R
+
+
+def trailing_mean(P: np.ndarray, window: int) -> np.ndarray:
+    """종목별 자신의 마지막 window개 관측치 평균 (관측치가 부족하면 NaN)"""
+    valid = ~np.isnan(P)
+    from_end = np.cumsum(valid[::-1], axis=0)[::-1]
+    mask = valid & (from_end <= window)
+    count = mask.sum(axis=0)
+    total = np.where(mask, P, 0.0).sum(axis=0)
+    return np.where(count >= window, total / np.maximum(count, 1), np.nan)
+
+
+def masked_beta(R: np.ndarray, B: np.ndarray) -> np.ndarray:
+    """열마다 R[:, j]와 B[:, j]가 모두 있는 날만으로 베타 계산"""
+    m = ~np.isnan(R) & ~np.isnan(B)
+    n = m.sum(axis=0)
+    x = np.where(m, R, 0.0)
+    y = np.where(m, B, 0.0)
+    safe_n = np.maximum(n, 1)
+    dx = np.where(m, x - x.sum(axis=0) / safe_n, 0.0)
+    dy = np.where(m, y - y.sum(axis=0) / safe_n, 0.0)
+    cov = (dx * dy).sum(axis=0)
+    var = (dy * dy).sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        beta = cov / var
+    return np.where(n >= MIN_OVERLAP, beta, np.nan)
+
+
+def pairwise_corr(R: np.ndarray) -> np.ndarray:
+    """결측을 쌍별로 제외한 상관계수 행렬 (행렬곱으로 모든 쌍을 한 번에 계산)"""
+    M = (~np.isnan(R)).astype(float)
+    X = np.where(M > 0, R, 0.0)
+    n = M.T @ M
+    sx = X.T @ M           # i의 합 (i, j 모두 관측된 날)
+    sy = M.T @ X           # j의 합
+    sxy = X.T @ X
+    sxx = (X * X).T @ M
+    syy = M.T @ (X * X)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = sxy - sx * sy / n
+        vx = sxx - sx * sx / n
+        vy = syy - sy * sy / n
+        corr = cov / np.sqrt(vx * vy)
+    corr = np.where(n >= MIN_OVERLAP, np.clip(corr, -1.0, 1.0), np.nan)
+    np.fill_diagonal(corr, 1.0)
+    return corr
+
+
+class QuantReport(NamedTuple):
+    symbols: List[str]
+    as_of: int                   # 마지막 봉 일자 (epoch seconds)
+    metrics: Dict[str, np.ndarray]
+    benchmarks: List[str]
+    corr: np.ndarray
+
+
+def compute(history: Dict[str, History], symbols: List[str]) -> Optional[QuantReport]:
+    benches = [benchmark_for(s) for s in symbols]
+    cols = list(dict.fromkeys(symbols + benches))
+    days, P = price_matrix(history, cols)
+    if not len(days):
+        return None
+
+    n = len(symbols)
+    Pff = forward_fill(P)
+    R = daily_returns(P, Pff)
+    year = R[-TRADING_DAYS:] if len(R) > TRADING_DAYS else R
+    last = Pff[-1]
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        metrics: Dict[str, np.ndarray] = {"price": last[:n]}
+        for label, span in RETURN_WINDOWS.items():
+            base_row = np.searchsorted(days, days[-1] - span * DAY)
+            metrics[f"ret_{label}"] = (last / Pff[base_row] - 1.0)[:n] if days[0] <= days[-1] - span * DAY \
+                else np.full(n, np.nan)
+        metrics["vol"] = (np.nanstd(year, axis=0, ddof=1) * np.sqrt(TRADING_DAYS))[:n]
+
+        drawdown = Pff / np.fmax.accumulate(Pff, axis=0) - 1.0
+        metrics["mdd"] = np.nanmin(drawdown, axis=0)[:n]
+        metrics["dd_now"] = drawdown[-1, :n]
+
+        bench_idx = np.array([cols.index(b) for b in benches])
+        metrics["beta"] = masked_beta(year[:, :n], year[:, bench_idx])
+        for w in MA_WINDOWS:
+            metrics[f"ma{w}_gap"] = (last / trailing_mean(P, w) - 1.0)[:n]
+
+        corr = pairwise_corr(year[:, :n])
+
+    return QuantReport(symbols, int(days[-1]), metrics, benches, corr)
+
+
+def analyze(symbols: List[str]) -> Optional[QuantReport]:
+    """히스토리 로딩 + 지표 계산. 실패하면 None (조언/비교는 지표 없이 진행)"""
+    symbols = list(dict.fromkeys(symbols))
+    if not symbols:
+        return None
+    try:
+        history = load_history(symbols + [benchmark_for(s) for s in symbols])
+        return compute(history, symbols)
+    except Exception as e:
+        print(f"⚠️ 정량 지표 계산 실패: {e}")
+        return None
+
+
+async def aanalyze(symbols: List[str]) -> Optional[QuantReport]:
+    return await asyncio.to_thread(analyze, symbols)
+
+
+# -----------------------------
+# 프롬프트용 요약 문자열
+# -----------------------------
+def _pct(v: float) -> str:
+    return "N/A" if v is None or np.isnan(v) else f"{v * 100:+.1f}%"
+
+
+def symbol_context(report: Optional[QuantReport], symbol: str) -> str:
+    """한 종목의 지표를 한 줄로 (LLM 컨텍스트 주입용)"""
+    if report is None or symbol not in report.symbols:
+        return ""
+    i = report.symbols.index(symbol)
+    m = {k: float(v[i]) for k, v in report.metrics.items()}
+    if np.isnan(m["price"]):
+        return ""
+    rets = " / ".join(f"{label} {_pct(m[f'ret_{label}'])}" for label in RETURN_WINDOWS)
+    mas = " / ".join(_pct(m[f"ma{w}_gap"]) for w in MA_WINDOWS)
+    vol = "N/A" if np.isnan(m["vol"]) else f"{m['vol'] * 100:.1f}%"
+    beta = "N/A" if np.isnan(m["beta"]) else f"{m['beta']:.2f}"
+    as_of = time.strftime("%Y-%m-%d", time.gmtime(report.as_of))
+    return (f"[정량 지표 {as_of} 기준] 수익률 {rets} | 연변동성 {vol} | "
+            f"최대낙폭 {_pct(m['mdd'])} (고점 대비 현재 {_pct(m['dd_now'])}) | "
+            f"베타 {beta} (vs {report.benchmarks[i]}) | MA20/60/200 대비 {mas}")
+
+
+def correlation_context(report: Optional[QuantReport], labels: Optional[Dict[str, str]] = None,
+                        max_pairs: int = 10) -> str:
+    """1년 일간수익률 상관계수. 쌍이 많으면 가장 높은/낮은 쌍만 추림"""
+    if report is None or len(report.symbols) < 2:
+        return ""
+    labels = labels or {}
+    names = [labels.get(s, s) for s in report.symbols]
+    iu, ju = np.triu_indices(len(names), k=1)
+    vals = report.corr[iu, ju]
+    ok = ~np.isnan(vals)
+    iu, ju, vals = iu[ok], ju[ok], vals[ok]
+    if not len(vals):
+        return ""
+    order = np.argsort(-vals)
+    if len(order) > max_pairs:
+        half = max_pairs // 2
+        order = np.concatenate([order[:half], order[-half:]])
+    pairs = ", ".join(f"{names[iu[k]]}-{names[ju[k]]} {vals[k]:+.2f}" for k in order)
+    return f"[상관계수(최근 1년 일간수익률)] {pairs}"
+
+
+def quant_context(symbol: str) -> str:
+    return symbol_context(analyze([symbol]), symbol)
+
+
+async def aquant_context(symbol: str) -> str:
+    return symbol_context(await aanalyze([symbol]), symbol)
@@ -0,0 +1,42 @@
+# FINAL_PROJECT/tools/quote.py
+
+# 도구들 사이에서 주고받는 구조화된 시세 타입
+# (문자열 포맷팅은 LangChain tool 경계에서만 수행)
+
+import time
+from typing import NamedTuple, Optional
+
+from tools.symbol_resolver import is_krx_symbol
+
+CURRENCY_SIGNS = {"KRW": "₩", "USD": "$"}
+
+
+class Quote(NamedTuple):
+    symbol: str
+    price: float
+    currency: str          # "KRW" / "USD"
+    source: Optional[str]  # 가격을 준 소스 (예: _get_price_yf)
+    as_of: float           # 조회 시각 (epoch seconds)
+
+    @property
+    def sign(self) -> str:
+        return CURRENCY_SIGNS.get(self.currency, "")
+
+
+def currency_for(symbol: str) -> str:
+    return "KRW" if is_krx_symbol(symbol) else "USD"
+
+
+def make_quote(symbol: str, price: float, source: Optional[str] = None, as_of: Optional[float] = None) -> Quote:
+    return Quote(symbol, float(price), currency_for(symbol), source, as_of if as_of is not None else time.time())
+
+
+def format_price(quote: Quote) -> str:
+    """기존 출력 형식 유지: 원화는 소수 2자리, 달러는 소수 4자리"""
+    if quote.currency == "KRW":
+        return f"₩{quote.price:.2f}"
+    return f"{quote.sign}{quote.price:.4f}"
+
+
+def format_quote(quote: Quote) -> str:
+    return f"{quote.symbol}의 현재 주가는 {format_price(quote)}입니다."
@@ -0,0 +1,125 @@
+# FINAL_PROJECT/tools/quote_cache.py
+
+# 시세 캐시: 엔트리 수 기준 LRU + 시장별 TTL + stale-while-revalidate (스레드 안전)
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+FRESH = "fresh"
+STALE = "stale"
+MISS = "miss"
+
+DEFAULT_TTLS = {
+    "KRX": int(os.getenv("QUOTE_TTL_KRX", "60")),
+    "US": int(os.getenv("QUOTE_TTL_US", "60")),
+}
+
+
+class QuoteCache:
+    """
+    - max_entries 초과 시 가장 오래 안 쓴 항목부터 제거(LRU)
+    - TTL이 지난 항목도 stale_seconds 동안은 즉시 반환하고, 백그라운드에서 갱신
+    - hit / stale_hit / miss / eviction 카운터 제공
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 2048,
+        ttls: Optional[Dict[str, int]] = None,
+        default_ttl: int = 60,
+        stale_seconds: int = 300,
+        refresh_workers: int = 4,
+    ):
+        self.max_entries = max_entries
+        self.ttls = dict(ttls or DEFAULT_TTLS)
+        self.default_ttl = default_ttl
+        self.stale_seconds = stale_seconds
+
+        self._data: "OrderedDict[str, Tuple[Any, float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._refreshing: set = set()
+        self._refresher = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix="quote-refresh")
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "evictions": 0, "refreshes": 0}
+
+    def _ttl(self, market: str) -> int:
+        return self.ttls.get(market, self.default_ttl)
+
+    def lookup(self, key: str) -> Tuple[Optional[Any], str]:
+        """(값, 상태)를 반환합니다. 상태는 fresh / stale / miss 중 하나."""
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None, MISS
+            value, ts, market = entry
+            age = now - ts
+            ttl = self._ttl(market)
+            if age < ttl:
+                self._data.move_to_end(key)
+                self._stats["hits"] += 1
+                return value, FRESH
+            if age < ttl + self.stale_seconds:
+                self._data.move_to_end(key)
+                self._stats["stale_hits"] += 1
+                return value, STALE
+            # stale 구간도 지났으면 버림
+            del self._data[key]
+            self._stats["misses"] += 1
+            return None, MISS
+
+    def get(self, key: str, refresh: Optional[Callable[[], Any]] = None) -> Optional[Any]:
+        """
+        fresh/stale 값을 반환합니다. stale이면 refresh 콜백을 백그라운드로 1회만 예약합니다.
+        refresh 콜백은 스스로 set()을 호출해 캐시를 갱신해야 합니다.
+        """
+        value, state = self.lookup(key)
+        if state == STALE and refresh is not None:
+            self._schedule_refresh(key, refresh)
+        return value
+
+    def set(self, key: str, value: Any, market: str = "", timestamp: Optional[float] = None) -> None:
+        with self._lock:
+            self._data[key] = (value, timestamp if timestamp is not None else time.time(), market)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def _schedule_refresh(self, key: str, refresh: Callable[[], Any]) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            self._stats["refreshes"] += 1
+
+        def _run():
+            try:
+                refresh()
+            except Exception:
+                pass
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        self._refresher.submit(_run)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out = dict(self._stats)
+            out["size"] = len(self._data)
+        lookups = out["hits"] + out["stale_hits"] + out["misses"]
+        out["hit_rate"] = (out["hits"] + out["stale_hits"]) / lookups if lookups else 0.0
+        return out
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
@@ -0,0 +1,254 @@
+# FINAL_PROJECT/tools/quote_providers.py
+
+# 시세 소스(provider) 실행 엔진
+# - 첫 소스가 hedge_delay 안에 응답하지 않으면 다음 소스를 병렬로 추가 발사(hedged request)
+# - 소스별 최근 지연시간/오류율 기록 → 관측된 지연시간 순으로 동적 재정렬
+# - 계속 실패(예외/타임아웃)하는 소스는 서킷을 열어 cooldown 동안 건너뜀. "데이터 없음"(None)은 실패로 세지 않음
+# - cooldown 뒤에는 시험 요청 1개만 보내고, 그 결과가 기록될 때까지 나머지는 막음 (half-open)
+# - 모든 소스의 서킷이 열려 있으면 강제로 시도하지 않고 바로 실패 (호출부는 캐시의 stale 값으로 응답)
+# - 배치 소스(여러 종목을 한 번에)도 call()로 실행해 같은 통계/서킷에 기록
+
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+HEDGE_DELAY = float(os.getenv("QUOTE_HEDGE_DELAY", "0.35"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def provider(name: str) -> Callable[[Callable], Callable]:
+    """동기/비동기 구현이 같은 통계·서킷을 공유하도록 소스 이름을 붙이는 데코레이터"""
+    def deco(fn: Callable) -> Callable:
+        fn.provider_name = name
+        return fn
+    return deco
+
+
+def provider_name(func: Callable) -> str:
+    return getattr(func, "provider_name", func.__name__)
+
+
+def is_empty(result: Any) -> bool:
+    """정상 응답이지만 가격이 없음 (단건: None, 배치: 빈 dict)"""
+    return result is None or (isinstance(result, dict) and not result)
+
+
+class ProviderStats:
+    """소스 하나의 롤링 지연시간/오류율과 서킷 상태"""
+
+    def __init__(self, window: int = 50, failure_threshold: int = 3,
+                 error_rate_threshold: float = 0.5, cooldown: float = 30.0):
+        self.samples: Deque[Tuple[float, bool]] = deque(maxlen=window)
+        self.ewma_latency: Optional[float] = None
+        self.consecutive_failures = 0
+        self.empty = 0            # 응답은 왔지만 가격이 없던 횟수 (서킷/오류율과 무관)
+        self.failure_threshold = failure_threshold
+        self.error_rate_threshold = error_rate_threshold
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probe_at = 0.0       # half-open 시험 요청을 보낸 시각
+
+    def record(self, latency: float, ok: bool, empty: bool = False) -> None:
+        """ok=False는 예외/타임아웃. empty=True는 정상 응답이지만 가격이 없던 경우"""
+        self.samples.append((latency, ok))
+        if ok:
+            if empty:
+                self.empty += 1
+            else:
+                # 실패/빈 응답의 지연시간은 순서 결정에 쓰지 않음 (빠른 실패가 앞으로 오는 것 방지)
+                self.ewma_latency = latency if self.ewma_latency is None else 0.3 * latency + 0.7 * self.ewma_latency
+            self.consecutive_failures = 0
+            self.state = CLOSED
+            return
+
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold \
+                or (len(self.samples) >= 10 and self.error_rate >= self.error_rate_threshold):
+            self.state = OPEN
+            self.opened_at = time.time()
+
+    @property
+    def error_rate(self) -> float:
+        if not self.samples:
+            return 0.0
+        return sum(1 for _, ok in self.samples if not ok) / len(self.samples)
+
+    def available(self) -> bool:
+        """지금 요청을 보낼 수 있는 상태인지 (상태는 바꾸지 않음)"""
+        now = time.time()
+        if self.state == OPEN:
+            return now - self.opened_at >= self.cooldown
+        if self.state == HALF_OPEN:
+            return now - self.probe_at >= self.cooldown
+        return True
+
+    def allow(self) -> bool:
+        """실제로 요청을 보내기 직전에 호출. half-open에서는 시험 요청 1개만 통과"""
+        if self.state == CLOSED:
+            return True
+        if not self.available():
+            return False
+        # cooldown이 지난 OPEN, 또는 시험 요청 결과가 cooldown 넘게 기록되지 않은 HALF_OPEN → 새 시험 요청 1개
+        self.state = HALF_OPEN
+        self.probe_at = time.time()
+        return True
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "ewma_latency": self.ewma_latency,
+            "error_rate": self.error_rate,
+            "samples": len(self.samples),
+            "empty": self.empty,
+            "consecutive_failures": self.consecutive_failures,
+        }
+
+
+class ProviderEngine:
+    def __init__(self, hedge_delay: float = HEDGE_DELAY, max_workers: int = 16, **stats_kwargs):
+        self.hedge_delay = hedge_delay
+        self._stats_kwargs = stats_kwargs
+        self._stats: Dict[str, ProviderStats] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="quote-provider")
+
+    def _get_stats(self, name: str) -> ProviderStats:
+        st = self._stats.get(name)
+        if st is None:
+            st = self._stats[name] = ProviderStats(**self._stats_kwargs)
+        return st
+
+    def _order(self, providers: List[Callable]) -> List[Callable]:
+        """
+        시도 순서. 서킷이 열린 소스는 빼고, 관측 지연시간이 짧은 순으로 정렬 (미관측은 원래 우선순위 유지).
+        모두 열려 있으면 빈 목록 → 장애 중인 업스트림을 두드리지 않고 바로 실패
+        """
+        with self._lock:
+            allowed = [p for p in providers if self._get_stats(provider_name(p)).available()]
+            known = [self._get_stats(provider_name(p)).ewma_latency for p in allowed]
+        fallback = max([k for k in known if k is not None], default=0.0)
+        ranked = sorted(
+            zip(allowed, known, range(len(allowed))),
+            key=lambda t: (t[1] if t[1] is not None else fallback, t[2]),
+        )
+        return [p for p, _, _ in ranked]
+
+    def _next(self, queue: List[Callable]) -> Optional[Callable]:
+        """실제로 띄울 다음 소스. 허가는 발사 시점에 받음 → 순서만 정하고 안 띄운 소스가 half-open 시험 요청을 잡고 있지 않음"""
+        while queue:
+            func = queue.pop(0)
+            with self._lock:
+                if self._get_stats(provider_name(func)).allow():
+                    return func
+        return None
+
+    def _record(self, func: Callable, latency: float, ok: bool, empty: bool = False) -> None:
+        with self._lock:
+            self._get_stats(provider_name(func)).record(latency, ok, empty)
+
+    def _run(self, func: Callable, *args) -> Any:
+        start = time.perf_counter()
+        try:
+            result = func(*args)
+        except Exception:
+            self._record(func, time.perf_counter() - start, False)
+            raise
+        self._record(func, time.perf_counter() - start, True, empty=is_empty(result))
+        return result
+
+    async def _arun(self, func: Callable, *args) -> Any:
+        start = time.perf_counter()
+        try:
+            result = await func(*args)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self._record(func, time.perf_counter() - start, False)
+            raise
+        self._record(func, time.perf_counter() - start, True, empty=is_empty(result))
+        return result
+
+    def call(self, func: Callable, *args, default: Any = None) -> Any:
+        """소스 하나를 hedge 없이 바로 실행 (배치 조회용). 서킷이 열려 있거나 실패하면 default"""
+        with self._lock:
+            if not self._get_stats(provider_name(func)).allow():
+                return default
+        try:
+            return self._run(func, *args)
+        except Exception:
+            return default
+
+    def fetch(self, providers: List[Callable], *args) -> Tuple[Optional[float], Optional[str]]:
+        """
+        첫 번째 유효 가격과 그 소스 이름을 반환합니다.
+        진행 중인 소스가 hedge_delay 안에 끝나지 않거나 실패하면 다음 소스를 추가로 띄웁니다.
+        """
+        queue = self._order(providers)
+        pending = {}
+
+        def _launch_next() -> bool:
+            func = self._next(queue)
+            if func is None:
+                return False
+            pending[self._executor.submit(self._run, func, *args)] = provider_name(func)
+            return True
+
+        _launch_next()
+        while pending:
+            done, _ = wait(list(pending), timeout=self.hedge_delay, return_when=FIRST_COMPLETED)
+            if not done:
+                _launch_next()
+                continue
+            for fut in done:
+                name = pending.pop(fut)
+                try:
+                    price = fut.result()
+                except Exception:
+                    price = None
+                if price is not None:
+                    # 남은 요청은 백그라운드에서 끝나며 통계만 갱신
+                    return price, name
+                _launch_next()
+        return None, None
+
+    async def afetch(self, providers: List[Callable], *args) -> Tuple[Optional[float], Optional[str]]:
+        """fetch()의 asyncio 버전. providers는 코루틴 함수 목록"""
+        queue = self._order(providers)
+        pending: Dict[asyncio.Task, str] = {}
+
+        def _launch_next() -> bool:
+            func = self._next(queue)
+            if func is None:
+                return False
+            pending[asyncio.ensure_future(self._arun(func, *args))] = provider_name(func)
+            return True
+
+        _launch_next()
+        while pending:
+            done, _ = await asyncio.wait(list(pending), timeout=self.hedge_delay, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                _launch_next()
+                continue
+            for task in done:
+                name = pending.pop(task)
+                try:
+                    price = task.result()
+                except Exception:
+                    price = None
+                if price is not None:
+                    # 남은 태스크는 끝까지 돌며 통계만 갱신
+                    return price, name
+                _launch_next()
+        return None, None
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {name: st.snapshot() for name, st in self._stats.items()}
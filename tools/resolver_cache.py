@@ -0,0 +1,107 @@
+# FINAL_PROJECT/tools/resolver_cache.py
+
+# resolve_symbol 결과를 프로세스 재시작 후에도 기억하는 SQLite 메모
+# - 정규화된 입력 → (티커, 해석 전략) 저장
+# - 못 찾은 입력도 짧은 TTL의 negative 항목으로 저장 (Yahoo/OpenAI 반복 호출 방지)
+# - LLM 경로를 한 번 시도한 이름은 기록해 두고 다시 LLM을 부르지 않음
+# - 정규화 후 빈 키("(주)" 등)는 서로 다른 입력이 한 항목을 공유하게 되므로 저장/조회하지 않음
+# - 만료 항목은 프로세스 시작 시 purge_expired()로 정리
+
+import os
+import time
+import threading
+from typing import NamedTuple, Optional
+
+from tools.sqlite_store import open_db
+
+RESOLVER_CACHE_PATH = os.getenv("RESOLVER_CACHE_PATH", os.path.join("data", "cache", "resolver.sqlite3"))
+POSITIVE_TTL = int(os.getenv("RESOLVER_POSITIVE_TTL", str(30 * 24 * 3600)))  # 30일
+NEGATIVE_TTL = int(os.getenv("RESOLVER_NEGATIVE_TTL", str(6 * 3600)))        # 6시간
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS resolutions (
+    key        TEXT PRIMARY KEY,
+    symbol     TEXT,             -- NULL이면 negative 항목
+    strategy   TEXT NOT NULL,    -- ticker / yahoo / llm / none
+    llm_tried  INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+class ResolverEntry(NamedTuple):
+    symbol: Optional[str]
+    strategy: str
+    llm_tried: bool
+    expires_at: float
+
+    @property
+    def fresh(self) -> bool:
+        return self.expires_at > time.time()
+
+
+class ResolverCache:
+    def __init__(self, path: str = RESOLVER_CACHE_PATH,
+                 positive_ttl: int = POSITIVE_TTL, negative_ttl: int = NEGATIVE_TTL):
+        self.path = path
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self):
+        if self._conn is None:
+            self._conn = open_db(self.path, _SCHEMA)
+        return self._conn
+
+    def get(self, key: str) -> Optional[ResolverEntry]:
+        """만료된 항목도 반환합니다 (llm_tried 확인용). 신선도는 entry.fresh로 판단."""
+        if not key:
+            return None
+        try:
+            with self._lock:
+                row = self._db().execute(
+                    "SELECT symbol, strategy, llm_tried, expires_at FROM resolutions WHERE key = ?", (key,)
+                ).fetchone()
+        except Exception as e:
+            print(f"⚠️ resolver 캐시 조회 실패: {e}")
+            return None
+        if row is None:
+            return None
+        return ResolverEntry(row[0], row[1], bool(row[2]), row[3])
+
+    def put(self, key: str, symbol: Optional[str], strategy: str, llm_tried: bool = False) -> None:
+        if not key:
+            return
+        now = time.time()
+        ttl = self.positive_ttl if symbol else self.negative_ttl
+        try:
+            with self._lock:
+                conn = self._db()
+                conn.execute(
+                    """INSERT INTO resolutions (key, symbol, strategy, llm_tried, created_at, expires_at)
+                       VALUES (?, ?, ?, ?, ?, ?)
+                       ON CONFLICT(key) DO UPDATE SET
+                           symbol = excluded.symbol,
+                           strategy = excluded.strategy,
+                           llm_tried = MAX(resolutions.llm_tried, excluded.llm_tried),
+                           created_at = excluded.created_at,
+                           expires_at = excluded.expires_at""",
+                    (key, symbol, strategy, int(llm_tried), now, now + ttl),
+                )
+                conn.commit()
+        except Exception as e:
+            print(f"⚠️ resolver 캐시 저장 실패: {e}")
+
+    def purge_expired(self) -> int:
+        """만료됐고 LLM 기록도 필요 없는 항목 정리. 삭제한 행 수를 반환"""
+        try:
+            with self._lock:
+                conn = self._db()
+                cur = conn.execute("DELETE FROM resolutions WHERE expires_at < ? AND llm_tried = 0", (time.time(),))
+                conn.commit()
+                return cur.rowcount
+        except Exception as e:
+            print(f"⚠️ resolver 캐시 정리 실패: {e}")
+            return 0
@@ -0,0 +1,101 @@
+# FINAL_PROJECT/tools/singleflight.py
+
+# 동일한 키로 동시에 들어온 요청을 하나의 실제 호출로 합치는 single-flight 계층
+# (여러 세션이 같은 종목을 동시에 물어봐도 업스트림 호출은 1회)
+
+import asyncio
+import functools
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """key에 대해 진행 중인 호출이 있으면 그 결과를 기다려 공유하고, 없으면 직접 실행합니다."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+_default_group = SingleFlight()
+
+
+def coalesce(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """함수 이름 + 인자를 키로 동시 호출을 합치는 데코레이터 (인자는 hashable이어야 함)"""
+    name = f"{fn.__module__}.{fn.__qualname__}"
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        key = (name, args, tuple(sorted(kwargs.items())))
+        return _default_group.do(key, fn, *args, **kwargs)
+
+    return wrapper
+
+
+class AsyncSingleFlight:
+    """asyncio 버전: 같은 이벤트 루프 안의 동시 코루틴이 하나의 태스크 결과를 공유"""
+
+    def __init__(self):
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        full_key = (id(asyncio.get_running_loop()), key)
+        task = self._tasks.get(full_key)
+        if task is None:
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._tasks[full_key] = task
+            task.add_done_callback(lambda _t: self._tasks.pop(full_key, None))
+        # 한 호출자가 취소돼도 공유 태스크는 계속 진행
+        return await asyncio.shield(task)
+
+
+_default_async_group = AsyncSingleFlight()
+
+
+def acoalesce(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """coalesce의 코루틴 함수 버전"""
+    name = f"{fn.__module__}.{fn.__qualname__}"
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        key = (name, args, tuple(sorted(kwargs.items())))
+        return await _default_async_group.do(key, fn, *args, **kwargs)
+
+    return wrapper
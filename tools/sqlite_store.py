@@ -0,0 +1,22 @@
+# FINAL_PROJECT/tools/sqlite_store.py
+
+# 로컬 SQLite 캐시/저장소들이 공유하는 연결 헬퍼
+
+import os
+import sqlite3
+
+
+def open_db(path: str, schema: str) -> sqlite3.Connection:
+    """
+    여러 스레드에서 공유할 SQLite 연결을 엽니다. (쓰기 직렬화는 호출 측 Lock으로)
+    WAL 모드라 읽기가 쓰기에 막히지 않습니다.
+    """
+    parent = os.path.dirname(path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(schema)
+    conn.commit()
+    return conn
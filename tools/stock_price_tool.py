@@ -3,109 +3,342 @@
 # 주식의 현재 가격을 조회하는 도구
 
 import os
-import requests
-import time
 import math
+import asyncio
 from typing import Optional, Dict, List, Callable, Any, Tuple
 from dotenv import load_dotenv
 
-from tools.symbol_resolver import resolve_symbol, is_krx_symbol
+from tools import http_client
+from tools.symbol_resolver import resolve_symbol, aresolve_symbol, resolve_symbols, is_krx_symbol
+from tools.quote_cache import QuoteCache
+from tools.singleflight import coalesce, acoalesce
+from tools.quote_providers import ProviderEngine, provider, provider_name
+from tools.market_store import get_market_store
+from tools.quote import Quote, make_quote, format_quote
 from langchain_core.tools import tool
 
 load_dotenv()
 TD_API_KEY = os.getenv("TWELVE_DATA_API_KEY")
 
 # -----------------------------
-# TTL 적용 캐시 (프로세스 생존 동안)
+# 시세 캐시 (LRU + 시장별 TTL + stale-while-revalidate)
 # -----------------------------
-_price_cache: Dict[str, Dict[str, Any]] = {}
+_price_cache = QuoteCache(
+    max_entries=int(os.getenv("QUOTE_CACHE_MAX", "2048")),
+    stale_seconds=int(os.getenv("QUOTE_STALE_SECONDS", "300")),
+)
 
-def _cache_get(sym: str, ttl_seconds: int = 60) -> Optional[float]:
-    entry = _price_cache.get(sym)
-    if entry and (time.time() - entry['timestamp']) < ttl_seconds:
-        return entry['price']
-    return None
+def _market(sym: str) -> str:
+    return "KRX" if is_krx_symbol(sym) else "US"
+
+def _cache_get(sym: str) -> Optional[Quote]:
+    # 만료됐지만 stale 구간이면 즉시 반환하고 백그라운드에서 갱신
+    return _price_cache.get(sym, refresh=lambda: _fetch_quote(sym))
+
+def _cache_set(sym: str, price: float, source: Optional[str] = None) -> Quote:
+    quote = make_quote(sym, price, source)
+    _price_cache.set(sym, quote, market=_market(sym), timestamp=quote.as_of)
+    get_market_store().record_quote(sym, price, source)
+    return quote
+
+def _cache_set_many(prices: Dict[str, float], source: Optional[str] = None) -> Dict[str, Quote]:
+    quotes = {sym: make_quote(sym, price, source) for sym, price in prices.items()}
+    for sym, quote in quotes.items():
+        _price_cache.set(sym, quote, market=_market(sym), timestamp=quote.as_of)
+    get_market_store().record_quotes((sym, price, source) for sym, price in prices.items())
+    return quotes
+
+def _warm_max_age() -> float:
+    return max(_price_cache.ttls.values(), default=_price_cache.default_ttl) + _price_cache.stale_seconds
+
+def warm_price_cache() -> int:
+    """
+    디스크 저장소의 최근 시세로 메모리 캐시를 채웁니다 (원래 조회 시각 기준으로 TTL 적용). 보관 기간이 지난 시세는 먼저 정리.
+    재시작 직후 업스트림 폭주를 막기 위해 앱 시작 시 호출 (import 시점에는 저장소 파일을 만들지 않음)
+    """
+    try:
+        get_market_store().prune()
+        rows = get_market_store().latest_quotes(_warm_max_age())
+    except Exception as e:
+        print(f"⚠️ 시세 캐시 예열 실패: {e}")
+        return 0
+    for q in rows:
+        quote = make_quote(q.symbol, q.price, q.source, as_of=q.fetched_at)
+        _price_cache.set(q.symbol, quote, market=_market(q.symbol), timestamp=q.fetched_at)
+    return len(rows)
 
-def _cache_set(sym: str, price: float) -> None:
-    _price_cache[sym] = {'price': price, 'timestamp': time.time()}
+def get_price_cache_stats() -> Dict[str, Any]:
+    return _price_cache.stats()
 
 # -----------------------------
-# 소스별 헬퍼
+# 소스별 헬퍼 (동기 / 비동기 구현이 같은 파서를 공유)
 # -----------------------------
-def _get_price_twelvedata(sym: str) -> Optional[float]:
-    if not TD_API_KEY:
+TD_PRICE_URL = "https://api.twelvedata.com/price"
+YAHOO_CHART_URL = "https://query1.finance.yahoo.com/v8/finance/chart/{sym}"
+YAHOO_CHART_PARAMS = {"range": "1d", "interval": "1m"}
+YAHOO_HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+def _parse_twelvedata(data: Dict[str, Any]) -> Optional[float]:
+    if "price" in data:
+        return float(data["price"])
+    return None
+
+def _parse_yahoo_chart(sym: str, js: Dict[str, Any]) -> Optional[float]:
+    result = (js.get("chart") or {}).get("result") or []
+    if not result:
         return None
-    try:
-        r = requests.get(
-            "https://api.twelvedata.com/price",
-            params={"symbol": sym, "apikey": TD_API_KEY},
-            timeout=5,
-        )
-        r.raise_for_status()
-        data = r.json() or {}
-        if "price" in data:
-            return float(data["price"])
+    _store_chart_bars(sym, result[0], YAHOO_CHART_PARAMS["interval"])
+
+    meta = result[0].get("meta") or {}
+    rmp = meta.get("regularMarketPrice")
+    if rmp is not None and not (isinstance(rmp, float) and math.isnan(rmp)):
+        return float(rmp)
+
+    def _get_last_valid_close(data_key: str) -> Optional[float]:
+        quotes = (result[0].get("indicators") or {}).get(data_key) or []
+        if quotes:
+            close_list = quotes[0].get("close") or []
+            close_vals = [c for c in close_list if c is not None]
+            if close_vals:
+                return float(close_vals[-1])
         return None
-    except Exception:
+
+    price = _get_last_valid_close("quote")
+    if price is None:
+        price = _get_last_valid_close("adjclose")
+    return price
+
+@coalesce
+@provider("twelvedata")
+def _get_price_twelvedata(sym: str) -> Optional[float]:
+    # 전송/HTTP 오류는 그대로 올려 보내 서킷 브레이커가 실패로 세게 함. 가격이 없는 응답만 None
+    if not TD_API_KEY:
         return None
+    r = http_client.get(TD_PRICE_URL, params={"symbol": sym, "apikey": TD_API_KEY}, timeout=5)
+    r.raise_for_status()
+    return _parse_twelvedata(r.json() or {})
 
+@coalesce
+@provider("yfinance")
 def _get_price_yf(sym: str) -> Optional[float]:
+    import yfinance as yf
+    tk = yf.Ticker(sym)
     try:
-        import yfinance as yf
-        tk = yf.Ticker(sym)
         info = getattr(tk, "fast_info", {}) or {}
         p = info.get("last_price")
         if p is None:
             info2 = tk.info
             p = info2.get("regularMarketPrice")
-        return float(p) if p is not None else None
-    except Exception:
+    except (KeyError, TypeError, ValueError):
+        # 없는 종목/필드 → 데이터 없음 (네트워크 오류는 실패로 올려 보냄)
         return None
+    return float(p) if p is not None else None
 
+@coalesce
+@provider("yahoo_chart")
 def _get_price_yahoo_chart(sym: str) -> Optional[float]:
+    r = http_client.get(YAHOO_CHART_URL.format(sym=sym), params=YAHOO_CHART_PARAMS, headers=YAHOO_HEADERS, timeout=5)
+    r.raise_for_status()
+    return _parse_yahoo_chart(sym, r.json() or {})
+
+@acoalesce
+@provider("twelvedata")
+async def _aget_price_twelvedata(sym: str) -> Optional[float]:
+    if not TD_API_KEY:
+        return None
+    r = await http_client.aget(TD_PRICE_URL, params={"symbol": sym, "apikey": TD_API_KEY}, timeout=5)
+    r.raise_for_status()
+    return _parse_twelvedata(r.json() or {})
+
+@acoalesce
+@provider("yfinance")
+async def _aget_price_yf(sym: str) -> Optional[float]:
+    # yfinance는 동기 라이브러리라 워커 스레드에서 실행
+    return await asyncio.to_thread(_get_price_yf, sym)
+
+@acoalesce
+@provider("yahoo_chart")
+async def _aget_price_yahoo_chart(sym: str) -> Optional[float]:
+    r = await http_client.aget(YAHOO_CHART_URL.format(sym=sym), params=YAHOO_CHART_PARAMS, headers=YAHOO_HEADERS, timeout=5)
+    r.raise_for_status()
+    js = r.json() or {}
+    # 파싱 중 봉 데이터를 SQLite에 기록하므로 이벤트 루프 밖에서 실행
+    return await asyncio.to_thread(_parse_yahoo_chart, sym, js)
+
+def _store_chart_bars(sym: str, chart: Dict[str, Any], interval: str) -> None:
+    """chart 응답의 봉 데이터를 버리지 않고 로컬 저장소에 보관"""
     try:
-        url = f"https://query1.finance.yahoo.com/v8/finance/chart/{sym}"
-        params = {"range": "1d", "interval": "1m"}
-        headers = {"User-Agent": "Mozilla/5.0"}
-        r = requests.get(url, params=params, headers=headers, timeout=5)
-        r.raise_for_status()
-        js = r.json() or {}
-
-        result = (js.get("chart") or {}).get("result") or []
-        if not result:
-            return None
-
-        meta = result[0].get("meta") or {}
-        rmp = meta.get("regularMarketPrice")
-        if rmp is not None and not (isinstance(rmp, float) and math.isnan(rmp)):
-            return float(rmp)
-
-        def _get_last_valid_close(data_key: str) -> Optional[float]:
-            quotes = (result[0].get("indicators") or {}).get(data_key) or []
-            if quotes:
-                close_list = quotes[0].get("close") or []
-                close_vals = [c for c in close_list if c is not None]
-                if close_vals:
-                    return float(close_vals[-1])
-            return None
-        
-        price = _get_last_valid_close("quote")
-        if price is None:
-            price = _get_last_valid_close("adjclose")
-
-        return price
+        stamps = chart.get("timestamp") or []
+        q = ((chart.get("indicators") or {}).get("quote") or [{}])[0]
+        cols = [q.get(k) or [None] * len(stamps) for k in ("open", "high", "low", "close", "volume")]
+        bars = [(ts, *vals) for ts, *vals in zip(stamps, *cols) if vals[3] is not None]
+        get_market_store().record_bars(sym, interval, bars)
     except Exception:
+        pass
+
+# -----------------------------
+# 소스별 배치 헬퍼 (여러 종목을 한 번의 왕복으로 조회)
+# -----------------------------
+YAHOO_SPARK_CHUNK = 20  # spark 엔드포인트가 한 번에 받아주는 최대 심볼 수
+
+def _valid_price(p: Any) -> Optional[float]:
+    try:
+        p = float(p)
+    except (TypeError, ValueError):
+        return None
+    if math.isnan(p) or p <= 0:
         return None
+    return p
+
+# 전송/HTTP 오류는 그대로 올려 보내 서킷 브레이커가 실패로 세게 함 (_fill_missing이 엔진으로 실행). 가격이 없으면 빈 dict
+@provider("twelvedata_batch")
+def _get_prices_twelvedata(syms: List[str]) -> Dict[str, float]:
+    if not TD_API_KEY or not syms:
+        return {}
+    r = http_client.get(
+        "https://api.twelvedata.com/price",
+        params={"symbol": ",".join(syms), "apikey": TD_API_KEY},
+        timeout=5,
+    )
+    r.raise_for_status()
+    data = r.json() or {}
+    # 단일 심볼이면 {"price": ...}, 복수면 {"AAPL": {"price": ...}, ...} 형태
+    if len(syms) == 1:
+        data = {syms[0]: data}
+    out: Dict[str, float] = {}
+    for sym in syms:
+        entry = data.get(sym) or {}
+        price = _valid_price(entry.get("price")) if isinstance(entry, dict) else None
+        if price is not None:
+            out[sym] = price
+    return out
+
+@provider("yfinance_batch")
+def _get_prices_yf(syms: List[str]) -> Dict[str, float]:
+    if not syms:
+        return {}
+    import yfinance as yf
+    df = yf.download(
+        tickers=syms, period="1d", interval="1m",
+        group_by="ticker", progress=False, threads=True, auto_adjust=False,
+    )
+    if df is None or df.empty:
+        return {}
+    out: Dict[str, float] = {}
+    for sym in syms:
+        try:
+            closes = df[sym]["Close"].dropna()
+        except KeyError:
+            continue
+        if len(closes):
+            price = _valid_price(closes.iloc[-1])
+            if price is not None:
+                out[sym] = price
+    return out
+
+@provider("yahoo_spark")
+def _get_prices_yahoo_spark(syms: List[str]) -> Dict[str, float]:
+    out: Dict[str, float] = {}
+    error: Optional[Exception] = None
+    for i in range(0, len(syms), YAHOO_SPARK_CHUNK):
+        chunk = syms[i:i + YAHOO_SPARK_CHUNK]
+        try:
+            r = http_client.get(
+                "https://query1.finance.yahoo.com/v8/finance/spark",
+                params={"symbols": ",".join(chunk), "range": "1d", "interval": "5m"},
+                headers={"User-Agent": "Mozilla/5.0"},
+                timeout=5,
+            )
+            r.raise_for_status()
+            js = r.json() or {}
+        except Exception as e:
+            # 다른 묶음은 계속 시도. 하나도 못 받았을 때만 실패로 올림
+            error = e
+            continue
+
+        # 구형 응답: {"spark": {"result": [{"symbol": ..., "response": [chart]}]}}
+        legacy = (js.get("spark") or {}).get("result") if isinstance(js.get("spark"), dict) else None
+        if legacy:
+            for item in legacy:
+                sym = (item.get("symbol") or "").upper()
+                resp = (item.get("response") or [{}])[0]
+                meta = resp.get("meta") or {}
+                price = _valid_price(meta.get("regularMarketPrice"))
+                if price is None:
+                    quotes = (resp.get("indicators") or {}).get("quote") or [{}]
+                    closes = [c for c in (quotes[0].get("close") or []) if c is not None]
+                    price = _valid_price(closes[-1]) if closes else None
+                if sym in chunk and price is not None:
+                    out[sym] = price
+            continue
+
+        # 신형 응답: {"AAPL": {"close": [...], ...}, ...}
+        for sym in chunk:
+            entry = js.get(sym) or {}
+            closes = [c for c in (entry.get("close") or []) if c is not None]
+            price = _valid_price(closes[-1]) if closes else None
+            if price is not None:
+                out[sym] = price
+    if error is not None and not out:
+        raise error
+    return out
 
 # -----------------------------
 # 보조 함수 (API 호출 로직 간소화)
 # -----------------------------
-def _try_all(funcs: List[Callable], *args) -> Optional[float]:
-    for func in funcs:
-        price = func(*args)
-        if price is not None:
-            return price
-    return None
+# 소스를 순차로 시도하는 대신 hedged 병렬 실행 + 소스별 서킷 브레이커
+_provider_engine = ProviderEngine(
+    failure_threshold=int(os.getenv("QUOTE_CB_FAILURES", "3")),
+    cooldown=float(os.getenv("QUOTE_CB_COOLDOWN", "30")),
+)
+
+def _try_all(funcs: List[Callable], *args) -> Tuple[Optional[float], Optional[str]]:
+    """(가격, 가격을 준 소스 이름)"""
+    return _provider_engine.fetch(funcs, *args)
+
+def get_provider_stats() -> Dict[str, Dict[str, Any]]:
+    return _provider_engine.stats()
+
+@coalesce
+def _fetch_quote(sym: str) -> Optional[Quote]:
+    """시장별 소스를 경쟁시켜 조회하고, 성공하면 캐시에 기록합니다."""
+    if is_krx_symbol(sym):
+        apis = [_get_price_yf, _get_price_yahoo_chart]
+    else:
+        apis = [_get_price_twelvedata, _get_price_yf]
+    price, source = _try_all(apis, sym)
+    if price is None:
+        return None
+    return _cache_set(sym, price, source)
+
+def get_quote(symbol: str) -> Optional[Quote]:
+    """해석이 끝난 티커의 시세 (캐시 → 업스트림)"""
+    return _cache_get(symbol) or _fetch_quote(symbol)
+
+def fetch_quote(name_or_symbol: str) -> Optional[Quote]:
+    """종목명/티커를 해석해 시세를 반환합니다. 실패하면 None."""
+    symbol = resolve_symbol(name_or_symbol)
+    return get_quote(symbol) if symbol else None
+
+@acoalesce
+async def _afetch_quote(sym: str) -> Optional[Quote]:
+    """_fetch_quote의 asyncio 버전 (httpx 기반 소스를 이벤트 루프에서 경쟁)"""
+    if is_krx_symbol(sym):
+        apis = [_aget_price_yf, _aget_price_yahoo_chart]
+    else:
+        apis = [_aget_price_twelvedata, _aget_price_yf]
+    price, source = await _provider_engine.afetch(apis, sym)
+    if price is None:
+        return None
+    # 캐시 기록에 SQLite 쓰기가 포함되므로 루프 밖에서
+    return await asyncio.to_thread(_cache_set, sym, price, source)
+
+async def aget_quote(symbol: str) -> Optional[Quote]:
+    return _cache_get(symbol) or await _afetch_quote(symbol)
+
+async def afetch_quote(name_or_symbol: str) -> Optional[Quote]:
+    symbol = await aresolve_symbol(name_or_symbol)
+    return await aget_quote(symbol) if symbol else None
 
 # -----------------------------
 # 메인 함수 (반환 타입 변경: Tuple[bool, str])
@@ -120,25 +353,77 @@ def get_stock_price(name_or_symbol: str) -> Tuple[bool, str]:
     if not symbol:
         return False, f"❌ 종목을 찾지 못했습니다: '{name_or_symbol}'"
 
-    cached = _cache_get(symbol)
-    if cached is not None:
-        if is_krx_symbol(symbol):
-            return True, f"{symbol}의 현재 주가는 ₩{cached:.2f}입니다."
-        return True, f"{symbol}의 현재 주가는 ${cached:.4f}입니다."
+    quote = get_quote(symbol)
+    if quote is None:
+        return _price_failure(symbol)
+    return True, format_quote(quote)
 
+def _price_failure(symbol: str) -> Tuple[bool, str]:
     if is_krx_symbol(symbol):
-        krx_apis = [_get_price_yf, _get_price_yahoo_chart]
-        price = _try_all(krx_apis, symbol)
-        if price is None:
-            return False, f"❌ 국내 종목 가격 조회 실패: {symbol}"
-        
-        _cache_set(symbol, price)
-        return True, f"{symbol}의 현재 주가는 ₩{price:.2f}입니다."
-
-    overseas_apis = [_get_price_twelvedata, _get_price_yf]
-    price = _try_all(overseas_apis, symbol)
-    if price is None:
-        return False, f"❌ 해외 종목 가격 조회 실패: {symbol}"
-    
-    _cache_set(symbol, price)
-    return True, f"{symbol}의 현재 주가는 ${price:.4f}입니다."
\ No newline at end of file
+        return False, f"❌ 국내 종목 가격 조회 실패: {symbol}"
+    return False, f"❌ 해외 종목 가격 조회 실패: {symbol}"
+
+async def _aget_stock_price(name_or_symbol: str) -> Tuple[bool, str]:
+    symbol = await aresolve_symbol(name_or_symbol)
+    if not symbol:
+        return False, f"❌ 종목을 찾지 못했습니다: '{name_or_symbol}'"
+    quote = await aget_quote(symbol)
+    if quote is None:
+        return _price_failure(symbol)
+    return True, format_quote(quote)
+
+# ToolNode가 비동기 그래프 실행(ainvoke/astream)에서는 코루틴 구현을 사용
+get_stock_price.coroutine = _aget_stock_price
+
+def _fill_missing(syms: List[str], found: Dict[str, Quote], batch_funcs: List[Callable]) -> None:
+    """배치 소스를 순서대로 시도하며 아직 가격이 없는 심볼만 다음 소스로 넘깁니다."""
+    for func in batch_funcs:
+        missing = [s for s in syms if s not in found]
+        if not missing:
+            return
+        found.update(_cache_set_many(_provider_engine.call(func, missing, default={}), provider_name(func)))
+
+def _resolve_inputs(symbols: List[str], resolved: bool) -> Dict[str, Optional[str]]:
+    """입력 → 티커. 이미 해석된 티커(resolved=True)나 .KS/.KQ가 붙은 티커는 그대로 사용 (다시 해석하면 다른 종목이 될 수 있음)"""
+    if resolved:
+        return {s: s for s in symbols}
+    out = {s: s.strip().upper() for s in symbols if s and s.strip().upper().endswith((".KS", ".KQ"))}
+    rest = [s for s in symbols if s not in out]
+    if rest:
+        out.update(resolve_symbols(rest))
+    return out
+
+def fetch_quotes(symbols: List[str], resolved: bool = False) -> Dict[str, Optional[Quote]]:
+    """
+    여러 종목의 시세를 한 번에 조회합니다.
+    입력(종목명/티커)을 키로, Quote(실패 시 None)를 값으로 하는 dict를 반환합니다.
+    resolved=True면 입력을 리졸버가 돌려준 티커로 보고 해석을 건너뜁니다.
+    캐시 → 시장별 배치 조회 → 남은 종목만 단건 조회 순으로 채웁니다.
+    """
+    resolved = _resolve_inputs(list(symbols), resolved)
+
+    uniq = list(dict.fromkeys(s for s in resolved.values() if s))
+    found: Dict[str, Quote] = {}
+    for sym in uniq:
+        cached = _cache_get(sym)
+        if cached is not None:
+            found[sym] = cached
+
+    krx = [s for s in uniq if is_krx_symbol(s)]
+    overseas = [s for s in uniq if not is_krx_symbol(s)]
+    _fill_missing(krx, found, [_get_prices_yf, _get_prices_yahoo_spark])
+    _fill_missing(overseas, found, [_get_prices_twelvedata, _get_prices_yf])
+
+    # 배치로도 못 채운 종목만 단건 폴백
+    for sym in uniq:
+        if sym in found:
+            continue
+        quote = _fetch_quote(sym)
+        if quote is not None:
+            found[sym] = quote
+
+    return {name: (found.get(sym) if sym else None) for name, sym in resolved.items()}
+
+async def afetch_quotes(symbols: List[str], resolved: bool = False) -> Dict[str, Optional[Quote]]:
+    # 배치 경로는 yfinance 다중 다운로드(동기)가 중심이라 워커 스레드 하나에서 통째로 실행
+    return await asyncio.to_thread(fetch_quotes, symbols, resolved)
@@ -0,0 +1,311 @@
+# FINAL_PROJECT/tools/symbol_index.py
+
+# 네트워크 없이 종목명을 티커로 바꾸는 로컬 종목 인덱스
+# - KRX(KOSPI/KOSDAQ) + 미국 상장 종목의 한글명/영문명/별칭/티커
+# - 정확 일치(dict) → 접두어(trie) → 한글 자모 단위 오타 허용(fuzzy) 순으로 조회
+# - 기본 내장 목록 + data/symbol_index.csv(있으면)로 확장. CSV는 tools/symbol_master.py가 공식 상장 종목 마스터로 생성
+
+import os
+import csv
+import re
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+SYMBOL_INDEX_PATH = os.getenv("SYMBOL_INDEX_PATH", os.path.join("data", "symbol_index.csv"))
+PARTIAL_MIN_CHARS = 2  # 이보다 짧은 입력은 접두어/오타 일치 안 함 ("애" → AAPL 같은 오인 방지)
+
+
+class Listing(NamedTuple):
+    symbol: str
+    name_ko: str
+    name_en: str
+    aliases: Tuple[str, ...]
+    market: str  # KOSPI / KOSDAQ / US
+
+
+# symbol, 한글명, 영문명, 별칭("|" 구분), 시장
+_SEED: List[Tuple[str, str, str, str, str]] = [
+    # --- KOSPI ---
+    ("005930.KS", "삼성전자", "Samsung Electronics", "삼전", "KOSPI"),
+    ("000660.KS", "SK하이닉스", "SK hynix", "하이닉스|에스케이하이닉스", "KOSPI"),
+    ("373220.KS", "LG에너지솔루션", "LG Energy Solution", "엘지에너지솔루션|엘지엔솔|LG엔솔", "KOSPI"),
+    ("207940.KS", "삼성바이오로직스", "Samsung Biologics", "삼바", "KOSPI"),
+    ("005380.KS", "현대차", "Hyundai Motor", "현대자동차", "KOSPI"),
+    ("000270.KS", "기아", "Kia", "기아차", "KOSPI"),
+    ("068270.KS", "셀트리온", "Celltrion", "", "KOSPI"),
+    ("005490.KS", "POSCO홀딩스", "POSCO Holdings", "포스코홀딩스|포스코", "KOSPI"),
+    ("035420.KS", "NAVER", "NAVER", "네이버", "KOSPI"),
+    ("035720.KS", "카카오", "Kakao", "", "KOSPI"),
+    ("051910.KS", "LG화학", "LG Chem", "엘지화학", "KOSPI"),
+    ("006400.KS", "삼성SDI", "Samsung SDI", "삼성에스디아이", "KOSPI"),
+    ("105560.KS", "KB금융", "KB Financial Group", "KB금융지주|국민은행", "KOSPI"),
+    ("055550.KS", "신한지주", "Shinhan Financial Group", "신한금융지주|신한금융", "KOSPI"),
+    ("086790.KS", "하나금융지주", "Hana Financial Group", "하나금융", "KOSPI"),
+    ("316140.KS", "우리금융지주", "Woori Financial Group", "우리금융", "KOSPI"),
+    ("024110.KS", "기업은행", "Industrial Bank of Korea", "IBK기업은행", "KOSPI"),
+    ("012330.KS", "현대모비스", "Hyundai Mobis", "", "KOSPI"),
+    ("028260.KS", "삼성물산", "Samsung C&T", "", "KOSPI"),
+    ("032830.KS", "삼성생명", "Samsung Life Insurance", "", "KOSPI"),
+    ("009150.KS", "삼성전기", "Samsung Electro-Mechanics", "", "KOSPI"),
+    ("018260.KS", "삼성에스디에스", "Samsung SDS", "삼성SDS", "KOSPI"),
+    ("066570.KS", "LG전자", "LG Electronics", "엘지전자", "KOSPI"),
+    ("003550.KS", "LG", "LG Corp", "엘지", "KOSPI"),
+    ("034730.KS", "SK", "SK Inc", "에스케이", "KOSPI"),
+    ("017670.KS", "SK텔레콤", "SK Telecom", "에스케이텔레콤|SKT", "KOSPI"),
+    ("096770.KS", "SK이노베이션", "SK Innovation", "", "KOSPI"),
+    ("030200.KS", "KT", "KT Corp", "케이티", "KOSPI"),
+    ("015760.KS", "한국전력", "Korea Electric Power", "한전|KEPCO", "KOSPI"),
+    ("033780.KS", "KT&G", "KT&G", "케이티앤지", "KOSPI"),
+    ("011200.KS", "HMM", "HMM", "현대상선", "KOSPI"),
+    ("010130.KS", "고려아연", "Korea Zinc", "", "KOSPI"),
+    ("010950.KS", "S-Oil", "S-Oil", "에쓰오일|에스오일", "KOSPI"),
+    ("003670.KS", "포스코퓨처엠", "POSCO Future M", "", "KOSPI"),
+    ("012450.KS", "한화에어로스페이스", "Hanwha Aerospace", "", "KOSPI"),
+    ("042660.KS", "한화오션", "Hanwha Ocean", "대우조선해양", "KOSPI"),
+    ("329180.KS", "HD현대중공업", "HD Hyundai Heavy Industries", "현대중공업", "KOSPI"),
+    ("009540.KS", "HD한국조선해양", "HD Korea Shipbuilding & Offshore Engineering", "한국조선해양", "KOSPI"),
+    ("034020.KS", "두산에너빌리티", "Doosan Enerbility", "두산중공업", "KOSPI"),
+    ("259960.KS", "크래프톤", "Krafton", "", "KOSPI"),
+    ("323410.KS", "카카오뱅크", "KakaoBank", "카뱅", "KOSPI"),
+    ("377300.KS", "카카오페이", "KakaoPay", "", "KOSPI"),
+    ("352820.KS", "하이브", "HYBE", "", "KOSPI"),
+    ("036570.KS", "엔씨소프트", "NCSOFT", "엔씨", "KOSPI"),
+    ("251270.KS", "넷마블", "Netmarble", "", "KOSPI"),
+    ("090430.KS", "아모레퍼시픽", "Amorepacific", "아모레", "KOSPI"),
+    # --- KOSDAQ ---
+    ("247540.KQ", "에코프로비엠", "EcoPro BM", "", "KOSDAQ"),
+    ("086520.KQ", "에코프로", "EcoPro", "", "KOSDAQ"),
+    ("196170.KQ", "알테오젠", "Alteogen", "", "KOSDAQ"),
+    ("028300.KQ", "HLB", "HLB", "에이치엘비", "KOSDAQ"),
+    ("263750.KQ", "펄어비스", "Pearl Abyss", "", "KOSDAQ"),
+    ("293490.KQ", "카카오게임즈", "Kakao Games", "", "KOSDAQ"),
+    ("035900.KQ", "JYP Ent.", "JYP Entertainment", "JYP엔터테인먼트|제이와이피", "KOSDAQ"),
+    ("041510.KQ", "에스엠", "SM Entertainment", "SM엔터테인먼트|SM", "KOSDAQ"),
+    ("058470.KQ", "리노공업", "LEENO Industrial", "", "KOSDAQ"),
+    ("068760.KQ", "셀트리온제약", "Celltrion Pharm", "", "KOSDAQ"),
+    ("357780.KQ", "솔브레인", "Soulbrain", "", "KOSDAQ"),
+    ("277810.KQ", "레인보우로보틱스", "Rainbow Robotics", "", "KOSDAQ"),
+    # --- US ---
+    ("AAPL", "애플", "Apple", "", "US"),
+    ("MSFT", "마이크로소프트", "Microsoft", "마소", "US"),
+    ("GOOGL", "알파벳", "Alphabet", "구글|Google", "US"),
+    ("AMZN", "아마존", "Amazon", "", "US"),
+    ("NVDA", "엔비디아", "NVIDIA", "", "US"),
+    ("META", "메타", "Meta Platforms", "페이스북|Facebook", "US"),
+    ("TSLA", "테슬라", "Tesla", "", "US"),
+    ("NFLX", "넷플릭스", "Netflix", "", "US"),
+    ("AMD", "AMD", "Advanced Micro Devices", "에이엠디", "US"),
+    ("INTC", "인텔", "Intel", "", "US"),
+    ("AVGO", "브로드컴", "Broadcom", "", "US"),
+    ("TSM", "TSMC", "Taiwan Semiconductor Manufacturing", "대만반도체|티에스엠씨", "US"),
+    ("QCOM", "퀄컴", "Qualcomm", "", "US"),
+    ("ORCL", "오라클", "Oracle", "", "US"),
+    ("CRM", "세일즈포스", "Salesforce", "", "US"),
+    ("ADBE", "어도비", "Adobe", "", "US"),
+    ("IBM", "IBM", "International Business Machines", "아이비엠", "US"),
+    ("PLTR", "팔란티어", "Palantir Technologies", "", "US"),
+    ("UBER", "우버", "Uber Technologies", "", "US"),
+    ("COIN", "코인베이스", "Coinbase", "", "US"),
+    ("KO", "코카콜라", "Coca-Cola", "", "US"),
+    ("PEP", "펩시코", "PepsiCo", "펩시", "US"),
+    ("MCD", "맥도날드", "McDonald's", "", "US"),
+    ("SBUX", "스타벅스", "Starbucks", "", "US"),
+    ("NKE", "나이키", "Nike", "", "US"),
+    ("DIS", "디즈니", "Walt Disney", "월트디즈니", "US"),
+    ("JPM", "JP모건", "JPMorgan Chase", "제이피모건", "US"),
+    ("BAC", "뱅크오브아메리카", "Bank of America", "", "US"),
+    ("V", "비자", "Visa", "", "US"),
+    ("MA", "마스터카드", "Mastercard", "", "US"),
+    ("BRK-B", "버크셔해서웨이", "Berkshire Hathaway", "버크셔", "US"),
+    ("JNJ", "존슨앤존슨", "Johnson & Johnson", "", "US"),
+    ("PFE", "화이자", "Pfizer", "", "US"),
+    ("LLY", "일라이릴리", "Eli Lilly", "릴리", "US"),
+    ("WMT", "월마트", "Walmart", "", "US"),
+    ("COST", "코스트코", "Costco", "", "US"),
+    ("XOM", "엑슨모빌", "Exxon Mobil", "", "US"),
+]
+
+# -----------------------------
+# 정규화 / 한글 자모 분해
+# -----------------------------
+_STRIP_RE = re.compile(r"[\s\.\,\-\&\'\(\)]+")
+_CORP_RE = re.compile(r"(주식회사|\(주\)|㈜|\binc\b|\bcorp\b|\bcorporation\b|\bco\b|\bltd\b)", re.IGNORECASE)
+
+_CHO = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+_JUNG = "ㅏㅐㅑㅒㅓㅔㅕㅖㅗㅘㅙㅚㅛㅜㅝㅞㅟㅠㅡㅢㅣ"
+_JONG = ("", "ㄱ", "ㄲ", "ㄳ", "ㄴ", "ㄵ", "ㄶ", "ㄷ", "ㄹ", "ㄺ", "ㄻ", "ㄼ", "ㄽ", "ㄾ", "ㄿ", "ㅀ",
+         "ㅁ", "ㅂ", "ㅄ", "ㅅ", "ㅆ", "ㅇ", "ㅈ", "ㅊ", "ㅋ", "ㅌ", "ㅍ", "ㅎ")
+
+
+def normalize_name(text: str) -> str:
+    text = _CORP_RE.sub("", text or "")
+    return _STRIP_RE.sub("", text).lower()
+
+
+def to_jamo(text: str) -> str:
+    """'삼성' → 'ㅅㅏㅁㅅㅓㅇ' (한글 음절만 분해, 나머지는 그대로)"""
+    out = []
+    for ch in text:
+        code = ord(ch) - 0xAC00
+        if 0 <= code < 11172:
+            out.append(_CHO[code // 588])
+            out.append(_JUNG[(code % 588) // 28])
+            out.append(_JONG[code % 28])
+        else:
+            out.append(ch)
+    return "".join(out)
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein 거리. limit을 넘는 순간 limit + 1을 반환 (조기 종료)"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i] + [0] * len(b)
+        row_min = i
+        for j, cb in enumerate(b, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb))
+            row_min = min(row_min, cur[j])
+        if row_min > limit:
+            return limit + 1
+        prev = cur
+    return prev[-1]
+
+
+# -----------------------------
+# 인덱스
+# -----------------------------
+class SymbolIndex:
+    def __init__(self, listings: Iterable[Listing] = ()):
+        self._exact: Dict[str, str] = {}
+        self._tickers: Dict[str, str] = {}           # 티커 표기(대문자, 6자리 코드 포함) → symbol
+        self._trie: Dict = {}
+        self._jamo_keys: List[Tuple[str, str, str]] = []  # (자모 문자열, 정규화 키, symbol)
+        self.listings: Dict[str, Listing] = {}
+        for listing in listings:
+            self.add(listing)
+
+    def add(self, listing: Listing) -> None:
+        self.listings[listing.symbol] = listing
+        keys = {listing.symbol, listing.name_ko, listing.name_en, *listing.aliases}
+        code = listing.symbol.split(".")[0]
+        self._tickers.setdefault(listing.symbol.upper(), listing.symbol)
+        if "-" in listing.symbol:
+            # 클래스 주식: BRK.B / BRK-B 둘 다 같은 종목
+            self._tickers.setdefault(listing.symbol.upper().replace("-", "."), listing.symbol)
+        if re.fullmatch(r"\d{6}", code):
+            keys.add(code)
+            self._tickers.setdefault(code, listing.symbol)
+        for key in keys:
+            norm = normalize_name(key)
+            if not norm:
+                continue
+            self._exact.setdefault(norm, listing.symbol)
+            self._trie_insert(norm, listing.symbol)
+            self._jamo_keys.append((to_jamo(norm), norm, listing.symbol))
+
+    def _trie_insert(self, key: str, symbol: str) -> None:
+        node = self._trie
+        for ch in key:
+            node = node.setdefault(ch, {})
+            syms = node.setdefault("$", set())
+            syms.add(symbol)
+
+    def exact(self, name: str) -> Optional[str]:
+        return self._exact.get(normalize_name(name))
+
+    def ticker(self, text: str) -> Optional[str]:
+        """티커 열만 조회 (회사명/별칭과는 대조하지 않음: 'SM'이 에스엠(041510.KS)으로 가지 않게)"""
+        return self._tickers.get((text or "").strip().upper())
+
+    def prefix(self, name: str) -> List[str]:
+        """name으로 시작하는 키를 가진 종목들 (정렬된 티커 목록). PARTIAL_MIN_CHARS보다 짧으면 빈 목록"""
+        norm = normalize_name(name)
+        if len(norm) < PARTIAL_MIN_CHARS:
+            return []
+        node = self._trie
+        for ch in norm:
+            node = node.get(ch)
+            if node is None:
+                return []
+        return sorted(node.get("$", ()))
+
+    def fuzzy(self, name: str, max_distance: Optional[int] = None) -> List[Tuple[int, str]]:
+        """
+        자모 단위 편집 거리로 가까운 종목들을 (거리, symbol) 오름차순으로 반환.
+        질의가 키 뒤에 글자를 덧붙인 형태면 제외 ('삼성전자우'(우선주) → 삼성전자(보통주) 같은 다른 종목 방지)
+        """
+        norm = normalize_name(name)
+        target = to_jamo(norm)
+        if not target:
+            return []
+        if max_distance is None:
+            max_distance = 1 if len(target) <= 6 else 2
+        best: Dict[str, int] = {}
+        for key, key_norm, sym in self._jamo_keys:
+            if len(norm) > len(key_norm) and norm.startswith(key_norm):
+                continue
+            d = edit_distance(target, key, max_distance)
+            if d <= max_distance and d < best.get(sym, max_distance + 1):
+                best[sym] = d
+        return sorted((d, s) for s, d in best.items())
+
+    def lookup(self, name: str, allow_partial: bool = True) -> Optional[str]:
+        """정확 일치 → 유일한 접두어 일치 → 유일한 최근접 오타 일치"""
+        hit = self.exact(name)
+        if hit or not allow_partial or len(normalize_name(name)) < PARTIAL_MIN_CHARS:
+            return hit
+        cands = self.prefix(name)
+        if len(cands) == 1:
+            return cands[0]
+        near = self.fuzzy(name)
+        if near and (len(near) == 1 or near[0][0] < near[1][0]):
+            return near[0][1]
+        return None
+
+
+def load_listing_csv(path: str) -> List[Listing]:
+    """symbol,name_ko,name_en,aliases,market 헤더의 CSV (aliases는 '|' 구분)"""
+    out: List[Listing] = []
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        for row in csv.DictReader(f):
+            sym = (row.get("symbol") or "").strip().upper()
+            if not sym:
+                continue
+            aliases = tuple(a.strip() for a in (row.get("aliases") or "").split("|") if a.strip())
+            out.append(Listing(sym, (row.get("name_ko") or "").strip(), (row.get("name_en") or "").strip(),
+                               aliases, (row.get("market") or "").strip().upper()))
+    return out
+
+
+def _seed_listings() -> List[Listing]:
+    return [Listing(sym, ko, en, tuple(a for a in aliases.split("|") if a), market)
+            for sym, ko, en, aliases, market in _SEED]
+
+
+_index: Optional[SymbolIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_symbol_index() -> SymbolIndex:
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                listings = _seed_listings()
+                if os.path.exists(SYMBOL_INDEX_PATH):
+                    try:
+                        listings += load_listing_csv(SYMBOL_INDEX_PATH)
+                    except Exception as e:
+                        print(f"⚠️ 종목 인덱스 CSV 로드 실패({SYMBOL_INDEX_PATH}): {e}")
+                _index = SymbolIndex(listings)
+    return _index
+
+
+def lookup_symbol(name: str, allow_partial: bool = True) -> Optional[str]:
+    return get_symbol_index().lookup(name, allow_partial=allow_partial)
+
+
+def lookup_ticker(text: str) -> Optional[str]:
+    return get_symbol_index().ticker(text)
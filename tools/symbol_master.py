@@ -0,0 +1,149 @@
+# FINAL_PROJECT/tools/symbol_master.py
+
+# 공식 상장 종목 마스터 → data/symbol_index.csv 생성 (symbol,name_ko,name_en,aliases,market)
+# - KRX: 정보데이터시스템 '전종목 기본정보' (KOSPI → .KS, KOSDAQ → .KQ, KONEX 제외)
+# - 미국: Nasdaq Trader 심볼 디렉터리 (nasdaqlisted.txt + otherlisted.txt, 테스트 종목 제외)
+# - 내장 목록(_SEED)의 한글명/별칭은 같은 티커 행에 합쳐서 보존 → 미국 종목도 한글로 찾을 수 있음
+# - 주기적으로(상장/상폐 반영) 다시 실행: python -m tools.symbol_master
+
+import os
+import csv
+import argparse
+from typing import Dict, List
+
+from tools import http_client
+from tools.symbol_index import SYMBOL_INDEX_PATH, Listing, _seed_listings
+
+KRX_JSON_URL = "http://data.krx.co.kr/comm/bldAttendant/getJsonData.cmd"
+KRX_LISTING_BLD = "dbms/MDC/STAT/standard/MDCSTAT01901"
+KRX_HEADERS = {
+    "User-Agent": "Mozilla/5.0",
+    "Referer": "http://data.krx.co.kr/contents/MDC/MDI/mdiLoader/index.cmd?menuId=MDC0201020101",
+}
+KRX_SUFFIX = {"KOSPI": ".KS", "KOSDAQ": ".KQ"}
+
+NASDAQ_LISTED_URL = "https://www.nasdaqtrader.com/dynamic/SymDir/nasdaqlisted.txt"
+OTHER_LISTED_URL = "https://www.nasdaqtrader.com/dynamic/SymDir/otherlisted.txt"
+
+
+# -----------------------------
+# KRX
+# -----------------------------
+def fetch_krx_listings() -> List[Listing]:
+    r = http_client.post(
+        KRX_JSON_URL,
+        data={"bld": KRX_LISTING_BLD, "locale": "ko_KR", "mktId": "ALL", "share": "1", "csvxls_isNo": "false"},
+        headers=KRX_HEADERS,
+        timeout=30,
+    )
+    r.raise_for_status()
+    out: List[Listing] = []
+    for row in (r.json() or {}).get("OutBlock_1", []):
+        market = (row.get("MKT_TP_NM") or "").strip().upper()
+        code = (row.get("ISU_SRT_CD") or "").strip()
+        if market not in KRX_SUFFIX or not code:
+            continue
+        name_ko = (row.get("ISU_ABBRV") or "").strip()
+        # 정식 한글명(ISU_NM)이 약칭과 다르면 별칭으로 (예: 삼성전자보통주)
+        full_ko = (row.get("ISU_NM") or "").strip()
+        aliases = (full_ko,) if full_ko and full_ko != name_ko else ()
+        out.append(Listing(code + KRX_SUFFIX[market], name_ko, (row.get("ISU_ENG_NM") or "").strip(), aliases, market))
+    return out
+
+
+# -----------------------------
+# 미국
+# -----------------------------
+def _yahoo_symbol(sym: str) -> str:
+    # 클래스 주식 표기: BRK.B → BRK-B (Yahoo 기준)
+    return sym.replace(".", "-")
+
+
+def _security_name(name: str) -> str:
+    # "Apple Inc. - Common Stock" → "Apple Inc."
+    return name.split(" - ")[0].strip()
+
+
+def _parse_symdir(text: str, symbol_col: str) -> List[Listing]:
+    lines = [l for l in text.splitlines() if l and not l.startswith("File Creation Time")]
+    out: List[Listing] = []
+    for row in csv.DictReader(lines, delimiter="|"):
+        sym = (row.get(symbol_col) or "").strip()
+        # 우선주/유닛 등 특수 표기($, 공백)와 테스트 종목은 제외
+        if not sym or "$" in sym or " " in sym or row.get("Test Issue") == "Y":
+            continue
+        out.append(Listing(_yahoo_symbol(sym), "", _security_name(row.get("Security Name") or ""), (), "US"))
+    return out
+
+
+def fetch_us_listings() -> List[Listing]:
+    out: List[Listing] = []
+    for url, col in ((NASDAQ_LISTED_URL, "Symbol"), (OTHER_LISTED_URL, "ACT Symbol")):
+        r = http_client.get(url, timeout=30)
+        r.raise_for_status()
+        out += _parse_symdir(r.text, col)
+    return out
+
+
+# -----------------------------
+# 병합 / 저장
+# -----------------------------
+def merge_with_seed(listings: List[Listing]) -> List[Listing]:
+    """같은 티커면 내장 목록의 한글명/별칭을 채워 넣음. 마스터에 없는 내장 종목도 그대로 유지"""
+    seed = {l.symbol: l for l in _seed_listings()}
+    merged: Dict[str, Listing] = {}
+    for l in listings:
+        s = seed.get(l.symbol)
+        if s is not None:
+            aliases = tuple(dict.fromkeys(s.aliases + l.aliases + ((l.name_ko,) if l.name_ko and l.name_ko != s.name_ko else ())))
+            l = Listing(l.symbol, s.name_ko, l.name_en or s.name_en, aliases, l.market)
+        merged.setdefault(l.symbol, l)
+    for sym, s in seed.items():
+        merged.setdefault(sym, s)
+    return sorted(merged.values(), key=lambda l: (l.market, l.symbol))
+
+
+def write_listing_csv(listings: List[Listing], path: str = SYMBOL_INDEX_PATH) -> int:
+    parent = os.path.dirname(path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["symbol", "name_ko", "name_en", "aliases", "market"])
+        for l in listings:
+            w.writerow([l.symbol, l.name_ko, l.name_en, "|".join(l.aliases), l.market])
+    os.replace(tmp, path)
+    return len(listings)
+
+
+def build_symbol_index(path: str = SYMBOL_INDEX_PATH, krx: bool = True, us: bool = True) -> Dict[str, int]:
+    listings: List[Listing] = []
+    stats = {"krx": 0, "us": 0}
+    # 한쪽 소스가 실패해도 나머지로 파일을 만든다 (내장 목록은 항상 포함)
+    if krx:
+        try:
+            rows = fetch_krx_listings()
+            listings += rows
+            stats["krx"] = len(rows)
+        except Exception as e:
+            print(f"⚠️ KRX 종목 마스터 조회 실패: {e}")
+    if us:
+        try:
+            rows = fetch_us_listings()
+            listings += rows
+            stats["us"] = len(rows)
+        except Exception as e:
+            print(f"⚠️ 미국 종목 마스터 조회 실패: {e}")
+    stats["total"] = write_listing_csv(merge_with_seed(listings), path)
+    print(f"✅ 종목 인덱스 저장: {path} {stats}")
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="KRX/미국 상장 종목 마스터로 종목 인덱스 CSV 생성")
+    parser.add_argument("--out", default=SYMBOL_INDEX_PATH)
+    parser.add_argument("--no-krx", action="store_true", help="KRX 종목 제외")
+    parser.add_argument("--no-us", action="store_true", help="미국 종목 제외")
+    args = parser.parse_args()
+    build_symbol_index(args.out, krx=not args.no_krx, us=not args.no_us)
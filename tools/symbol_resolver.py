@@ -2,15 +2,23 @@
 
 # "삼성전자", "애플", "테슬라" 등 사용자의 다양한 언어 표현을 "005930.KS", "AAPL", "TSLA" 와 같은 정확한 주식 **티커(Ticker)**로 변환
 
-import os, re, requests
-from typing import Optional, List
+import os, re
+import asyncio
+from typing import Optional, List, Tuple, Dict
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
 
+from tools import http_client
+from tools.singleflight import SingleFlight, AsyncSingleFlight
+from tools.symbol_index import lookup_symbol, lookup_ticker, normalize_name
+from tools.resolver_cache import ResolverCache
+
 load_dotenv()
 TD_API_KEY = os.getenv("TWELVE_DATA_API_KEY")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 STRICT = os.getenv("SYMBOL_RESOLVE_STRICT", "0") == "1"  # 기본: 빠르게(검증 최소화)
+RESOLVE_CONCURRENCY = int(os.getenv("RESOLVE_CONCURRENCY", "4"))  # resolve_symbols의 동시 Yahoo 검색 수
 
 TICKER_RE = re.compile(r"^[A-Z0-9][A-Z0-9\.\-]{0,9}$", re.IGNORECASE)
 
@@ -53,16 +61,45 @@ def _try_korea_suffixes(code6: str) -> Optional[str]:
 
 # ---- Yahoo 검색(키 불필요, 2초 타임아웃) ----
 
+YAHOO_SEARCH_URL = "https://query1.finance.yahoo.com/v1/finance/search"
+
+def _yahoo_search_params(keyword: str) -> dict:
+    return {"q": keyword, "quotesCount": 6, "newsCount": 0, "listsCount": 0}
+
 def _yahoo_search(keyword: str) -> Optional[str]:
     try:
-        r = requests.get(
-            "https://query1.finance.yahoo.com/v1/finance/search",
-            params={"q": keyword, "quotesCount": 6, "newsCount": 0, "listsCount": 0},
+        r = http_client.get(
+            YAHOO_SEARCH_URL,
+            params=_yahoo_search_params(keyword),
+            timeout=2,
+            headers={"User-Agent": "Mozilla/5.0"}
+        )
+        r.raise_for_status()
+        return _pick_yahoo_symbol(keyword, r.json() or {})
+    except Exception:
+        pass
+    return None
+
+async def _ayahoo_search(keyword: str) -> Optional[str]:
+    try:
+        r = await http_client.aget(
+            YAHOO_SEARCH_URL,
+            params=_yahoo_search_params(keyword),
             timeout=2,
             headers={"User-Agent": "Mozilla/5.0"}
         )
         r.raise_for_status()
         data = r.json() or {}
+        if STRICT:
+            # 엄격 모드 검증은 yfinance(동기) 호출이라 스레드에서
+            return await asyncio.to_thread(_pick_yahoo_symbol, keyword, data)
+        return _pick_yahoo_symbol(keyword, data)
+    except Exception:
+        pass
+    return None
+
+def _pick_yahoo_symbol(keyword: str, data: dict) -> Optional[str]:
+    try:
         quotes = data.get("quotes") or []
         
         # ✅ 주식(EQUITY)을 우선적으로 찾기 위한 로직 추가
@@ -102,61 +139,232 @@ def _yahoo_search(keyword: str) -> Optional[str]:
     return None
 
 # ---- LLM 후보(백업, 2초 모델 호출 피하려면 OFF 가능) ----
+_llm = None
+
+def _get_llm() -> ChatOpenAI:
+    global _llm
+    if _llm is None:
+        _llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.2, openai_api_key=OPENAI_API_KEY, timeout=2.0)
+    return _llm
+
+def _parse_tickers(text: str, top_k: int = 3) -> List[str]:
+    raw = re.split(r"[,\s]+", (text or "").upper())
+    out: List[str] = []
+    for t in raw:
+        t = t.strip().upper()
+        if not t: continue
+        if looks_like_ticker(t) or re.fullmatch(r"\d{6}", t):
+            out.append(t)
+        if len(out) >= top_k: break
+    return out
+
 def _llm_candidates(name: str, top_k: int = 3) -> List[str]:
     if not OPENAI_API_KEY:
         return []
     try:
-        llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.2, openai_api_key=OPENAI_API_KEY, timeout=2.0)
         system = ("Convert company names (Korean/English) into tickers. "
                   "Prefer 6-digit+.KS/.KQ for Korean; AAPL/TSLA for US. "
                   "Return ONLY 1-3 tickers, comma-separated.")
         user = f"Name: {name}\nTickers only."
-        resp = llm.invoke([{"role":"system","content":system},{"role":"user","content":user}])
-        text = (getattr(resp, "content", "") or "").upper()
-        raw  = re.split(r"[,\s]+", text)
-        out: List[str] = []
-        for t in raw:
-            t = t.strip().upper()
-            if not t: continue
-            if looks_like_ticker(t) or re.fullmatch(r"\d{6}", t):
-                out.append(t)
-            if len(out) >= top_k: break
-        return out
+        resp = _get_llm().invoke([{"role":"system","content":system},{"role":"user","content":user}])
+        return _parse_tickers(getattr(resp, "content", ""), top_k)
+    except Exception:
+        return []
+
+async def _allm_candidates(name: str, top_k: int = 3) -> List[str]:
+    if not OPENAI_API_KEY:
+        return []
+    try:
+        system = ("Convert company names (Korean/English) into tickers. "
+                  "Prefer 6-digit+.KS/.KQ for Korean; AAPL/TSLA for US. "
+                  "Return ONLY 1-3 tickers, comma-separated.")
+        user = f"Name: {name}\nTickers only."
+        resp = await _get_llm().ainvoke([{"role":"system","content":system},{"role":"user","content":user}])
+        return _parse_tickers(getattr(resp, "content", ""), top_k)
     except Exception:
         return []
 
+def _llm_candidates_batch(names: List[str], top_k: int = 3) -> Dict[str, List[str]]:
+    """여러 이름을 프롬프트 한 번으로 변환. 'n: T1, T2' 형식의 줄 단위 응답을 파싱"""
+    if not OPENAI_API_KEY or not names:
+        return {}
+    if len(names) == 1:
+        return {names[0]: _llm_candidates(names[0], top_k)}
+    try:
+        system = ("Convert company names (Korean/English) into tickers. "
+                  "Prefer 6-digit+.KS/.KQ for Korean; AAPL/TSLA for US. "
+                  "For each numbered name, answer one line '<number>: <1-3 tickers, comma-separated>'. "
+                  "Leave the tickers empty if unknown.")
+        user = "\n".join(f"{i}. {n}" for i, n in enumerate(names, 1)) + "\nTickers only."
+        resp = _get_llm().invoke([{"role":"system","content":system},{"role":"user","content":user}])
+        out: Dict[str, List[str]] = {}
+        for line in (getattr(resp, "content", "") or "").splitlines():
+            m = re.match(r"\s*(\d+)[\.\):]\s*(.*)", line)
+            if not m: continue
+            idx = int(m.group(1)) - 1
+            if 0 <= idx < len(names):
+                out[names[idx]] = _parse_tickers(m.group(2), top_k)
+        return out
+    except Exception:
+        return {}
+
 # ---- 메인 ----
 COMMON_FIX = {"APPL": "AAPL"}  # 흔한 오타 교정(즉시)
 
+_resolve_flight = SingleFlight()
+_aresolve_flight = AsyncSingleFlight()
+_memo = ResolverCache()
+_memo.purge_expired()  # 시작 시 만료 항목 정리 (negative 항목이 계속 쌓이지 않게)
+
 def resolve_symbol(name_or_ticker: str) -> Optional[str]:
-    if not name_or_ticker:
+    if not name_or_ticker or not name_or_ticker.strip():
         return None
-    raw = name_or_ticker.strip()
+    # 같은 이름을 동시에 해석하는 호출들은 한 번의 검색 결과를 공유
+    key = name_or_ticker.strip().upper()
+    return _resolve_flight.do(key, _resolve_symbol, name_or_ticker)
+
+def _memo_key(up: str) -> str:
+    """티커처럼 생긴 입력은 대문자 그대로 (정규화하면 'BRK.B'와 'BRK-B'가 같은 키가 됨), 이름은 정규화"""
+    return up if looks_like_ticker(up) else normalize_name(up)
 
+def _resolve_local(raw: str) -> Tuple[bool, Optional[str], str, str, bool]:
+    """
+    네트워크 없이 끝낼 수 있는 단계(오타 교정 → 로컬 인덱스 → 영속 메모).
+    (완료 여부, 티커, 대문자 입력, 메모 키, LLM 시도 이력)을 반환합니다.
+    """
     # 흔한 오타 즉시 교정
     up = raw.upper()
     if up in COMMON_FIX:
         up = COMMON_FIX[up]
 
+    # 0) 로컬 종목 인덱스(네트워크 없음). 티커처럼 생긴 입력은 티커 열에서만 찾음
+    #    (회사명/별칭과 대조하면 'SM'→에스엠, 'SOIL'→S-Oil처럼 다른 종목이 됨)
+    sym = lookup_ticker(up) if looks_like_ticker(up) else lookup_symbol(up)
+    if sym:
+        return True, sym, up, "", False
+
+    # 1) 영속 메모(positive/negative). 만료됐어도 LLM 시도 이력은 이어받음
+    key = _memo_key(up)
+    entry = _memo.get(key)
+    if entry is not None and entry.fresh:
+        return True, entry.symbol, up, key, entry.llm_tried
+    return False, None, up, key, entry is not None and entry.llm_tried
+
+def _resolve_symbol(name_or_ticker: str) -> Optional[str]:
+    raw = name_or_ticker.strip()
+    done, sym, up, key, llm_tried = _resolve_local(raw)
+    if done:
+        return sym
+
+    sym, strategy, used_llm = _resolve_uncached(raw, up, skip_llm=llm_tried)
+    _memo.put(key, sym, strategy, llm_tried=llm_tried or used_llm)
+    return sym
+
+async def aresolve_symbol(name_or_ticker: str) -> Optional[str]:
+    """resolve_symbol의 asyncio 버전. 로컬 단계는 워커 스레드로, 네트워크 단계는 비동기로"""
+    if not name_or_ticker or not name_or_ticker.strip():
+        return None
+    key = name_or_ticker.strip().upper()
+    return await _aresolve_flight.do(key, _aresolve_symbol, name_or_ticker)
+
+async def _aresolve_symbol(name_or_ticker: str) -> Optional[str]:
+    raw = name_or_ticker.strip()
+    # 로컬 단계도 인덱스 첫 로드(CSV)와 메모 SQLite 조회가 있어 이벤트 루프 밖에서
+    done, sym, up, key, llm_tried = await asyncio.to_thread(_resolve_local, raw)
+    if done:
+        return sym
+
+    if looks_like_ticker(up):
+        # 티커 경로는 STRICT 검증(yfinance)만 블로킹이므로 스레드로
+        sym, strategy, used_llm = await asyncio.to_thread(_resolve_uncached, raw, up, llm_tried)
+    else:
+        sym, strategy, used_llm = await _ayahoo_search(raw), "yahoo", False
+        if not sym and not llm_tried:
+            cands = await _allm_candidates(raw)
+            sym, strategy, used_llm = await asyncio.to_thread(_pick_llm_candidate, cands), "llm", True
+        elif not sym:
+            strategy = "none"
+    await asyncio.to_thread(_memo.put, key, sym, strategy, llm_tried or used_llm)
+    return sym
+
+def _resolve_uncached(raw: str, up: str, skip_llm: bool = False) -> Tuple[Optional[str], str, bool]:
+    """(티커, 전략, LLM 호출 여부)를 반환합니다."""
     # 이미 티커면(또는 6자리 숫자) 바로 처리
     if looks_like_ticker(up):
         if re.fullmatch(r"\d{6}", up):
             res = _try_korea_suffixes(up) or (up + ".KS" if not STRICT else None)
-            return res
-        return up if _validate_symbol(up) else None
+            return res, "ticker", False
+        return (up if _validate_symbol(up) else None), "ticker", False
 
-    # 1) Yahoo 검색(빠름)
+    # 2) Yahoo 검색(인덱스/메모에 없는 이름만)
     sym = _yahoo_search(raw)
     if sym:
-        return sym
+        return sym, "yahoo", False
+
+    # 3) LLM 후보 → (선택) 간단 검증. 이름당 최대 1회
+    if skip_llm:
+        return None, "none", False
+    return _pick_llm_candidate(_llm_candidates(raw)), "llm", True
 
-    # 2) LLM 후보 → (선택) 간단 검증
-    for cand in _llm_candidates(raw):
+def _pick_llm_candidate(cands: List[str]) -> Optional[str]:
+    for cand in cands:
         if re.fullmatch(r"\d{6}", cand):
             res = _try_korea_suffixes(cand) or (cand + ".KS" if not STRICT else None)
             if res: return res
         else:
             if not STRICT or _validate_symbol(cand):
                 return cand
+    return None
+
+
+def resolve_symbols(names: List[str]) -> Dict[str, Optional[str]]:
+    """
+    여러 이름을 한 번에 해석합니다. 입력 문자열을 키로 하는 dict를 반환.
+    1) 중복 제거 2) 인덱스/메모로 즉시 처리 3) 나머지 Yahoo 검색을 동시 실행(상한 RESOLVE_CONCURRENCY)
+    4) 그래도 남은 이름은 LLM 프롬프트 한 번으로 일괄 변환
+    """
+    out: Dict[str, Optional[str]] = {}
+    by_raw: Dict[str, List[str]] = {}
+    for name in names:
+        raw = (name or "").strip()
+        if not raw:
+            out[name] = None
+            continue
+        by_raw.setdefault(raw, []).append(name)
+
+    resolved: Dict[str, Optional[str]] = {}
+    pending: Dict[str, Tuple[str, str, bool]] = {}  # raw -> (up, key, llm_tried)
+    for raw in by_raw:
+        done, sym, up, key, llm_tried = _resolve_local(raw)
+        if done:
+            resolved[raw] = sym
+        else:
+            pending[raw] = (up, key, llm_tried)
+
+    if pending:
+        raws = list(pending)
+        workers = max(1, min(RESOLVE_CONCURRENCY, len(raws)))
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            results = list(ex.map(lambda r: _resolve_uncached(r, pending[r][0], skip_llm=True), raws))
+
+        need_llm: List[str] = []
+        for raw, (sym, strategy, _) in zip(raws, results):
+            up, key, llm_tried = pending[raw]
+            if sym is None and not llm_tried and not looks_like_ticker(up):
+                need_llm.append(raw)
+                continue
+            resolved[raw] = sym
+            _memo.put(key, sym, strategy, llm_tried=llm_tried)
+
+        if need_llm:
+            cands = _llm_candidates_batch(need_llm)
+            for raw in need_llm:
+                up, key, _ = pending[raw]
+                sym = _pick_llm_candidate(cands.get(raw, []))
+                resolved[raw] = sym
+                _memo.put(key, sym, "llm", llm_tried=True)
 
-    return None
\ No newline at end of file
+    for raw, originals in by_raw.items():
+        for name in originals:
+            out[name] = resolved.get(raw)
+    return out
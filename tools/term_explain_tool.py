@@ -2,15 +2,20 @@
 
 # finance_terms.pdf 파일의 내용을 기반으로, 사용자가 모를 수 있는 전문 금융 용어를 정확하게 설명하는 RAG 파이프라인
 import os
-from typing import List, Tuple
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Tuple
 
 from dotenv import load_dotenv
-from langchain_community.document_loaders import PyMuPDFLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_chroma import Chroma
-from langchain_community.retrievers import BM25Retriever
+from langchain_core.documents import Document
 from langchain_openai import OpenAIEmbeddings, ChatOpenAI
 
+from tools.bm25_index import BM25_DIR, BM25Index, stamp_path as bm25_stamp_path
+from tools.embedding_cache import CachedEmbeddings
+from tools.glossary_index import GLOSSARY_PATH, GlossaryEntry, GlossaryIndex, TermAnswerCache
+
 # ===== 기본 설정 =====
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
@@ -19,54 +24,33 @@ PDF_PATH = os.path.join("data", "finance_terms.pdf")
 PERSIST_DIR = os.path.join("data", "chroma_terms")
 
 # 한글 잘 되는 최신 임베딩 지정 (하나만 만들어 재사용)
-EMB = OpenAIEmbeddings(model="text-embedding-3-small", api_key=OPENAI_API_KEY)
-
-# 캐시(최초 1회 로드)
-_DOC_CHUNKS = None
-_BM25 = None
+# 디스크 캐시를 앞에 둬서 인덱싱/질의 모두 같은 텍스트는 다시 임베딩하지 않음
+EMBED_MODEL = "text-embedding-3-small"
+EMB = CachedEmbeddings(OpenAIEmbeddings(model=EMBED_MODEL, api_key=OPENAI_API_KEY), EMBED_MODEL)
 
+TERM_LLM_MODEL = os.getenv("TERM_LLM_MODEL", "gpt-4o-mini")
 
-# PDF 문서를 잘게 쪼개(Chunking) 벡터로 변환하고, ChromaDB라는 벡터 데이터베이스에 저장
-def build_vectorstore():
-    """PDF → 청크 → 임베딩(소배치) → Chroma (자동 저장)"""
-    print("📄 PDF 로딩 중...")
-    loader = PyMuPDFLoader(PDF_PATH)
-    docs = loader.load()
-    print(f"✅ {len(docs)}개 문서 로드")
+CHUNK_SIZE, CHUNK_OVERLAP = 500, 100   # 벡터/BM25가 같은 청크를 공유
+RRF_K = 60                             # reciprocal rank fusion 상수
 
-    splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=100)
-    chunks = splitter.split_documents(docs)
-    print(f"✂️ {len(chunks)}개 청크 생성")
+TERM_PROMPT_VERSION = "v1"             # _build_messages 형식을 바꾸면 올려서 표제어 답변 캐시 무효화
+TERM_ANSWER_CACHE = os.getenv("TERM_ANSWER_CACHE", "1") == "1"  # 표제어 적중 시 저장된 답변 재사용 (LLM 생략)
 
-    # persist_directory 지정만 하면 자동 저장됨 (persist() 호출 X)
-    vs = Chroma(embedding_function=EMB, persist_directory=PERSIST_DIR)
 
-    BATCH = 64
-    for i in range(0, len(chunks), BATCH):
-        batch = chunks[i:i + BATCH]
-        print(f"➡️ 인덱싱 중... {i+1} ~ {i+len(batch)}")
-        vs.add_documents(batch)
+# PDF 문서를 잘게 쪼개(Chunking) 벡터로 변환하고, ChromaDB라는 벡터 데이터베이스에 저장
+def build_vectorstore(pdf_paths: Optional[List[str]] = None, force: bool = False) -> Dict[str, int]:
+    """PDF → 청크 → 임베딩 → Chroma + BM25/표제어 색인 (증분·재개 가능, tools/term_indexer.py)"""
+    from tools.term_indexer import build_index
+    return build_index(pdf_paths, force=force)
 
-    print("✅ 인덱싱 완료 (자동 저장됨):", PERSIST_DIR)
+def get_embedding_cache_stats() -> Dict:
+    return EMB.store.stats()
 
 def _load_vectorstore() -> Chroma:
     """persist된 Chroma 불러오기"""
     return Chroma(embedding_function=EMB, persist_directory=PERSIST_DIR)
 
 
-def _load_chunks_for_bm25() -> Tuple[List, BM25Retriever]:
-    """BM25용 청크/리트리버 메모리 로드(최초 1회)"""
-    global _DOC_CHUNKS, _BM25
-    if _DOC_CHUNKS is None:
-        loader = PyMuPDFLoader(PDF_PATH)
-        docs = loader.load()
-        splitter = RecursiveCharacterTextSplitter(chunk_size=700, chunk_overlap=120)
-        _DOC_CHUNKS = splitter.split_documents(docs)
-        _BM25 = BM25Retriever.from_documents(_DOC_CHUNKS)
-        _BM25.k = 6
-    return _DOC_CHUNKS, _BM25
-
-
 def _format_sources(docs: List) -> str:
     """출처 페이지 표시 (1-base)"""
     pages = sorted({(d.metadata.get("page", 0) + 1) for d in docs})
@@ -77,41 +61,58 @@ def _format_sources(docs: List) -> str:
 
 
 # ===== RAG 메인 =====
-def explain_term(query: str, k: int = 4) -> str:
-    """PDF 기반 RAG: 정의 → 핵심 포인트 → 한 줄 예시 (+출처 페이지)"""
-    if not os.path.exists(PERSIST_DIR) or not os.listdir(PERSIST_DIR):
-        return "아직 용어집 인덱스가 없어요. 먼저 벡터스토어를 생성해주세요."
+NO_INDEX_MSG = "아직 용어집 인덱스가 없어요. 먼저 벡터스토어를 생성해주세요."
 
-    vs = _load_vectorstore()
+def _index_ready() -> bool:
+    return os.path.exists(PERSIST_DIR) and bool(os.listdir(PERSIST_DIR))
 
-    # 1) 임베딩 유사도 검색 (새 API: invoke)
-    retriever = vs.as_retriever(search_kwargs={"k": max(8, k)})
+def _doc_key(d: Document):
+    # chunk_id가 없는 예전 인덱스는 (페이지, 앞부분)으로 대신 식별
+    return d.metadata.get("chunk_id") or (d.metadata.get("page"), d.page_content[:60])
+
+def _rrf_fuse(rankings: List[List[Document]], n: int) -> List[Document]:
+    """reciprocal rank fusion: score(d) = Σ 1 / (RRF_K + 순위)"""
+    scores: Dict = {}
+    docs: Dict = {}
+    for ranked in rankings:
+        for rank, d in enumerate(ranked, 1):
+            key = _doc_key(d)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (RRF_K + rank)
+            docs.setdefault(key, d)
+    best = sorted(scores, key=scores.get, reverse=True)[:n]
+    return [docs[key] for key in best]
+
+class EntryHit(NamedTuple):
+    entry: GlossaryEntry
+    build_id: str
+    fuzzy: bool
+
+def _entry_document(entry: GlossaryEntry) -> Document:
+    return Document(page_content=entry.text, metadata={"page": entry.page, "headword": entry.headword})
+
+def _entry_question(query: str, hit: "EntryHit") -> str:
+    """정확 일치면 표제어로, 근사 일치면 사용자의 원래 질문으로 묻는다 (LLM이 다른 용어임을 알 수 있게)"""
+    return query if hit.fuzzy else hit.entry.headword
+
+def _bm25_documents(index: Optional[BM25Index], query: str, n: int) -> List[Document]:
+    if index is None:
+        return []
+    out = []
+    for i, _score in index.search(query, n):
+        c = index.chunk(i)
+        out.append(Document(page_content=c["text"], metadata={"chunk_id": c["id"], "page": c.get("page", 0), "source": c.get("source")}))
+    return out
+
+def _retrieve(retriever, query: str) -> List:
     try:
-        contexts = retriever.invoke(query)
-    except Exception:
+        return retriever.invoke(query)
+    except AttributeError:
         # 구버전 호환
-        contexts = retriever.get_relevant_documents(query)
-
-    # 2) 빈약하면 BM25 키워드 검색 병합
-    if len(contexts) < 2:
-        _, bm25 = _load_chunks_for_bm25()
-        bm_hits = bm25.get_relevant_documents(query)
-        seen, merged = set(), []
-        for d in (contexts + bm_hits):
-            key = (d.metadata.get("page"), d.page_content[:60])
-            if key not in seen:
-                merged.append(d)
-                seen.add(key)
-        contexts = merged[:max(8, k)]
-
-    if not contexts:
-        return f"'{query}' 관련 내용을 PDF에서 찾지 못했어요. 다른 표현으로 물어봐줄래?"
+        return retriever.get_relevant_documents(query)
 
+def _build_messages(query: str, contexts: List) -> List[dict]:
     # 컨텍스트 묶기
     ctx_texts = "\n\n".join([c.page_content.strip() for c in contexts])
-
-    # LLM 호출
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.2, api_key=OPENAI_API_KEY)
     system_msg = (
         "너는 금융 용어 설명 어시스턴트다. 반드시 제공된 컨텍스트에만 근거해 답해.\n"
         "형식: ① 정의(두세 문장) ② 핵심 포인트(불릿 3~5개) ③ 한 줄 예시\n"
@@ -122,12 +123,234 @@ def explain_term(query: str, k: int = 4) -> str:
         f"[컨텍스트]\n{ctx_texts}\n\n"
         "위 컨텍스트만 활용해 한국어로 설명해줘."
     )
-    resp = llm.invoke([
+    return [
         {"role": "system", "content": system_msg},
         {"role": "user", "content": user_msg},
-    ])
-    answer = resp.content.strip()
-    return answer + _format_sources(contexts)
+    ]
+
+def _not_found(query: str) -> str:
+    return f"'{query}' 관련 내용을 PDF에서 찾지 못했어요. 다른 표현으로 물어봐줄래?"
+
+# -----------------------------
+# 장수명 서비스 객체 (벡터스토어 / LLM / BM25를 한 번만 열어 재사용)
+# -----------------------------
+class TermExplainService:
+    """
+    explain_term 파이프라인의 무거운 자원을 프로세스 전체에서 공유합니다.
+    - Chroma 클라이언트, 리트리버(k별), ChatOpenAI는 최초 사용 시 1회 생성 (이중 확인 잠금)
+    - BM25는 빌드 때 저장한 역색인을 memory-map으로 열어 사용 (PDF 재파싱 없음)
+    - BM25/표제어 색인 파일이 바뀌면(별도 프로세스로 인덱서를 돌린 경우 포함) 다음 조회 때 다시 읽음
+    - 벡터 검색과 BM25 검색을 항상 병렬로 돌리고 RRF로 합침
+    - 질문이 표제어 하나를 가리키면 검색을 건너뛰고 그 항목만 사용 (+저장된 답변이 있으면 LLM도 생략)
+    - warm_up()으로 앱 시작 시 백그라운드에서 미리 열어둘 수 있음
+    """
+
+    def __init__(self, model: str = TERM_LLM_MODEL):
+        self.model = model
+        self._lock = threading.Lock()
+        self._bm25_lock = threading.Lock()   # 디스크 색인(BM25/표제어) 로드용
+        self._ready = False
+        self._vs: Optional[Chroma] = None
+        self._llm: Optional[ChatOpenAI] = None
+        self._bm25: Optional[BM25Index] = None
+        self._glossary: Optional[GlossaryIndex] = None
+        self._mtimes: Dict[str, Optional[float]] = {}   # 마지막으로 읽은 색인 파일의 수정 시각
+        self._answers = TermAnswerCache(TERM_PROMPT_VERSION)
+        self._retrievers: Dict[int, object] = {}
+        self._pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="term-bm25")
+
+    def index_ready(self) -> bool:
+        # 인덱스가 한 번 확인되면 이후엔 디렉터리를 다시 뒤지지 않음
+        if not self._ready:
+            self._ready = _index_ready()
+        return self._ready
+
+    def vectorstore(self) -> Chroma:
+        if self._vs is None:
+            with self._lock:
+                if self._vs is None:
+                    self._vs = _load_vectorstore()
+        return self._vs
+
+    def retriever(self, k: int):
+        n = max(8, k)
+        r = self._retrievers.get(n)
+        if r is None:
+            vs = self.vectorstore()
+            with self._lock:
+                r = self._retrievers.setdefault(n, vs.as_retriever(search_kwargs={"k": n}))
+        return r
+
+    def llm(self) -> ChatOpenAI:
+        if self._llm is None:
+            with self._lock:
+                if self._llm is None:
+                    self._llm = ChatOpenAI(model=self.model, temperature=0.2, api_key=OPENAI_API_KEY)
+        return self._llm
+
+    def _changed(self, name: str, path: str) -> bool:
+        """색인 파일의 수정 시각이 마지막으로 읽은 때와 다르면 True (다른 프로세스의 인덱서가 새로 쓴 경우)"""
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            mtime = None
+        return self._mtimes.get(name) != mtime
+
+    def _reload_if_changed(self, name: str, path: str, load):
+        current = getattr(self, name)
+        if current is not None and not self._changed(name, path):
+            return current
+        with self._bm25_lock:
+            current = getattr(self, name)
+            if current is None or self._changed(name, path):
+                try:
+                    self._mtimes[name] = os.path.getmtime(path)
+                except OSError:
+                    self._mtimes[name] = None
+                current = load()
+                setattr(self, name, current)
+        return current
+
+    def bm25(self) -> Optional[BM25Index]:
+        # 역색인이 아직 없으면 None (벡터 검색만 사용) → 다음 호출 때 다시 확인
+        return self._reload_if_changed("_bm25", bm25_stamp_path(BM25_DIR), lambda: BM25Index.load(BM25_DIR))
+
+    def glossary(self) -> Optional[GlossaryIndex]:
+        return self._reload_if_changed("_glossary", GLOSSARY_PATH, lambda: GlossaryIndex.load(GLOSSARY_PATH))
+
+    def reload_indexes(self) -> None:
+        """인덱스를 새로 빌드한 뒤 호출: 디스크 색인은 다음 조회 때 다시 연다 (Chroma는 같은 디렉터리라 그대로)"""
+        with self._bm25_lock:
+            self._bm25 = None
+            self._glossary = None
+            self._mtimes.clear()
+        self._ready = False
+
+    def lookup_entry(self, query: str) -> Optional[EntryHit]:
+        """(항목, 그 항목을 찾은 색인의 build_id, 근사 일치 여부). 도중에 reload_indexes()가 불려도 항목과 build_id는 같은 색인에서 나옴"""
+        glossary = self.glossary()
+        if glossary is None:
+            return None
+        m = glossary.match(query)
+        return EntryHit(m.entry, glossary.build_id, m.fuzzy) if m is not None else None
+
+    def _cached_answer(self, hit: EntryHit) -> Optional[str]:
+        # 근사 일치는 표제어 키로 캐시하지 않음 (다른 용어의 답이 그 표제어 답으로 굳지 않게)
+        if not TERM_ANSWER_CACHE or hit.fuzzy:
+            return None
+        return self._answers.get(hit.build_id, hit.entry.headword)
+
+    def _store_answer(self, hit: EntryHit, answer: str) -> None:
+        if TERM_ANSWER_CACHE and not hit.fuzzy:
+            self._answers.put(hit.build_id, hit.entry.headword, answer)
+
+    def _bm25_search(self, query: str, k: int) -> List[Document]:
+        return _bm25_documents(self.bm25(), query, max(8, k))
+
+    def warm_up(self, bm25: bool = True) -> bool:
+        """인덱스가 있으면 벡터스토어/LLM(+BM25)을 미리 연다. 실패해도 첫 질의 때 다시 시도"""
+        try:
+            if not self.index_ready():
+                return False
+            self.retriever(4)
+            self.llm()
+            if bm25:
+                self.bm25()
+            self.glossary()
+            return True
+        except Exception as e:
+            print(f"⚠️ 용어 설명 파이프라인 예열 실패: {e}")
+            return False
+
+    def retrieve(self, query: str, k: int = 4) -> List[Document]:
+        """벡터 검색(이 스레드) ∥ BM25 검색(풀) → RRF"""
+        bm_future = self._pool.submit(self._bm25_search, query, k)
+        vec_hits = _retrieve(self.retriever(k), query)
+        return _rrf_fuse([vec_hits, bm_future.result()], max(8, k))
+
+    async def aretrieve(self, query: str, k: int = 4) -> List[Document]:
+        # 최초 1회는 Chroma 클라이언트 생성이 블로킹이라 스레드에서
+        if self._vs is None:
+            await asyncio.to_thread(self.vectorstore)
+        vec_hits, bm_hits = await asyncio.gather(
+            self.retriever(k).ainvoke(query),
+            asyncio.to_thread(self._bm25_search, query, k),
+        )
+        return _rrf_fuse([vec_hits, bm_hits], max(8, k))
+
+    def explain(self, query: str, k: int = 4) -> str:
+        """PDF 기반 RAG: 정의 → 핵심 포인트 → 한 줄 예시 (+출처 페이지)"""
+        if not self.index_ready():
+            return NO_INDEX_MSG
+
+        # 0) 표제어 바로 찾기: 임베딩/벡터 검색 없이 해당 항목만
+        hit = self.lookup_entry(query)
+        if hit is not None:
+            answer = self._cached_answer(hit)
+            if answer is None:
+                entry = hit[0]
+                contexts = [_entry_document(entry)]
+                resp = self.llm().invoke(_build_messages(_entry_question(query, hit), contexts))
+                answer = resp.content.strip() + _format_sources(contexts)
+                self._store_answer(hit, answer)
+            return answer
+
+        contexts = self.retrieve(query, k)
+        if not contexts:
+            return _not_found(query)
+
+        resp = self.llm().invoke(_build_messages(query, contexts))
+        return resp.content.strip() + _format_sources(contexts)
+
+    async def aexplain(self, query: str, k: int = 4) -> str:
+        """explain의 asyncio 버전 (임베딩 검색/LLM 호출을 비동기로)"""
+        if not self.index_ready():
+            return NO_INDEX_MSG
+
+        hit = self.lookup_entry(query) if self._glossary is not None else await asyncio.to_thread(self.lookup_entry, query)
+        if hit is not None:
+            answer = await asyncio.to_thread(self._cached_answer, hit)
+            if answer is None:
+                entry = hit[0]
+                contexts = [_entry_document(entry)]
+                resp = await self.llm().ainvoke(_build_messages(_entry_question(query, hit), contexts))
+                answer = resp.content.strip() + _format_sources(contexts)
+                await asyncio.to_thread(self._store_answer, hit, answer)
+            return answer
+
+        contexts = await self.aretrieve(query, k)
+        if not contexts:
+            return _not_found(query)
+
+        resp = await self.llm().ainvoke(_build_messages(query, contexts))
+        return resp.content.strip() + _format_sources(contexts)
+
+
+_service: Optional[TermExplainService] = None
+_service_lock = threading.Lock()
+
+
+def get_term_service() -> TermExplainService:
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = TermExplainService()
+    return _service
+
+
+def warm_term_service_in_background() -> threading.Thread:
+    """앱 시작 시 호출: 벡터스토어/LLM/BM25를 데몬 스레드에서 미리 연다"""
+    t = threading.Thread(target=get_term_service().warm_up, daemon=True, name="term-explain-warmup")
+    t.start()
+    return t
+
+
+def explain_term(query: str, k: int = 4) -> str:
+    return get_term_service().explain(query, k)
+
+async def aexplain_term(query: str, k: int = 4) -> str:
+    return await get_term_service().aexplain(query, k)
 
 
 # === LangChain Tool 래퍼 ===
@@ -144,4 +367,5 @@ def get_term_explain_tool() -> Tool:
             "사용자는 용어(예: 디플레이션, 듀레이션, 테이퍼링 등)를 한국어로 물어본다."
         ),
         func=lambda q: explain_term(q),
+        coroutine=aexplain_term,
     )
\ No newline at end of file
@@ -0,0 +1,274 @@
+# FINAL_PROJECT/tools/term_indexer.py
+
+# 용어집 PDF 증분 인덱서 (Chroma 벡터 + BM25 역색인 + 표제어 색인)
+# - 청크 id = 청크 본문의 해시 → 같은 내용은 몇 번을 돌려도 같은 id (upsert라 중복 저장 없음)
+# - 이미 색인된 청크(Chroma에 실제로 있는 id)는 임베딩하지 않고 건너뜀. 체크포인트는 진행 기록일 뿐,
+#   Chroma에 없는 id가 섞여 있으면(벡터스토어 삭제/재생성 등) 체크포인트를 무효화
+# - 해시 id 도입 전에 만든 벡터스토어의 문서(chunk_id 메타데이터 없음)는 중복을 막기 위해 먼저 삭제
+# - 임베딩 배치는 스레드 풀에서 동시에, 분당 요청 수 예산(TERM_INDEX_RPM) 안에서 실행
+# - 배치가 끝날 때마다 체크포인트 기록 → 중간에 끊겨도 다시 실행하면 남은 청크만 이어서 처리
+# - 이미 끝난 PDF(파일 해시 기준)는 파싱도 다시 하지 않음 → 새 용어집 PDF 추가 시 그 파일만 처리
+
+import os
+import glob
+import json
+import time
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Set
+
+from langchain_community.document_loaders import PyMuPDFLoader
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from tools.bm25_index import BM25_DIR, build_bm25_index, load_chunks
+from tools.glossary_index import GLOSSARY_PATH, GlossaryIndex, extract_entries, save_glossary
+from tools.term_explain_tool import (
+    CHUNK_OVERLAP, CHUNK_SIZE, PDF_PATH, PERSIST_DIR, _load_vectorstore, get_term_service,
+)
+
+# 기본 용어집 + data/glossary/*.pdf (새 용어집은 이 폴더에 넣고 다시 실행)
+TERM_PDF_GLOB = os.getenv("TERM_PDF_GLOB", os.path.join("data", "glossary", "*.pdf"))
+CHECKPOINT_PATH = os.getenv("TERM_INDEX_CHECKPOINT", os.path.join("data", "chroma_terms_checkpoint.json"))
+
+INDEX_BATCH = int(os.getenv("TERM_INDEX_BATCH", "64"))        # 임베딩 요청 1회당 청크 수
+INDEX_WORKERS = int(os.getenv("TERM_INDEX_WORKERS", "4"))     # 동시에 진행할 배치 수
+INDEX_RPM = float(os.getenv("TERM_INDEX_RPM", "60"))          # 분당 임베딩 요청 상한
+
+
+def chunk_id(text: str) -> str:
+    return hashlib.sha1(text.strip().encode("utf-8")).hexdigest()[:20]
+
+
+def file_hash(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def default_pdf_paths() -> List[str]:
+    paths = [PDF_PATH] if os.path.exists(PDF_PATH) else []
+    return paths + [p for p in sorted(glob.glob(TERM_PDF_GLOB)) if p not in paths]
+
+
+# -----------------------------
+# 요청 예산 (토큰 버킷)
+# -----------------------------
+class RateBudget:
+    """분당 per_minute회까지 허용. 버스트는 동시 배치 수만큼"""
+
+    def __init__(self, per_minute: float, burst: int = INDEX_WORKERS):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                wait = (1.0 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+# -----------------------------
+# 체크포인트
+# -----------------------------
+class Checkpoint:
+    """
+    {"files": {파일 해시: {"path", "chunks", "complete"}}, "chunk_ids": [...]}
+    chunk_ids는 Chroma에 들어간 것이 확인된 청크 id (배치 완료 시점마다 기록)
+    """
+
+    def __init__(self, path: str = CHECKPOINT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.files: Dict[str, Dict] = {}
+        self.chunk_ids: Set[str] = set()
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.files = data.get("files", {})
+            self.chunk_ids = set(data.get("chunk_ids", []))
+        except (OSError, ValueError):
+            pass
+
+    def reconcile(self, present: Set[str], store_empty: bool = False) -> bool:
+        """Chroma에 실제로 있는 id만 남김. 빠진 id가 있거나 벡터스토어가 비었으면 완료 표시도 모두 지워 다시 확인하게 함"""
+        with self._lock:
+            if self.chunk_ids <= present and not (store_empty and self.files):
+                return False
+            self.chunk_ids &= present
+            for info in self.files.values():
+                info["complete"] = False
+            self._save()
+            return True
+
+    def is_complete(self, digest: str) -> bool:
+        return bool(self.files.get(digest, {}).get("complete"))
+
+    def add_chunks(self, ids: List[str]) -> None:
+        with self._lock:
+            self.chunk_ids.update(ids)
+            self._save()
+
+    def mark_file(self, digest: str, path: str, chunks: int, complete: bool) -> None:
+        with self._lock:
+            self.files[digest] = {"path": path, "chunks": chunks, "complete": complete}
+            self._save()
+
+    def _save(self) -> None:
+        parent = os.path.dirname(self.path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"files": self.files, "chunk_ids": sorted(self.chunk_ids)}, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+
+# -----------------------------
+# 인덱싱
+# -----------------------------
+def _split_pdf(path: str):
+    docs = PyMuPDFLoader(path).load()
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    chunks, seen = [], set()
+    for c in splitter.split_documents(docs):
+        cid = chunk_id(c.page_content)
+        if cid in seen:
+            continue
+        seen.add(cid)
+        c.metadata["chunk_id"] = cid
+        c.metadata["source"] = os.path.basename(path)
+        chunks.append(c)
+    return docs, chunks
+
+
+def _already_indexed(vs, ids: List[str]) -> Set[str]:
+    """ids 중 Chroma에 실제로 있는 것 (체크포인트 기록 전에 끊긴 배치도 포함)"""
+    found: Set[str] = set()
+    for i in range(0, len(ids), 500):
+        found.update(vs.get(ids=ids[i:i + 500], include=[])["ids"])
+    return found
+
+
+def _purge_legacy(vs, page: int = 1000) -> int:
+    """
+    chunk_id 메타데이터가 없는 예전(해시 id 도입 전) 문서를 삭제하고 삭제 건수를 반환.
+    남겨 두면 같은 본문이 새 id로 한 번 더 들어가 검색 결과에 중복으로 섞임
+    """
+    legacy: List[str] = []
+    offset = 0
+    while True:
+        got = vs.get(limit=page, offset=offset, include=["metadatas"])
+        ids = got["ids"]
+        legacy += [i for i, m in zip(ids, got["metadatas"]) if not (m or {}).get("chunk_id")]
+        if len(ids) < page:
+            break
+        offset += page
+    for i in range(0, len(legacy), 500):
+        vs.delete(ids=legacy[i:i + 500])
+    return len(legacy)
+
+
+def _embed_batches(vs, chunks, checkpoint: Checkpoint, budget: RateBudget, workers: int) -> int:
+    batches = [chunks[i:i + INDEX_BATCH] for i in range(0, len(chunks), INDEX_BATCH)]
+
+    def run(batch) -> int:
+        budget.acquire()
+        ids = [c.metadata["chunk_id"] for c in batch]
+        # ids를 주면 Chroma에 upsert → 재시도/중복 실행에도 안전
+        vs.add_texts([c.page_content for c in batch], metadatas=[c.metadata for c in batch], ids=ids)
+        checkpoint.add_chunks(ids)
+        return len(batch)
+
+    done = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="term-index") as pool:
+        for fut in as_completed([pool.submit(run, b) for b in batches]):
+            done += fut.result()
+            print(f"➡️ 인덱싱 중... {done}/{len(chunks)}")
+    return done
+
+
+def build_index(pdf_paths: Optional[List[str]] = None, force: bool = False,
+                workers: int = INDEX_WORKERS, rpm: float = INDEX_RPM) -> Dict[str, int]:
+    """PDF들 → (새 청크만) 임베딩 → Chroma upsert, BM25/표제어 색인은 기존 것과 합쳐 다시 저장"""
+    pdf_paths = pdf_paths or default_pdf_paths()
+    checkpoint = Checkpoint()
+    budget = RateBudget(rpm, burst=workers)
+    vs = _load_vectorstore()
+    purged = _purge_legacy(vs)
+    if purged:
+        print(f"⚠️ chunk_id 없는 예전 문서 {purged}개를 삭제했습니다. (새 id로 다시 임베딩)")
+    # 체크포인트보다 Chroma가 우선: 벡터스토어를 지우거나 새로 만든 경우 완료 기록을 믿지 않음
+    store_empty = not vs.get(limit=1, include=[])["ids"]
+    present = set() if store_empty else _already_indexed(vs, sorted(checkpoint.chunk_ids))
+    if checkpoint.reconcile(present, store_empty):
+        print("⚠️ 체크포인트 기록 일부가 벡터스토어에 없어 완료 기록을 무효화합니다.")
+
+    bm25_chunks = {c["id"]: c for c in load_chunks(BM25_DIR)}
+    old_glossary = GlossaryIndex.load(GLOSSARY_PATH)
+    entries = {e.headword: e for e in (old_glossary.entries if old_glossary else [])}
+    stats = {"files": 0, "skipped_files": 0, "chunks": 0, "embedded": 0}
+
+    for path in pdf_paths:
+        digest = file_hash(path)
+        if not force and checkpoint.is_complete(digest):
+            print(f"⏭️ 이미 색인됨: {path}")
+            stats["skipped_files"] += 1
+            continue
+
+        print(f"📄 PDF 로딩 중... {path}")
+        docs, chunks = _split_pdf(path)
+        checkpoint.mark_file(digest, path, len(chunks), complete=False)
+        print(f"✂️ {len(chunks)}개 청크 생성")
+
+        ids = [c.metadata["chunk_id"] for c in chunks]
+        known = set() if force else _already_indexed(vs, ids)
+        if known:
+            checkpoint.add_chunks([i for i in ids if i in known])
+        todo = [c for c in chunks if c.metadata["chunk_id"] not in known]
+        print(f"🧮 새로 임베딩할 청크 {len(todo)}개 (건너뜀 {len(chunks) - len(todo)}개)")
+        stats["embedded"] += _embed_batches(vs, todo, checkpoint, budget, workers)
+
+        for c in chunks:
+            bm25_chunks[c.metadata["chunk_id"]] = {
+                "id": c.metadata["chunk_id"], "text": c.page_content,
+                "page": c.metadata.get("page", 0), "source": c.metadata["source"],
+            }
+        for e in extract_entries((d.metadata.get("page", 0), d.page_content) for d in docs):
+            entries[e.headword] = e
+
+        checkpoint.mark_file(digest, path, len(chunks), complete=True)
+        stats["files"] += 1
+        stats["chunks"] += len(chunks)
+
+    if stats["files"]:
+        n = build_bm25_index(bm25_chunks.values(), BM25_DIR)
+        save_glossary(list(entries.values()), GLOSSARY_PATH)
+        print(f"📚 BM25 {n}개 청크 / 표제어 {len(entries)}개 저장")
+        # 같은 프로세스의 서비스는 바로 다시 읽음. 다른 프로세스(실행 중인 앱)는 서비스가 파일 변경 시각을 보고 다시 읽음
+        get_term_service().reload_indexes()
+
+    print(f"✅ 인덱싱 완료: {PERSIST_DIR} {stats}")
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="용어집 PDF 증분 인덱싱 (Chroma + BM25 + 표제어)")
+    parser.add_argument("pdfs", nargs="*", help=f"PDF 경로 (생략 시 {PDF_PATH} + {TERM_PDF_GLOB})")
+    parser.add_argument("--force", action="store_true", help="체크포인트를 무시하고 전부 다시 임베딩")
+    parser.add_argument("--workers", type=int, default=INDEX_WORKERS)
+    parser.add_argument("--rpm", type=float, default=INDEX_RPM)
+    args = parser.parse_args()
+    build_index(args.pdfs or None, force=args.force, workers=args.workers, rpm=args.rpm)